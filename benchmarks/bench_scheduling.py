@@ -0,0 +1,329 @@
+"""
+Benchmarks of the time Exo itself takes to schedule and compile kernels.
+
+    python benchmarks/bench_scheduling.py            # compare to the baseline
+    python benchmarks/bench_scheduling.py --save     # store a new baseline
+    python benchmarks/bench_scheduling.py -k sgemm   # only some workloads
+
+Every workload runs `--repeat` times, each time in a fresh process forked
+from this one, and the fastest run is kept.  Its time is split into phases:
+
+    parse      parsing @proc functions
+    typecheck  typechecking and checking the effects of the parsed procs
+    schedule   scheduling operations, including their SMT queries
+    smt        the SMT queries
+    codegen    compiling the procs to C
+
+The peak memory (`peak_mib`) is the peak resident set size of the process,
+which starts from the memory of this one.  The results are compared
+to the stored baseline (benchmarks/baseline.json), and the script exits with
+status 1 if any of them is more than `--tolerance` above it.  Timings depend
+on the machine, so the baseline should be stored on the machine (or the CI
+runner) which compares against it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.setrecursionlimit(10000)
+
+import exo
+import exo.API
+import exo.API_scheduling
+import exo.main
+import exo.new_analysis_core
+from exo import proc, compile_procs_to_strings
+from exo.LoopIR import Alpha_Rename
+from exo.libs.memories import AVX2
+from exo.platforms.x86 import mm256_loadu_ps, mm256_storeu_ps, mm256_relu_ps
+from exo.stdlib.scheduling import *
+
+BENCH_DIR = Path(__file__).parent.resolve()
+APPS_DIR = BENCH_DIR.parent / "apps"
+BASELINE = BENCH_DIR / "baseline.json"
+
+PHASES = ["parse", "typecheck", "schedule", "smt", "codegen"]
+METRICS = [*PHASES, "total", "peak_mib"]
+
+# differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.05
+MIN_MIB = 1.0
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Timing the phases
+
+
+class PhaseTimer:
+    """
+    Accumulates the time spent in each phase, by wrapping the functions of
+    Exo which start the phases.  Nested calls of a phase (e.g. scheduling
+    operations calling each other) are counted once.
+    """
+
+    def __init__(self):
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self._active = set()
+
+    @contextmanager
+    def phase(self, name):
+        if name in self._active:
+            yield
+            return
+        self._active.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] += time.perf_counter() - start
+            self._active.discard(name)
+
+    def wrap(self, name, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            with self.phase(name):
+                return fn(*args, **kwargs)
+
+        return timed
+
+    def wrap_context(self, name, cm):
+        @contextmanager
+        def timed(*args, **kwargs):
+            with self.phase(name), cm(*args, **kwargs):
+                yield
+
+        return timed
+
+    @contextmanager
+    def install(self):
+        patches = [
+            (exo.API, "get_ast_from_python", self.wrap, "parse"),
+            (exo.API, "Parser", self.wrap, "parse"),
+            (exo.API, "_check_uast", self.wrap, "typecheck"),
+            (exo.API_scheduling, "schedule_budget", self.wrap_context, "schedule"),
+            (exo.new_analysis_core, "_z3_run", self.wrap, "smt"),
+            (exo.API, "run_compile", self.wrap, "codegen"),
+        ]
+        originals = [(mod, attr, getattr(mod, attr)) for mod, attr, _, _ in patches]
+        for mod, attr, wrap, name in patches:
+            setattr(mod, attr, wrap(name, getattr(mod, attr)))
+        try:
+            yield self
+        finally:
+            for mod, attr, fn in originals:
+                setattr(mod, attr, fn)
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Workloads
+
+WORKLOADS = {}
+
+
+def workload(fn):
+    WORKLOADS[fn.__name__] = fn
+    return fn
+
+
+def _compile_app(path):
+    mod = exo.main.load_user_code(APPS_DIR / path)
+    procs = exo.main.get_procs_from_module(mod)
+    compile_procs_to_strings(procs, "bench.h")
+
+
+@workload
+def x86_sgemm():
+    _compile_app("x86/sgemm/sgemm.py")
+
+
+@workload
+def x86_conv():
+    _compile_app("x86/conv/conv.py")
+
+
+@workload
+def gemmini_matmul():
+    _compile_app("gemmini/src/exo/matmul.py")
+
+
+@workload
+def unroll_simplify():
+    @proc
+    def blur(n: size, x: f32[n + 2, 18], y: f32[n, 16]):
+        for i in seq(0, n):
+            for j in seq(0, 16):
+                y[i, j] = 0.0
+                for k in seq(0, 3):
+                    for l in seq(0, 3):
+                        y[i, j] += x[i + k, j + l] * 0.25
+
+    p = divide_loop(blur, "i", 4, ["io", "ii"], tail="cut")
+    for loop in ["l", "k", "j", "ii"]:
+        p = unroll_loop(p, loop)
+    p = simplify(p)
+    compile_procs_to_strings([p], "bench.h")
+
+
+@workload
+def replace_all_relu():
+    @proc
+    def relu_rows(x: f32[64, 8], y: f32[64, 8]):
+        for i in seq(0, 64):
+            for j in seq(0, 8):
+                y[i, j] = relu(x[i, j])
+
+    p = stage_mem(relu_rows, "for j in _:_", "x[i, 0:8]", "xv")
+    p = stage_mem(p, "for j in _:_", "y[i, 0:8]", "yv")
+    p = set_memory(set_memory(p, "xv", AVX2), "yv", AVX2)
+    p = simplify(unroll_loop(p, "i"))
+    p = replace_all(p, [mm256_loadu_ps, mm256_storeu_ps, mm256_relu_ps])
+    compile_procs_to_strings([p], "bench.h")
+
+
+def _unrolled_rows(n):
+    # a proc with `n` loops, each with their own symbols
+    @proc
+    def rows(x: f32[n, 8], y: f32[n, 8]):
+        for i in seq(0, n):
+            for j in seq(0, 8):
+                y[i, j] += 2.0 * x[i, j]
+
+    return unroll_loop(rows, "i")
+
+
+@workload
+def alpha_rename():
+    body = _unrolled_rows(512).INTERNAL_proc().body
+    for _ in range(20):
+        Alpha_Rename(body).result()
+
+
+@workload
+def smt_lowering():
+    p = _unrolled_rows(128)
+    stage_mem(p, p.body(), "y[0:128, 0:8]", "yr")
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Running and comparing
+
+
+def _peak_mib():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # in kilobytes on Linux, in bytes on macOS
+    return peak / 2**20 if platform.system() == "Darwin" else peak / 2**10
+
+
+def _run_workload(name):
+    # runs in a fresh process
+    with PhaseTimer().install() as timer:
+        start = time.perf_counter()
+        WORKLOADS[name]()
+        total = time.perf_counter() - start
+    return {**timer.times, "total": total, "peak_mib": _peak_mib()}
+
+
+def run_benchmark(name, repeat):
+    ctx = multiprocessing.get_context("fork")
+    runs = []
+    for _ in range(repeat):
+        with ProcessPoolExecutor(1, mp_context=ctx) as pool:
+            runs.append(pool.submit(_run_workload, name).result())
+    return min(runs, key=lambda run: run["total"])
+
+
+def _is_regression(metric, new, old, tolerance):
+    floor = MIN_MIB if metric == "peak_mib" else MIN_SECONDS
+    return new > old * (1 + tolerance) and new - old > floor
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print the results next to the baseline, and return the list of the
+    (workload, metric) pairs which regressed.
+    """
+    regressions = []
+    print(f"{'':18}" + "".join(f"{m:>16}" for m in METRICS))
+    for name, result in results.items():
+        old = baseline.get(name, {})
+        cells = []
+        for metric in METRICS:
+            cell = f"{result[metric]:.2f}"
+            if metric in old:
+                change = (result[metric] - old[metric]) / max(old[metric], 1e-9)
+                cell += f" ({change:+.0%})"
+                if _is_regression(metric, result[metric], old[metric], tolerance):
+                    cell += "!"
+                    regressions.append((name, metric))
+            cells.append(f"{cell:>16}")
+        print(f"{name:18}" + "".join(cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the scheduling and compilation of kernels."
+    )
+    parser.add_argument(
+        "-k", metavar="NAME", help="only run the workloads whose name contains NAME"
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3, help="runs of each workload"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="slowdown (as a fraction) reported as a regression",
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=BASELINE, help="baseline to compare to"
+    )
+    parser.add_argument(
+        "--save", action="store_true", help="store the results as the baseline"
+    )
+    args = parser.parse_args()
+
+    names = [name for name in WORKLOADS if not args.k or args.k in name]
+    results = {}
+    for name in names:
+        print(f"running {name}...", file=sys.stderr)
+        results[name] = run_benchmark(name, args.repeat)
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    regressions = compare(results, stored.get("workloads", {}), args.tolerance)
+
+    if args.save:
+        workloads = {**stored.get("workloads", {}), **results}
+        baseline = {
+            "exo_version": exo.__version__,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "workloads": {
+                name: {m: round(v, 4) for m, v in result.items()}
+                for name, result in workloads.items()
+            },
+        }
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+    elif regressions:
+        for name, metric in regressions:
+            print(f"regression: {name} {metric}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
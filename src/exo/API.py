@@ -2,6 +2,7 @@ import ast as pyast
 import inspect
 import re
 import types
+from collections import ChainMap
 from pathlib import Path
 from typing import Optional, Union, List
 from enum import Enum, auto
@@ -11,15 +12,23 @@ from exo.LoopIR_scheduling import SchedulingError
 
 from .API_types import ProcedureBase
 from . import LoopIR as LoopIR
+from . import instr_cache
+from . import serialization
 from .LoopIR_compiler import run_compile, compile_to_strings
-from .LoopIR_interpreter import run_interpreter
+from .LoopIR_interpreter import (
+    run_interpreter,
+    run_interpreter_chunks,
+    register_instr_impl,
+)
 from .LoopIR_unification import DoReplace, UnificationError
 from .configs import Config
+from .cost_model import estimate_cost
 from .effectcheck import InferEffects, CheckEffects
 from .memory import Memory
 from .parse_fragment import parse_fragment
 from .pattern_match import match_pattern, get_match_no
 from .prelude import *
+from .solver_service import get_solver_service
 from .new_eff import Check_Aliasing
 
 # Moved to new file
@@ -55,6 +64,11 @@ def proc(f, _instr=None) -> "Procedure":
 
 
 def instr(instruction):
+    """
+    Instructions are parsed and checked on first use rather than at
+    definition, so that importing a large instruction library is cheap, and
+    the checked procedures are cached on disk (see `exo.instr_cache`).
+    """
     if not isinstance(instruction, str):
         raise TypeError("@instr decorator must be @instr(<your instuction>)")
 
@@ -62,11 +76,56 @@ def instr(instruction):
         if not isinstance(f, types.FunctionType):
             raise TypeError("@instr decorator must be applied to a function")
 
-        return proc(f, _instr=instruction)
+        return Procedure(_LazyInstr(f, instruction, get_src_locals(depth=2)))
 
     return inner
 
 
+class _LazyInstr:
+    def __init__(self, f, instruction, srclocals):
+        self.f = f
+        self.instr = instruction
+        # the free names of the instruction resolve to their values at
+        # definition, as they would if it was parsed then
+        self.func_globals = dict(f.__globals__)
+        self.srclocals = ChainMap(
+            *(
+                self.func_globals if m is f.__globals__ else dict(m)
+                for m in srclocals.maps
+            )
+        )
+
+    def load(self):
+        body, getsrcinfo = get_ast_from_python(self.f)
+        assert isinstance(body, pyast.FunctionDef)
+
+        key = instr_cache.instr_key(
+            self.f, self.instr, body, self.srclocals, self.func_globals
+        )
+        if proc := instr_cache.load(key):
+            return proc
+
+        parser = Parser(
+            body,
+            getsrcinfo,
+            func_globals=self.func_globals,
+            srclocals=self.srclocals,
+            instr=self.instr,
+            as_func=True,
+        )
+        proc = _check_uast(parser.result())
+        instr_cache.store(key, proc)
+        return proc
+
+
+def _check_uast(proc):
+    proc = TypeChecker(proc).get_loopir()
+    proc = InferEffects(proc).result()
+    CheckEffects(proc)
+    Check_Aliasing(proc)
+    return proc
+
+
 def config(_cls=None, *, readwrite=True):
     def parse_config(cls):
         if not inspect.isclass(cls):
@@ -147,16 +206,100 @@ class FindDup(LoopIR.LoopIR_Do):
 #   Procedure Objects
 
 
-def compile_procs(proc_list, basedir: Path, c_file: str, h_file: str):
-    c_data, h_data = compile_procs_to_strings(proc_list, h_file)
+def compile_procs(
+    proc_list,
+    basedir: Path,
+    c_file: str,
+    h_file: str,
+    *,
+    hoist_addresses=False,
+    header_only=False,
+):
+    c_data, h_data = compile_procs_to_strings(
+        proc_list, h_file, hoist_addresses=hoist_addresses, header_only=header_only
+    )
     (basedir / c_file).write_text(c_data)
     (basedir / h_file).write_text(h_data)
 
 
-def compile_procs_to_strings(proc_list, h_file_name: str):
+def compile_procs_to_strings(
+    proc_list, h_file_name: str, *, hoist_addresses=False, header_only=False
+):
+    """
+    Compile a list of procedures (and everything they call) to the text of
+    a C source file and header.
+
+    If `hoist_addresses` is set, the code generator hoists loop-invariant
+    address computations out of loops and strength-reduces multiplicative
+    indexing into pointer increments.
+
+    If `header_only` is set, the whole library is emitted into the header
+    as `static inline` functions, so that it can be included into (and
+    optimized together with) its callers.  Procs that are small enough are
+    additionally marked always-inline.  The source file then only
+    includes the header.
+    """
     assert isinstance(proc_list, list)
     assert all(isinstance(p, Procedure) for p in proc_list)
-    return run_compile([p._loopir_proc for p in proc_list], h_file_name)
+    return run_compile(
+        [p._loopir_proc for p in proc_list],
+        h_file_name,
+        hoist_addresses=hoist_addresses,
+        header_only=header_only,
+    )
+
+
+def save_procs(proc_list, path):
+    """
+    Save a list of procedures (and everything they call) to the file at
+    `path`, so that they can be loaded by `load_procs`, or compiled by
+    `exocc`, without replaying their schedules.
+    """
+    assert isinstance(proc_list, list)
+    assert all(isinstance(p, Procedure) for p in proc_list)
+    data = serialization.dumps([p._loopir_proc for p in proc_list])
+    Path(path).write_bytes(data)
+
+
+def load_procs(path):
+    """
+    Load the list of procedures saved by `save_procs` to the file at `path`.
+    The loaded procedures are not checked again.
+    """
+    return [Procedure(p) for p in serialization.loads(Path(path).read_bytes())]
+
+
+def schedule_procs(schedule, proc_list):
+    """
+    Apply `schedule`, a function from a procedure to a scheduled procedure,
+    to every procedure of `proc_list`, and return the list of the results.
+
+    Within `use_solver_service`, the procedures are scheduled in parallel by
+    the workers of the solver service.  The results are sent back serialized
+    (as by `save_procs`), so, as for loaded procedures, their equivalence to
+    the procedures they were scheduled from is not tracked.  The results
+    which cannot be serialized are scheduled again in this process.
+    """
+    assert isinstance(proc_list, list)
+    assert all(isinstance(p, Procedure) for p in proc_list)
+    if (service := get_solver_service()) is None:
+        return [schedule(p) for p in proc_list]
+
+    def run(p):
+        try:
+            return serialization.dumps([schedule(p)._loopir_proc])
+        except serialization.SerializationError:
+            return None
+
+    return [
+        schedule(p) if data is None else _unpickle_procedure(data)
+        for p, data in zip(proc_list, service.map(run, proc_list))
+    ]
+
+
+def _unpickle_procedure(data):
+    (p,) = serialization.loads(data)
+    return Procedure(p)
 
 
 class Procedure(ProcedureBase):
@@ -171,11 +314,23 @@ class Procedure(ProcedureBase):
 
         _mod_config = _mod_config or frozenset()
 
+        if _forward is None:
+
+            def _forward(_):
+                raise NotImplementedError(
+                    "This forwarding function has not been implemented"
+                )
+
+        self._provenance_eq_Procedure = _provenance_eq_Procedure
+        self._forward = _forward
+
+        if isinstance(proc, _LazyInstr):
+            # loaded on first access to `_loopir_proc`, see `__getattr__`
+            self._lazy_instr = proc
+            return
+
         if isinstance(proc, LoopIR.UAST.proc):
-            proc = TypeChecker(proc).get_loopir()
-            proc = InferEffects(proc).result()
-            CheckEffects(proc)
-            Check_Aliasing(proc)
+            proc = _check_uast(proc)
 
         assert isinstance(proc, LoopIR.LoopIR.proc)
 
@@ -187,16 +342,22 @@ class Procedure(ProcedureBase):
         else:
             decl_new_proc(proc)
 
-        if _forward is None:
+        self._loopir_proc = proc
 
-            def _forward(_):
-                raise NotImplementedError(
-                    "This forwarding function has not been implemented"
-                )
+    def __reduce__(self):
+        return _unpickle_procedure, (serialization.dumps([self._loopir_proc]),)
 
-        self._loopir_proc = proc
-        self._provenance_eq_Procedure = _provenance_eq_Procedure
-        self._forward = _forward
+    def __getattr__(self, attr):
+        # only called when `attr` is not set, i.e. for the IR of an `@instr`
+        # which has not been used yet
+        if attr == "_loopir_proc" and "_lazy_instr" in self.__dict__:
+            proc = self.__dict__.pop("_lazy_instr").load()
+            decl_new_proc(proc)
+            self._loopir_proc = proc
+            return proc
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{attr}'"
+        )
 
     def forward(self, cur: C.Cursor):
         p = self
@@ -250,10 +411,23 @@ class Procedure(ProcedureBase):
             return str(match[0][0]._node.eff)
         raise SchedulingError("failed to find statement", pattern=stmt_pattern)
 
+    def estimate_cost(self):
+        """
+        Estimate the costs of the procedure without running it: arithmetic
+        operations, bytes moved in every memory, calls to every instruction
+        and working sets of its loops, as polynomials over its sizes (see
+        `exo.cost_model`).  Evaluate them for concrete sizes with
+
+            proc.estimate_cost().evaluate({"M": 64, "N": 64, "K": 64})
+        """
+        return estimate_cost(self._loopir_proc)
+
     def is_instr(self):
-        return self._loopir_proc.instr is not None
+        return self.get_instr() is not None
 
     def get_instr(self):
+        if lazy := self.__dict__.get("_lazy_instr"):
+            return lazy.instr
         return self._loopir_proc.instr
 
     def args(self):
@@ -350,6 +524,43 @@ class Procedure(ProcedureBase):
     def interpret(self, **kwargs):
         run_interpreter(self._loopir_proc, kwargs)
 
+    def interpret_chunks(self, chunk, /, **kwargs):
+        """
+        Interpret the procedure like `interpret`, but `chunk` iterations of
+        its top-level loops at a time, yielding `(iter, lo, hi)` after each
+        chunk.  Buffer arguments may be `numpy.memmap`s or other objects
+        supporting the buffer protocol; they are used without copying and
+        memory-mapped ones are flushed after every chunk, so that reference
+        runs on large inputs stay within bounded memory.
+
+            for it, lo, hi in proc.interpret_chunks(16, n=n, x=x, y=y):
+                check_rows(y[lo:hi])
+        """
+        return run_interpreter_chunks(self._loopir_proc, kwargs, chunk)
+
+    def numpy_impl(self, impl):
+        """
+        Register `impl` as the implementation of this instruction in the
+        interpreter, which then calls it instead of interpreting the body.
+        `impl` is called with the arguments in order: sizes as ints, buffers
+        as numpy arrays (windows as views into the caller's buffers), and
+        must update the buffers in place.  Returns `impl`, so that this can
+        be used as a decorator.
+
+            @mm256_fmadd_ps.numpy_impl
+            def _(dst, src1, src2):
+                dst += src1 * src2
+        """
+        if not self.is_instr():
+            raise TypeError(f"{self.name()} is not an instruction")
+        if lazy := self.__dict__.get("_lazy_instr"):
+            # do not check the instruction before it is used
+            name = lazy.f.__name__
+        else:
+            name = self.name()
+        register_instr_impl(name, self.get_instr(), impl)
+        return impl
+
     # ------------------------------- #
     #     scheduling operations
     # ------------------------------- #
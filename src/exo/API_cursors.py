@@ -9,6 +9,7 @@ from . import API
 from .LoopIR import LoopIR
 from .configs import Config
 from .memory import Memory
+from .tiling import DEFAULT_CACHES, TilingAdvice, advise_tiling
 
 from . import internal_cursors as C
 from .prelude import Sym
@@ -555,6 +556,32 @@ class ForSeqCursor(StmtCursor):
 
         return BlockCursor(self._impl._child_block("body"), self._proc)
 
+    def advise_tiling(
+        self, sizes, caches=DEFAULT_CACHES, multiple_of=None, usable=0.5
+    ) -> TilingAdvice:
+        """
+        Advise tile sizes for the perfect loop nest starting at this loop,
+        so that the data touched by a tile fits in every level of the cache
+        hierarchy `caches`, for the procedure sizes given by name in `sizes`
+        (see `exo.tiling`).  `multiple_of` maps loop names to the granule of
+        their tiles, and `usable` is the fraction of every cache to fill.
+
+            advice = gemm.find_loop("i").advise_tiling({"M": 512, ...})
+            k_blk = advice.tiles("L1")["k"]
+            gemm = divide_loop(gemm, "k", k_blk, ["ko", "ki"], tail="cut")
+        """
+        assert isinstance(self._impl, C.Node)
+        assert isinstance(self._impl._node, LoopIR.Seq)
+
+        return advise_tiling(
+            self._proc._loopir_proc,
+            self._impl._node,
+            sizes,
+            caches,
+            multiple_of,
+            usable,
+        )
+
 
 def loopir_type_to_exotype(typ: LoopIR.Type) -> API.ExoType:
     if isinstance(typ, LoopIR.Num):
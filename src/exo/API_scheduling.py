@@ -1,11 +1,14 @@
 # import ast as pyast
+import contextlib
 import functools
 import inspect
+import io
 import re
+import sys
 
 # import types
 from dataclasses import dataclass
-from typing import Any, List, Tuple
+from typing import Any, List, Optional, Tuple
 
 from .API import Procedure
 import exo.API_cursors as PC
@@ -14,10 +17,10 @@ import exo.LoopIR_scheduling as scheduling
 
 from .LoopIR_unification import DoReplace, UnificationError
 from .configs import Config
-from .effectcheck import CheckEffects
 from .memory import Memory
 from .parse_fragment import parse_fragment
 from .prelude import *
+from .solver_limits import SMTLimitError, schedule_budget
 from . import internal_cursors as ic
 
 
@@ -71,11 +74,88 @@ class AtomicSchedulingOp:
     sig: inspect.Signature
     arg_procs: List[ArgumentProcessor]
     func: Any
+    check: Any = None
 
     def __str__(self):
         return f"<AtomicSchedulingOp-{self.__name__}>"
 
+    def precondition(self, check):
+        """
+        Decorator registering `check` as the precondition of this operation.
+        It takes the same (processed) arguments as the operation, and raises
+        the error by which the operation does not apply without rewriting
+        anything, so that `can_apply` can reject the operation before its
+        rewrite runs.
+        """
+        self.check = check
+        return check
+
     def __call__(self, *args, **kwargs):
+        bound_args = self._bind(args, kwargs)
+
+        # convert the arguments using the provided argument processors
+        bargs = bound_args.arguments
+        for nm, argp in zip(bargs, self.arg_procs):
+            bargs[nm] = argp(bargs[nm], bargs)
+
+        # invoke the scheduling function with the modified arguments
+        with schedule_budget(self.__name__):
+            if self.check is not None:
+                self.check(*bound_args.args, **bound_args.kwargs)
+            return self.func(*bound_args.args, **bound_args.kwargs)
+
+    def can_apply(self, *args, **kwargs):
+        """
+        Check whether this operation applies to the given arguments, without
+        raising an error or printing anything if it does not.  The returned
+        `Applicability` is truthy if the operation applies, and then holds
+        the resulting procedure; otherwise it holds the error raised by the
+        first precondition which failed.
+
+        The precondition of the operation (see `precondition`) runs first,
+        so that an operation which does not apply is rejected before its
+        rewrite runs; the checks of operations without one are only reached
+        through the rewrite.  Errors other than the ones by which operations
+        report that they do not apply (e.g. a TypeError raised by the
+        rewrite, which is a bug) are raised, along with whatever the
+        operation printed.
+        """
+        try:
+            bound_args = self._bind(args, kwargs)
+        except TypeError as err:
+            return Applicability(self.__name__, error=err)
+
+        # the argument processors update lists of cursors in place
+        bargs = bound_args.arguments
+        for nm in bargs:
+            if isinstance(bargs[nm], list):
+                bargs[nm] = bargs[nm].copy()
+
+        out = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(out):
+                for nm, argp in zip(bargs, self.arg_procs):
+                    try:
+                        bargs[nm] = argp(bargs[nm], bargs)
+                    except _ARG_ERRORS as err:
+                        return Applicability(self.__name__, error=err, arg=nm)
+                with schedule_budget(self.__name__):
+                    if self.check is not None:
+                        try:
+                            self.check(*bound_args.args, **bound_args.kwargs)
+                        except _ARG_ERRORS as err:
+                            return Applicability(self.__name__, error=err)
+                    try:
+                        proc = self.func(*bound_args.args, **bound_args.kwargs)
+                    except _APPLY_ERRORS as err:
+                        return Applicability(self.__name__, error=err)
+        except BaseException:
+            sys.stdout.write(out.getvalue())
+            raise
+
+        return Applicability(self.__name__, proc=proc)
+
+    def _bind(self, args, kwargs):
         # capture the arguments according to the provided signature
         bound_args = self.sig.bind(*args, **kwargs)
 
@@ -91,13 +171,47 @@ class AtomicSchedulingOp:
             bound_args = self.sig.bind(*args, **kwargs)
             bargs = bound_args.arguments
 
-        # convert the arguments using the provided argument processors
         assert len(self.arg_procs) == len(bargs)
-        for nm, argp in zip(bargs, self.arg_procs):
-            bargs[nm] = argp(bargs[nm], bargs)
+        return bound_args
 
-        # invoke the scheduling function with the modified arguments
-        return self.func(*bound_args.args, **bound_args.kwargs)
+
+# the errors by which scheduling operations report that they do not apply;
+# argument processors and preconditions also reject arguments of the wrong
+# type, but a TypeError raised by the rewrite itself is a bug
+_APPLY_ERRORS = (
+    scheduling.SchedulingError,
+    SMTLimitError,
+    UnificationError,
+    ValueError,
+)
+_ARG_ERRORS = (*_APPLY_ERRORS, TypeError)
+
+
+@dataclass
+class Applicability:
+    """
+    Result of `AtomicSchedulingOp.can_apply`.
+
+    Attributes:
+        op (str): the name of the operation
+        proc (Procedure): the result of the operation, if it applies
+        error (Exception): the error raised by the first failed precondition,
+            if the operation does not apply
+        arg (str): the name of the argument which was rejected, if the
+            error was raised while processing the arguments
+    """
+
+    op: str
+    proc: Optional[Procedure] = None
+    error: Optional[Exception] = None
+    arg: Optional[str] = None
+
+    def __bool__(self):
+        return self.error is None
+
+    @property
+    def reason(self):
+        return None if self.error is None else str(self.error)
 
 
 # decorator for building Atomic Scheduling Operations in the
@@ -179,6 +293,13 @@ class ConfigFieldA(ArgumentProcessor):
         return field
 
 
+class ConfigWriteCountsA(ArgumentProcessor):
+    def __call__(self, counts, all_args):
+        if not isinstance(counts, ConfigWriteCounts):
+            self.err("expected a ConfigWriteCounts object")
+        return counts
+
+
 class NameA(ArgumentProcessor):
     def __call__(self, name, all_args):
         if not is_valid_name(name):
@@ -830,6 +951,11 @@ def reorder_stmts(proc, block_cursor):
     return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
 
 
+@reorder_stmts.precondition
+def _check_reorder_stmts(proc, block_cursor):
+    scheduling.CheckReorderStmt(block_cursor[0]._impl, block_cursor[1]._impl)
+
+
 @sched_op([ExprCursorA(many=True)])
 def commute_expr(proc, expr_cursors):
     """
@@ -850,6 +976,13 @@ def commute_expr(proc, expr_cursors):
         `b + a`
     """
 
+    exprs = [ec._impl for ec in expr_cursors]
+    ir, fwd = scheduling.DoCommuteExpr(exprs)
+    return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
+
+
+@commute_expr.precondition
+def _check_commute_expr(proc, expr_cursors):
     exprs = [ec._impl for ec in expr_cursors]
     for e in exprs:
         if not isinstance(e._node, LoopIR.BinOp) or (
@@ -862,9 +995,6 @@ def commute_expr(proc, expr_cursors):
             "can commute by commute_expr()"
         )
 
-    ir, fwd = scheduling.DoCommuteExpr(exprs)
-    return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
-
 
 @sched_op([ExprCursorA(many=True), NameA, BoolA])
 def bind_expr(proc, expr_cursors, new_name, cse=False):
@@ -890,15 +1020,18 @@ def bind_expr(proc, expr_cursors, new_name, cse=False):
         `a = b + 4.0`
     """
     exprs = [ec._impl for ec in expr_cursors]
-    if any(not e._node.type.is_numeric() for e in exprs):
+    ir, fwd = scheduling.DoBindExpr(new_name, exprs, cse)
+    return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
+
+
+@bind_expr.precondition
+def _check_bind_expr(proc, expr_cursors, new_name, cse):
+    if any(not ec._impl._node.type.is_numeric() for ec in expr_cursors):
         raise TypeError(
             "only numeric (not index or size) expressions "
             "can be bound by bind_expr()"
         )
 
-    ir, fwd = scheduling.DoBindExpr(new_name, exprs, cse)
-    return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
-
 
 # --------------------------------------------------------------------------- #
 # --------------------------------------------------------------------------- #
@@ -976,6 +1109,11 @@ def call_eqv(proc, call_cursor, eqv_proc):
     return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd, _mod_config=cfg)
 
 
+@call_eqv.precondition
+def _check_call_eqv(proc, call_cursor, eqv_proc):
+    scheduling.CheckCallSwap(call_cursor._impl, eqv_proc._loopir_proc)
+
+
 # --------------------------------------------------------------------------- #
 # --------------------------------------------------------------------------- #
 # Precision, Memory and Window Setting Operations
@@ -1083,6 +1221,47 @@ def delete_config(proc, stmt_cursor):
     return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd, _mod_config=cfg)
 
 
+@dataclass
+class ConfigWriteCounts:
+    """
+    Counts of the configuration writes which `eliminate_config_writes`
+    hoisted out of loops and deleted.
+    """
+
+    n_hoisted: int = 0
+    n_deleted: int = 0
+
+
+@sched_op([OptionalA(ConfigWriteCountsA)])
+def eliminate_config_writes(proc, counts=None):
+    """
+    Hoist loop-invariant configuration writes out of their loops, then
+    delete the configuration writes which store the value the field already
+    holds.  Configuration writes are statements writing to some config.field
+    and calls to procedures (e.g. configuration instructions) which only
+    write to config fields.
+
+    A write is hoisted when it writes the same value in every iteration,
+    nothing else in the loop writes the same fields, and nothing before it
+    in the loop reads them.  If the loop is not known to run, the hoisted
+    write is guarded by its bounds.
+
+    args:
+        counts      - optional `ConfigWriteCounts`, set to the numbers of
+                      hoisted and deleted writes
+
+    rewrite:
+        `for i in _:`
+        `    config.field = e`          `config.field = e`
+        `    s`                     ->  `for i in _:`
+        `config.field = e`              `    s`
+    """
+    ir, fwd, n_deleted, n_hoisted = scheduling.DoEliminateConfigWrites(proc._root())
+    if counts is not None:
+        counts.n_hoisted, counts.n_deleted = n_hoisted, n_deleted
+    return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
+
+
 @sched_op([GapCursorA, ConfigA, ConfigFieldA, NewExprA("gap_cursor")])
 def write_config(proc, gap_cursor, config, field, rhs):
     """
@@ -1199,7 +1378,9 @@ def bound_alloc(proc, buf_cursor, new_bounds, unsafe_disable_checks=False):
     new_proc_c = scheduling.DoBoundAlloc(proc, stmt, new_bounds).result()
 
     if not unsafe_disable_checks:
-        CheckEffects(new_proc_c._node)
+        # only the statements in the scope of the allocation are re-checked,
+        # the rest of the effect analysis of `proc` is reused
+        new_proc_c.check_effects()
 
     return new_proc_c
 
@@ -1502,9 +1683,6 @@ def divide_loop(proc, loop_cursor, div_const, new_iters, tail="guard", perfect=F
         `for lo in seq(0,e - q * (e / q)):`
         `    s[ i -> q * (e / q) + lo ]
     """
-    if div_const == 1:
-        raise ValueError("why are you trying to split by 1?")
-
     stmt = loop_cursor._impl
 
     ir, fwd = scheduling.DoSplit(
@@ -1518,6 +1696,14 @@ def divide_loop(proc, loop_cursor, div_const, new_iters, tail="guard", perfect=F
     return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
 
 
+@divide_loop.precondition
+def _check_divide_loop(proc, loop_cursor, div_const, new_iters, tail, perfect):
+    if div_const == 1:
+        raise ValueError("why are you trying to split by 1?")
+
+    scheduling.CheckSplit(loop_cursor._impl, div_const, perfect)
+
+
 @sched_op([NestedForSeqCursorA, NameA])
 def mult_loops(proc, nested_loops, new_iter_name):
     """
@@ -1542,6 +1728,11 @@ def mult_loops(proc, nested_loops, new_iter_name):
     return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
 
 
+@mult_loops.precondition
+def _check_mult_loops(proc, nested_loops, new_iter_name):
+    scheduling.CheckProductLoop(nested_loops._impl)
+
+
 @sched_op([ForSeqCursorA, PosIntA])
 def cut_loop(proc, loop, cut_point):
     """
@@ -1568,6 +1759,11 @@ def cut_loop(proc, loop, cut_point):
     return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
 
 
+@cut_loop.precondition
+def _check_cut_loop(proc, loop, cut_point):
+    scheduling.CheckPartitionLoop(loop._impl, cut_point)
+
+
 @sched_op([NestedForSeqCursorA])
 def reorder_loops(proc, nested_loops):
     """
@@ -1595,12 +1791,17 @@ def reorder_loops(proc, nested_loops):
         `        s`
     """
 
+    ir, fwd = scheduling.DoLiftLoop(nested_loops._impl.body()[0])
+    return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
+
+
+@reorder_loops.precondition
+def _check_reorder_loops(proc, nested_loops):
     stmt_c = nested_loops._impl
     if len(stmt_c.body()) != 1 or not isinstance(stmt_c.body()[0]._node, LoopIR.Seq):
         raise ValueError(f"expected loop directly inside of {stmt_c._node.iter} loop")
 
-    ir, fwd = scheduling.DoLiftScope(stmt_c.body()[0])
-    return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
+    scheduling.CheckLiftLoop(stmt_c.body()[0])
 
 
 @sched_op([BlockCursorA(block_size=2)])
@@ -1827,6 +2028,11 @@ def remove_loop(proc, loop_cursor):
     return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
 
 
+@remove_loop.precondition
+def _check_remove_loop(proc, loop_cursor):
+    scheduling.CheckRemoveLoop(loop_cursor._impl)
+
+
 @sched_op([BlockCursorA, NameA, NewExprA("block_cursor"), BoolA, BoolA])
 def add_loop(
     proc, block_cursor, iter_name, hi_expr, guard=False, unsafe_disable_check=False
@@ -1883,6 +2089,11 @@ def unroll_loop(proc, loop_cursor):
     return Procedure(ir, _provenance_eq_Procedure=proc, _forward=fwd)
 
 
+@unroll_loop.precondition
+def _check_unroll_loop(proc, loop_cursor):
+    scheduling.CheckUnroll(loop_cursor._impl)
+
+
 # --------------------------------------------------------------------------- #
 # --------------------------------------------------------------------------- #
 # Guard Conditions
@@ -1,4 +1,5 @@
 import functools
+import math
 import re
 import textwrap
 from collections import ChainMap
@@ -12,6 +13,9 @@ from .mem_analysis import MemoryAnalysis
 from .memory import MemGenError, Memory, DRAM, StaticMemory
 from .prec_analysis import PrecisionAnalysis
 from .prelude import *
+from .range_analysis import IndexRangeAnalysis, arg_range_env
+from .reg_analysis import check_register_pressure
+from .solver_service import get_solver_service
 from .win_analysis import WindowAnalysis
 
 
@@ -47,21 +51,43 @@ op_prec = {
 }
 
 
-def lift_to_cir(e):
+def is_nonneg(e, range_env):
+    """
+    Whether the index expression `e` is provably non-negative, given
+    the `Sym -> range` mapping `range_env` (see `IndexRangeAnalysis`).
+    On non-negative operands, C's truncating `/` and `%` agree with
+    Exo's flooring semantics.
+    """
+    if e.type == T.size:
+        return True
+    if range_env is None:
+        return False
+    e_range = IndexRangeAnalysis(e, range_env).result()
+    return e_range is not None and e_range[0] >= 0
+
+
+def lift_to_cir(e, range_env=None):
     assert e.type.is_indexable(), "why are you here?"
 
     if isinstance(e, LoopIR.Read):
-        return CIR.Read(e.name, e.type == T.size)
+        return CIR.Read(e.name, is_nonneg(e, range_env))
     elif isinstance(e, LoopIR.Const):
         return CIR.Const(e.val)
     elif isinstance(e, LoopIR.BinOp):
-        lhs = lift_to_cir(e.lhs)
-        rhs = lift_to_cir(e.rhs)
-        return CIR.BinOp(e.op, lhs, rhs, e.type == T.size)
+        lhs = lift_to_cir(e.lhs, range_env)
+        rhs = lift_to_cir(e.rhs, range_env)
+        return CIR.BinOp(e.op, lhs, rhs, is_nonneg(e, range_env))
     else:
         assert False, "bad case!"
 
 
+def _log2_exact(n):
+    # the shift amount for a power of two `n`, otherwise None
+    if isinstance(n, int) and n > 0 and n & (n - 1) == 0:
+        return n.bit_length() - 1
+    return None
+
+
 operations = {
     "+": lambda x, y: x + y,
     "-": lambda x, y: x - y,
@@ -114,6 +140,85 @@ def simplify_cir(e):
         assert False, "bad case!"
 
 
+def _cir_add(lhs, rhs, op="+"):
+    # `None` stands for a zero term here, so that we avoid building up
+    # chains of `0 + 0 * ...` while splitting index expressions
+    if rhs is None:
+        return lhs
+    if lhs is None:
+        return rhs if op == "+" else CIR.BinOp("-", CIR.Const(0), rhs, False)
+    return CIR.BinOp(op, lhs, rhs, False)
+
+
+def _cir_mul(lhs, rhs):
+    if lhs is None or rhs is None:
+        return None
+    return CIR.BinOp("*", lhs, rhs, True)
+
+
+def split_affine_cir(e, itr):
+    """
+    Split an index expression `e` into `(coeff, rest)` such that
+    `e == coeff * itr + rest` and neither `coeff` nor `rest` mention `itr`.
+    A `None` component stands for zero.  Returns `None` if `e` is not
+    linear in `itr` (e.g. `itr` occurs under a division or modulo).
+    """
+    if isinstance(e, CIR.Read):
+        if e.name == itr:
+            return CIR.Const(1), None
+        return None, e
+
+    elif isinstance(e, (CIR.Const, CIR.Stride)):
+        return None, e
+
+    elif isinstance(e, CIR.BinOp):
+        lhs = split_affine_cir(e.lhs, itr)
+        rhs = split_affine_cir(e.rhs, itr)
+        if lhs is None or rhs is None:
+            return None
+
+        (lc, lr), (rc, rr) = lhs, rhs
+        if e.op == "+" or e.op == "-":
+            return _cir_add(lc, rc, e.op), _cir_add(lr, rr, e.op)
+        elif lc is None and rc is None:
+            return None, e
+        elif e.op == "*" and lc is None:
+            return _cir_mul(lr, rc), _cir_mul(lr, rr)
+        elif e.op == "*" and rc is None:
+            return _cir_mul(lc, rr), _cir_mul(lr, rr)
+        else:
+            return None
+
+    else:
+        assert False, "bad case!"
+
+
+def split_const_cir(e):
+    """
+    Split off the constant part of a sum: returns `(rest, k)` such that
+    `e == rest + k` with `k` an integer.
+    """
+    if isinstance(e, CIR.Const):
+        return CIR.Const(0), e.val
+    elif isinstance(e, CIR.BinOp) and e.op in ("+", "-"):
+        lhs, lk = split_const_cir(e.lhs)
+        rhs, rk = split_const_cir(e.rhs)
+        if e.op == "-":
+            rk = -rk
+        return simplify_cir(CIR.BinOp(e.op, lhs, rhs, e.ispos)), lk + rk
+    else:
+        return e, 0
+
+
+def cir_syms(e):
+    if isinstance(e, (CIR.Read, CIR.Stride)):
+        return {e.name}
+    elif isinstance(e, CIR.BinOp):
+        return cir_syms(e.lhs) | cir_syms(e.rhs)
+    else:
+        return set()
+
+
 class LoopIR_SubProcs(LoopIR_Do):
     def __init__(self, proc):
         self._subprocs = set()
@@ -191,12 +296,10 @@ class LoopIR_FindBuiltIns(LoopIR_Do):
     def result(self):
         return self._builtins
 
-    # to improve efficiency
     def do_e(self, e):
         if isinstance(e, LoopIR.BuiltIn):
             self._builtins.add(e.f)
-        else:
-            super().do_e(e)
+        super().do_e(e)
 
     def do_t(self, t):
         pass
@@ -226,6 +329,17 @@ class LoopIR_FindConfigs(LoopIR_Do):
         pass
 
 
+def count_stmts(stmts):
+    n = 0
+    for s in stmts:
+        n += 1
+        if isinstance(s, LoopIR.If):
+            n += count_stmts(s.body) + count_stmts(s.orelse)
+        elif isinstance(s, LoopIR.Seq):
+            n += count_stmts(s.body)
+    return n
+
+
 def find_all_mems(proc_list):
     mems = set()
     for p in proc_list:
@@ -299,12 +413,25 @@ def window_struct(base_type, n_dims, is_const) -> WindowStruct:
 # top level compiler function called by tests!
 
 
-def run_compile(proc_list, h_file_name: str):
+def run_compile(
+    proc_list, h_file_name: str, *, hoist_addresses=False, header_only=False
+):
     file_stem = str(Path(h_file_name).stem)
     lib_name = sanitize_str(file_stem)
-    fwd_decls, body = compile_to_strings(lib_name, proc_list)
+    fwd_decls, body = compile_to_strings(
+        lib_name,
+        proc_list,
+        hoist_addresses=hoist_addresses,
+        header_only=header_only,
+    )
 
-    source = f'#include "{h_file_name}"\n\n{body}'
+    if header_only:
+        # everything lives in the header; the source file is kept so that
+        # build systems expecting one still work
+        source = f'#include "{h_file_name}"\n'
+        fwd_decls = f"{fwd_decls}\n{body}"
+    else:
+        source = f'#include "{h_file_name}"\n\n{body}'
 
     header_guard = f"{lib_name}_H".upper()
     header = f"""
@@ -330,7 +457,7 @@ extern "C" {{
 _static_helpers = {
     "exo_floor_div": textwrap.dedent(
         """
-        static int exo_floor_div(int num, int quot) {
+        static inline int exo_floor_div(int num, int quot) {
           int off = (num>=0)? 0 : quot-1;
           return (num-off)/quot;
         }
@@ -339,7 +466,24 @@ _static_helpers = {
 }
 
 
-def compile_to_strings(lib_name, proc_list):
+# Procs with at most this many statements are marked always-inline when
+# compiling a header-only library
+ALWAYS_INLINE_MAX_STMTS = 64
+
+_always_inline_macro = """
+#if defined(__GNUC__) || defined(__clang__)
+#  define EXO_ALWAYS_INLINE inline __attribute__((always_inline))
+#elif defined(_MSC_VER)
+#  define EXO_ALWAYS_INLINE __forceinline
+#else
+#  define EXO_ALWAYS_INLINE inline
+#endif
+"""
+
+
+def compile_to_strings(
+    lib_name, proc_list, *, hoist_addresses=False, header_only=False
+):
     # Get transitive closure of call-graph
     orig_procs = [id(p) for p in proc_list]
 
@@ -368,6 +512,25 @@ def compile_to_strings(lib_name, proc_list):
             raise TypeError(f"multiple procs named {p.name}")
         seen_procs.add(p.name)
 
+    def compile_proc(p):
+        return _compile_proc(
+            p,
+            ctxt_name,
+            is_public_decl=id(p) in orig_procs,
+            hoist_addresses=hoist_addresses,
+            header_only=header_only,
+        )
+
+    # the procs are independent, so the solver service can compile them in
+    # parallel; the results are assembled in order
+    to_compile = [p for p in proc_list if p.instr is None]
+    if service := get_solver_service():
+        compiled = service.map(compile_proc, to_compile)
+    else:
+        compiled = [compile_proc(p) for p in to_compile]
+    compiled = dict(zip([p.name for p in to_compile], compiled))
+
+    for p in proc_list:
         # don't compile instruction procedures, but add a comment.
         if p.instr is not None:
             argstr = ",".join([str(a.name) for a in p.args])
@@ -381,18 +544,11 @@ def compile_to_strings(lib_name, proc_list):
                 ]
             )
         else:
-            is_public_decl = id(p) in orig_procs
+            d, b, structs, helpers = compiled[p.name]
+            struct_defns |= structs
+            needed_helpers |= helpers
 
-            p = PrecisionAnalysis().run(p)
-            p = WindowAnalysis().apply_proc(p)
-            p = MemoryAnalysis().run(p)
-
-            comp = Compiler(p, ctxt_name, is_public_decl=is_public_decl)
-            d, b = comp.comp_top()
-            struct_defns |= comp.struct_defns()
-            needed_helpers |= comp.needed_helpers()
-
-            if is_public_decl:
+            if id(p) in orig_procs:
                 public_fwd_decls.append(d)
             else:
                 private_fwd_decls.append(d)
@@ -423,7 +579,7 @@ def compile_to_strings(lib_name, proc_list):
 #else
 #  define EXO_ASSUME(expr) ((void)(expr))
 #endif
-
+{_always_inline_macro if header_only else ""}
 {from_lines(ctxt_def)}
 {from_lines(struct_defns)}
 {from_lines(public_fwd_decls)}
@@ -442,10 +598,44 @@ def compile_to_strings(lib_name, proc_list):
     return header_contents, body_contents
 
 
+def _compile_proc(p, ctxt_name, **kwargs):
+    # the declaration and definition of `p`, with the structs and the
+    # helpers they use
+    check_register_pressure(p)
+    p = PrecisionAnalysis().run(p)
+    p = WindowAnalysis().apply_proc(p)
+    p = MemoryAnalysis().run(p)
+
+    comp = Compiler(p, ctxt_name, **kwargs)
+    d, b = comp.comp_top()
+    return d, b, comp.struct_defns(), comp.needed_helpers()
+
+
+def _builtin_prec(e):
+    # the widest floating-point type of the result and the arguments, so
+    # that no operand loses precision; i32 values do not all fit in the 24
+    # bits of a float's significand, so with them (or only integers) the
+    # builtin is computed in double
+    floats = [T.f16, T.f32, T.f64]
+    types = [e.type, *(a.type for a in e.args)]
+    if any(t == T.i32 for t in types):
+        return "double"
+    types = [t for t in types if t in floats]
+    return max(types, key=floats.index).ctype() if types else "double"
+
+
 def _compile_builtins(builtins):
     builtin_code = []
+    includes = set()
     for b in sorted(builtins, key=lambda x: x.name()):
-        if glb := b.globl():
+        # builtins share their includes
+        lines = [
+            line
+            for line in b.globl().split("\n")
+            if not (line.startswith("#include") and line in includes)
+        ]
+        includes.update(line for line in lines if line.startswith("#include"))
+        if glb := "\n".join(lines).strip():
             builtin_code.append(glb)
     return builtin_code
 
@@ -489,8 +679,35 @@ def _compile_context_struct(configs, lib_name):
 # Loop IR Compiler
 
 
+@dataclass
+class _HoistedLoop:
+    """
+    Book-keeping for address hoisting within a single loop.  Pointers are
+    declared in the scope enclosing the loop, initialized to the address
+    accessed in the first iteration and bumped in the loop's increment.
+    """
+
+    iter: Sym
+    lo: CIR
+    env: ChainMap
+    names: ChainMap
+    tab: str
+    header: int
+    ptrs: dict
+    decls: list
+    steps: list
+
+
 class Compiler:
-    def __init__(self, proc, ctxt_name, *, is_public_decl):
+    def __init__(
+        self,
+        proc,
+        ctxt_name,
+        *,
+        is_public_decl,
+        hoist_addresses=False,
+        header_only=False,
+    ):
         assert isinstance(proc, LoopIR.proc)
 
         self.proc = proc
@@ -505,6 +722,10 @@ class Compiler:
         self._needed_helpers = set()
         self.window_defns = set()
         self._known_strides = {}
+        self._hoist_addresses = hoist_addresses
+        self._loops = []
+        # Sym -> range of values of index expressions (see range_analysis.py)
+        self._index_ranges = arg_range_env(proc)
 
         assert self.proc.name is not None, "expected names for compilation"
         name = self.proc.name
@@ -565,7 +786,13 @@ class Compiler:
 
         self.comp_stmts(self.proc.body)
 
-        static_kwd = "" if is_public_decl else "static "
+        if header_only:
+            if count_stmts(self.proc.body) <= ALWAYS_INLINE_MAX_STMTS:
+                static_kwd = "static EXO_ALWAYS_INLINE "
+            else:
+                static_kwd = "static inline "
+        else:
+            static_kwd = "" if is_public_decl else "static "
 
         # Generate headers here?
         comment = (
@@ -690,13 +917,21 @@ class Compiler:
             if isinstance(e.rhs, CIR.BinOp) and (e.op == "-" or e.op == "/"):
                 rhs = f"({rhs})"
 
+            lhs_nonneg = (isinstance(e.lhs, (CIR.Read, CIR.BinOp)) and e.lhs.ispos) or (
+                isinstance(e.lhs, CIR.Const) and e.lhs.val >= 0
+            )
+            shift = _log2_exact(e.rhs.val) if isinstance(e.rhs, CIR.Const) else None
+
             if e.op == "/":
-                if (isinstance(e.lhs, (CIR.Read, CIR.BinOp)) and e.lhs.ispos) or (
-                    isinstance(e.lhs, CIR.Const) and e.lhs.val > 0
-                ):
-                    return f"({lhs} / {rhs})"
-                else:
+                if not lhs_nonneg:
                     return self._call_static_helper("exo_floor_div", lhs, rhs)
+                elif shift is not None:
+                    return f"({lhs} >> {shift})"
+                else:
+                    return f"({lhs} / {rhs})"
+
+            if e.op == "%" and lhs_nonneg and shift is not None:
+                return f"({lhs} & {e.rhs.val - 1})"
 
             s = f"{lhs} {e.op} {rhs}"
             if local_prec < prec:
@@ -712,8 +947,10 @@ class Compiler:
 
     def access_str(self, nm, idx_list) -> str:
         type = self.envtyp[nm]
-        cirs = [lift_to_cir(i) for i in idx_list]
+        cirs = [lift_to_cir(i, self._index_ranges) for i in idx_list]
         idx_expr = self.get_idx_offset(nm, type, cirs)
+        if ptr := self.hoisted_access(nm, idx_expr):
+            return ptr
         idx_expr_s = self.comp_cir(simplify_cir(idx_expr), self.env, prec=0)
         buf = self.env[nm]
         if not type.is_win():
@@ -853,6 +1090,28 @@ class Compiler:
         elif isinstance(s, LoopIR.Seq):
             lo = self.comp_e(s.lo)
             hi = self.comp_e(s.hi)
+            lo_range = IndexRangeAnalysis(s.lo, self._index_ranges).result()
+            hi_range = IndexRangeAnalysis(s.hi, self._index_ranges).result()
+            itr_range = (
+                lo_range[0] if lo_range else -math.inf,
+                hi_range[1] - 1 if hi_range else math.inf,
+            )
+            if itr_range != (-math.inf, math.inf):
+                self._index_ranges[s.iter] = itr_range
+            if self._hoist_addresses:
+                self._loops.append(
+                    _HoistedLoop(
+                        s.iter,
+                        lift_to_cir(s.lo),
+                        self.env,
+                        self.names,
+                        self._tab,
+                        len(self._lines),
+                        dict(),
+                        [],
+                        [],
+                    )
+                )
             self.push(only="env")
             itr = self.new_varname(s.iter, typ=T.index)  # allocate a new string
             self.add_line(f"for (int_fast32_t {itr} = {lo}; {itr} < {hi}; {itr}++) {{")
@@ -860,6 +1119,8 @@ class Compiler:
             self.comp_stmts(s.body)
             self.pop()
             self.add_line("}")
+            if self._hoist_addresses:
+                self._finish_hoisted_loop(self._loops.pop())
 
         elif isinstance(s, LoopIR.Alloc):
             name = self.new_varname(s.name, typ=s.type, mem=s.mem)
@@ -982,10 +1243,19 @@ class Compiler:
             rhs = self.comp_e(e.rhs, local_prec + 1)
 
             if int_div:
-                if isinstance(e.lhs.type, LoopIR.Size):
-                    # TODO: too many parens?
-                    return f"(({lhs}) / ({rhs}))"
-                return self._call_static_helper("exo_floor_div", lhs, rhs)
+                if not is_nonneg(e.lhs, self._index_ranges):
+                    return self._call_static_helper("exo_floor_div", lhs, rhs)
+                elif (shift := self.const_log2(e.rhs)) is not None:
+                    return f"(({lhs}) >> {shift})"
+                # TODO: too many parens?
+                return f"(({lhs}) / ({rhs}))"
+            elif (
+                op == "%"
+                and not e.type.is_numeric()
+                and self.const_log2(e.rhs) is not None
+                and is_nonneg(e.lhs, self._index_ranges)
+            ):
+                return f"({lhs} & {e.rhs.val - 1})"
 
             s = f"{lhs} {op} {rhs}"
             if local_prec < prec:
@@ -996,8 +1266,8 @@ class Compiler:
             return f'-{self.comp_e(e.arg, op_prec["~"])}'
 
         elif isinstance(e, LoopIR.BuiltIn):
-            args = [self.comp_fnarg(a, e, i) for i, a in enumerate(e.args)]
-            return e.f.compile(args)
+            args = [self.comp_e(a) for a in e.args]
+            return e.f.compile(args, _builtin_prec(e))
 
         elif isinstance(e, LoopIR.StrideExpr):
             basetyp = self.envtyp[e.name]
@@ -1014,6 +1284,11 @@ class Compiler:
         else:
             assert False, "bad case"
 
+    def const_log2(self, e):
+        if isinstance(e, LoopIR.Const):
+            return _log2_exact(e.val)
+        return None
+
     def _call_static_helper(self, helper, *args):
         self._needed_helpers.add(helper)
         return f'{helper}({", ".join(map(str, args))})'
@@ -1027,7 +1302,7 @@ class Compiler:
         def w_lo(w):
             return w.lo if isinstance(w, LoopIR.Interval) else w.pt
 
-        cirs = [lift_to_cir(w_lo(w)) for w in e.idx]
+        cirs = [lift_to_cir(w_lo(w), self._index_ranges) for w in e.idx]
         idxs = [self.comp_cir(simplify_cir(i), self.env, prec=0) for i in cirs]
 
         # compute new window strides
@@ -1036,8 +1311,87 @@ class Compiler:
             self.comp_cir(simplify_cir(i), self.env, prec=0) for i in all_strides
         ]
         assert 0 < len(all_strides_s) == len(e.idx)
-        dataptr = mem.window(basetyp, base, idxs, all_strides_s, e.srcinfo)
+        offset = self.get_idx_offset(e.name, basetyp, cirs)
+        if not (dataptr := self.hoisted_access(e.name, offset)):
+            dataptr = mem.window(basetyp, base, idxs, all_strides_s, e.srcinfo)
         strides = ", ".join(
             s for s, w in zip(all_strides_s, e.idx) if isinstance(w, LoopIR.Interval)
         )
         return dataptr, strides
+
+    # --------------------------------------------------------------------- #
+    # Address hoisting and strength reduction
+
+    def hoisted_access(self, nm, offset):
+        """
+        Try to rewrite the access `nm[offset]` inside the innermost loop
+        as an access through a pointer which is hoisted out of that loop
+        and incremented by the loop.  Returns the C string for the access
+        or `None` if the access must be generated as usual.
+        """
+        if not self._loops:
+            return None
+
+        loop = self._loops[-1]
+        mem = self.mems[nm]
+        if not issubclass(mem, DRAM) or nm not in loop.env:
+            return None
+
+        split = split_affine_cir(offset, loop.iter)
+        if split is None:
+            return None
+        coeff, rest = split
+        coeff = simplify_cir(coeff or CIR.Const(0))
+        rest, k = split_const_cir(simplify_cir(rest or CIR.Const(0)))
+        if isinstance(coeff, CIR.Const) and isinstance(rest, CIR.Const):
+            # offsets like `4 * i + 1` are already as cheap as they get
+            return None
+        no_step = isinstance(coeff, CIR.Const) and coeff.val == 0
+
+        # everything the pointer is computed from must be in scope (and
+        # hence invariant) before entering the loop
+        if not all(x in loop.env for x in cir_syms(coeff) | cir_syms(rest)):
+            return None
+
+        coeff_s = self.comp_cir(coeff, loop.env, prec=0)
+        rest_s = self.comp_cir(rest, loop.env, prec=0)
+        key = (nm, coeff_s, rest_s)
+        if key not in loop.ptrs:
+            start = simplify_cir(CIR.BinOp("+", rest, _cir_mul(coeff, loop.lo), True))
+            start_s = self.comp_cir(start, loop.env, prec=0)
+
+            base = loop.env[nm]
+            if self.envtyp[nm].is_win():
+                base = f"{base}.data"
+            const_kwd = "const " if nm not in self.non_const else ""
+            ctype = self.envtyp[nm].basetype().ctype()
+
+            ptr = self._hoisted_varname(f"{loop.env[nm]}_ptr", loop)
+            loop.ptrs[key] = ptr
+            loop.decls.append(f"{const_kwd}{ctype} *{ptr} = &{base}[{start_s}];")
+            if not no_step:
+                loop.steps.append(f"{ptr} += {coeff_s}")
+
+        return f"{loop.ptrs[key]}[{k}]"
+
+    def _hoisted_varname(self, base, loop):
+        # The pointer lives in the scope enclosing the loop, but must not
+        # clash with (or be shadowed by) any name visible inside the loop.
+        name, i = base, 0
+        while name in self.names:
+            i += 1
+            name = f"{base}_{i}"
+        loop.names[name] = name
+        return name
+
+    def _finish_hoisted_loop(self, loop):
+        if not loop.ptrs:
+            return
+
+        header = self._lines[loop.header]
+        assert header.endswith("++) {")
+        steps = "".join(f", {step}" for step in loop.steps)
+        self._lines[loop.header] = f"{header[:-len(') {')]}{steps}) {{"
+        self._lines[loop.header : loop.header] = [
+            f"{loop.tab}{decl}" for decl in loop.decls
+        ]
@@ -264,6 +264,9 @@ def eff_subst(env, eff):
 @extclass(Effects.effset)
 @extclass(Effects.expr)
 def config_subst(self, env):
+    if not env:
+        # nothing to substitute, and the effects are immutable
+        return self
     return _subcfg(env, self)
 
 
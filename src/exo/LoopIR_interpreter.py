@@ -17,16 +17,77 @@ def _eshape(typ, env):
 
 
 def run_interpreter(proc, kwargs):
-    Interpreter(proc, kwargs)
+    Interpreter(proc, kwargs).run()
+
+
+def run_interpreter_chunks(proc, kwargs, chunk):
+    return Interpreter(proc, kwargs).run_chunks(chunk)
+
+
+def eval_control_expr(e, env):
+    """
+    Evaluate a control expression `e` (e.g. a shape or an assertion of a
+    proc), given the values of its variables as a dictionary `env` from
+    their symbols to ints, bools or numpy buffers.
+    """
+    interp = Interpreter.__new__(Interpreter)
+    interp.env = ChainMap(env)
+    return interp.eval_e(e)
+
+
+# NumPy implementations of instructions, by name and instruction string
+_instr_impls = dict()
+
+
+def register_instr_impl(name, instr, impl):
+    """
+    Interpret calls to the instruction `name` with the C template `instr`
+    by calling `impl` instead of interpreting its body.
+    """
+    _instr_impls[(name, instr)] = impl
+
+
+class BufferPool:
+    """
+    Free buffers for the allocations of the interpreter, keyed by shape and
+    dtype, so that an allocation inside a loop reuses the buffer of the
+    previous iteration instead of allocating a new one.  At most `max_bytes`
+    of free buffers are kept.
+    """
+
+    def __init__(self, max_bytes=1 << 26):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.free = dict()
+
+    def take(self, shape, dtype=float):
+        dtype = np.dtype(dtype)
+        if bufs := self.free.get((shape, dtype)):
+            buf = bufs.pop()
+            self.nbytes -= buf.nbytes
+            return buf
+        return np.empty(shape, dtype=dtype)
+
+    def give(self, buf):
+        if self.nbytes + buf.nbytes <= self.max_bytes:
+            self.free.setdefault((buf.shape, buf.dtype), []).append(buf)
+            self.nbytes += buf.nbytes
+
+    def clear(self):
+        self.free.clear()
+        self.nbytes = 0
 
 
 class Interpreter:
-    def __init__(self, proc, kwargs, use_randomization=False):
+    def __init__(self, proc, kwargs, use_randomization=False, pool=None):
         assert isinstance(proc, LoopIR.proc)
 
         self.proc = proc
         self.env = ChainMap()
         self.use_randomization = use_randomization
+        self.pool = BufferPool() if pool is None else pool
+        # the buffers allocated in the enclosing blocks, innermost last
+        self.live = []
 
         for a in proc.args:
             if not str(a.name) in kwargs:
@@ -39,7 +100,7 @@ class Interpreter:
                     )
                 self.env[a.name] = kwargs[str(a.name)]
             elif a.type is T.index:
-                if type(kwargs[str(a.name)]) is not T.index:
+                if not isinstance(kwargs[str(a.name)], int):
                     raise TypeError(
                         f"expected index variable '{a.name}' to be an integer"
                     )
@@ -50,13 +111,43 @@ class Interpreter:
                 self.env[a.name] = kwargs[str(a.name)]
             else:
                 assert a.type.is_numeric()
-                self.simple_typecheck_buffer(a, kwargs)
-                self.env[a.name] = kwargs[str(a.name)]
+                self.env[a.name] = self.simple_typecheck_buffer(a, kwargs)
 
+    def run(self):
         self.env.new_child()
-        self.eval_stmts(proc.body)
+        self.eval_stmts(self.proc.body)
         self.env.parents
 
+    def run_chunks(self, chunk):
+        """
+        Run the procedure, evaluating the iterations of its top-level loops
+        `chunk` at a time.  After every chunk, the memory-mapped arguments
+        are flushed, the free buffers are released, and `(iter, lo, hi)` is
+        yielded for the range of iterations `lo <= iter < hi` just finished.
+        """
+        if not is_pos_int(chunk):
+            raise TypeError("expected chunk to be a positive integer")
+
+        mark = len(self.live)
+        for s in self.proc.body:
+            if type(s) is not LoopIR.Seq:
+                self.eval_s(s)
+                continue
+
+            lo, hi = self.eval_e(s.lo), self.eval_e(s.hi)
+            for c_lo in range(lo, hi, chunk):
+                c_hi = min(c_lo + chunk, hi)
+                self.eval_loop(s, c_lo, c_hi)
+                self.flush()
+                yield str(s.iter), c_lo, c_hi
+        self.release(mark)
+
+    def flush(self):
+        for a in self.proc.args:
+            if isinstance(buf := self.env[a.name], np.memmap):
+                buf.flush()
+        self.pool.clear()
+
     def simple_typecheck_buffer(self, fnarg, kwargs):
         typ = fnarg.type
         buf = kwargs[str(fnarg.name)]
@@ -64,9 +155,19 @@ class Interpreter:
         # raise TypeError(f"type of argument '{a.name}' "
         #                 f"value mismatches")
         pre = f"bad argument '{nm}'"
+        flat = False
         if not isinstance(buf, np.ndarray):
-            raise TypeError(f"{pre}: expected numpy.ndarray")
-        elif buf.dtype != float and buf.dtype != np.float32 and buf.dtype != np.float16:
+            # wrap other buffers (e.g. a memoryview of a file) without copying
+            try:
+                buf = np.asarray(memoryview(buf))
+                flat = buf.ndim == 1
+            except TypeError:
+                raise TypeError(
+                    f"{pre}: expected numpy.ndarray or an object supporting "
+                    f"the buffer protocol"
+                )
+
+        if buf.dtype != float and buf.dtype != np.float32 and buf.dtype != np.float16:
             raise TypeError(
                 f"{pre}: expected buffer of floating-point values; "
                 f"had '{buf.dtype}' values"
@@ -82,20 +183,41 @@ class Interpreter:
                 )
         else:
             shape = self.eval_shape(typ)
-            if shape != tuple(buf.shape):
+            if flat and buf.size == np.prod(shape):
+                # flat buffers are viewed with the expected shape
+                buf = buf.reshape(shape)
+            elif shape != tuple(buf.shape):
                 raise TypeError(
                     f"{pre}: expected buffer of shape {shape}, "
                     f"but got shape {tuple(buf.shape)}"
                 )
 
+        return buf
+
     def eval_stmts(self, stmts):
+        mark = len(self.live)
         for s in stmts:
             self.eval_s(s)
+        self.release(mark)
+
+    def release(self, mark):
+        # the buffers allocated since `mark` went out of scope
+        for buf in self.live[mark:]:
+            self.pool.give(buf)
+        del self.live[mark:]
+
+    def eval_loop(self, s, lo, hi):
+        assert self.use_randomization is False, "TODO: Implement Rand"
+        self.env.new_child()
+        for itr in range(lo, hi):
+            self.env[s.iter] = itr
+            self.eval_stmts(s.body)
+        self.env.parents
 
     def eval_s(self, s):
         styp = type(s)
 
-        if styp is LoopIR.Pass:
+        if styp is LoopIR.Pass or styp is LoopIR.Free:
             pass
         elif styp is LoopIR.Assign or styp is LoopIR.Reduce:
             # lbuf[a0,a1,...] = rhs
@@ -120,26 +242,32 @@ class Interpreter:
                 self.eval_stmts(s.orelse)
                 self.env.parents
         elif styp is LoopIR.Seq:
-            lo = self.eval_e(s.lo)
-            hi = self.eval_e(s.hi)
-            assert self.use_randomization is False, "TODO: Implement Rand"
-            self.env.new_child()
-            for itr in range(lo, hi):
-                self.env[s.iter] = itr
-                self.eval_stmts(s.body)
-            self.env.parents
+            self.eval_loop(s, self.eval_e(s.lo), self.eval_e(s.hi))
         elif styp is LoopIR.Alloc:
             if s.type.is_real_scalar():
-                self.env[s.name] = np.empty([1])
+                size = (1,)
             else:
                 size = self.eval_shape(s.type)
-                # TODO: Maybe randomize?
-                self.env[s.name] = np.empty(size)
+            # TODO: Maybe randomize?
+            buf = self.pool.take(size)
+            self.live.append(buf)
+            self.env[s.name] = buf
         elif styp is LoopIR.Call:
             argvals = [self.eval_e(a, call_arg=True) for a in s.args]
             argnames = [str(a.name) for a in s.f.args]
             kwargs = {nm: val for nm, val in zip(argnames, argvals)}
-            Interpreter(s.f, kwargs, use_randomization=self.use_randomization)
+            callee = Interpreter(
+                s.f,
+                kwargs,
+                use_randomization=self.use_randomization,
+                pool=self.pool,
+            )
+            if impl := _instr_impls.get((s.f.name, s.f.instr)):
+                impl(*(callee.env[a.name] for a in s.f.args))
+            else:
+                callee.run()
+        elif styp is LoopIR.WindowStmt:
+            self.env[s.lhs] = self.eval_e(s.rhs)
         else:
             assert False, "bad case"
 
@@ -165,9 +293,10 @@ class Interpreter:
                 return lhs - rhs
             elif e.op == "*":
                 return lhs * rhs
-            elif e.op == "/":  # is this right?
+            elif e.op == "/":
+                # index division rounds down, as in the generated C
                 if isinstance(lhs, int):
-                    return (lhs + rhs - 1) // rhs
+                    return lhs // rhs
                 else:
                     return lhs / rhs
             elif e.op == "%":
@@ -191,6 +320,20 @@ class Interpreter:
             args = [self.eval_e(a) for a in e.args]
             return e.f.interpret(args)
 
+        elif etyp is LoopIR.WindowExpr:
+            # a view of the buffer, without copying
+            idx = tuple(
+                slice(self.eval_e(w.lo), self.eval_e(w.hi))
+                if isinstance(w, LoopIR.Interval)
+                else self.eval_e(w.pt)
+                for w in e.idx
+            )
+            return self.env[e.name][idx]
+
+        elif etyp is LoopIR.StrideExpr:
+            buf = self.env[e.name]
+            return buf.strides[e.dim] // buf.itemsize
+
         else:
             assert False, "bad case"
 
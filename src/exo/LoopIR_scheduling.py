@@ -274,17 +274,25 @@ def get_rest_of_block(c):
 # Take a conservative approach and allow stmt reordering only when they are
 # writing to different buffers
 # TODO: Do effectcheck's check_commutes-ish thing using SMT here
-def DoReorderStmt(f_cursor, s_cursor):
+# The Check* functions check the preconditions of the corresponding Do*
+# functions without rewriting anything, so that an operation which does not
+# apply is rejected before its rewrite runs; the Do* functions assume them.
+
+
+def CheckReorderStmt(f_cursor, s_cursor):
     if f_cursor.next() != s_cursor:
         raise SchedulingError(
             "expected the second statement to be directly after the first"
         )
     Check_ReorderStmts(f_cursor.get_root(), f_cursor._node, s_cursor._node)
+
+
+def DoReorderStmt(f_cursor, s_cursor):
     ir, fwd = s_cursor._move(f_cursor.before())
     return ir, fwd
 
 
-def DoPartitionLoop(stmt, partition_by):
+def CheckPartitionLoop(stmt, partition_by):
     s = stmt._node
 
     assert isinstance(s, LoopIR.Seq)
@@ -304,6 +312,12 @@ def DoPartitionLoop(stmt, partition_by):
             f"expected the new loop bound {new_hi} to be always non-negative"
         )
 
+
+def DoPartitionLoop(stmt, partition_by):
+    s = stmt._node
+    part_by = LoopIR.Const(partition_by, T.int, s.srcinfo)
+    new_hi = LoopIR.BinOp("-", s.hi, part_by, T.int, s.srcinfo)
+
     loop1 = Alpha_Rename([s.update(hi=part_by)]).result()[0]
 
     # all uses of the loop iteration in the second body need
@@ -323,7 +337,7 @@ def DoPartitionLoop(stmt, partition_by):
     return ir, fwd
 
 
-def DoProductLoop(outer_loop_c, new_name):
+def CheckProductLoop(outer_loop_c):
     body = outer_loop_c.body()
     outer_loop = outer_loop_c._node
 
@@ -332,8 +346,7 @@ def DoProductLoop(outer_loop_c, new_name):
             f"expected loop directly inside of {body[0]._node.iter} loop"
         )
 
-    inner_loop_c = body[0]
-    inner_loop = inner_loop_c._node
+    inner_loop = body[0]._node
     inner_hi = inner_loop.hi
 
     if not isinstance(inner_hi, LoopIR.Const):
@@ -347,7 +360,13 @@ def DoProductLoop(outer_loop_c, new_name):
             f"got {inner_loop.lo} and {outer_loop.lo}."
         )
 
-    # Only spend a name once the other parameters are validated
+
+def DoProductLoop(outer_loop_c, new_name):
+    outer_loop = outer_loop_c._node
+    inner_loop_c = outer_loop_c.body()[0]
+    inner_loop = inner_loop_c._node
+    inner_hi = inner_loop.hi
+
     new_var = Sym(new_name)
 
     # Construct replacement expressions
@@ -436,18 +455,54 @@ def DoMergeWrites(c1, c2):
 # Split scheduling directive
 
 
-def DoSplit(loop_cursor, quot, hi, lo, tail="guard", perfect=False):
+def CheckSplit(loop_cursor, quot, perfect):
     split_loop = loop_cursor._node
     N = split_loop.hi
-    hi_i = Sym(hi)
-    lo_i = Sym(lo)
-    srcinfo = split_loop.srcinfo
 
     if not is_const_zero(split_loop.lo):
         raise SchedulingError(
             f"expected the lower bound of the loop to be zero, got {split_loop.lo}."
         )
 
+    if not perfect:
+        return
+    elif not isinstance(N, LoopIR.Const):
+        is_N_divisible = False
+        for pred in loop_cursor.get_root().preds:
+            if (
+                isinstance(pred, LoopIR.BinOp)
+                and pred.op == "=="
+                and isinstance(pred.rhs, LoopIR.Const)
+                and pred.rhs.val == 0
+                and isinstance(pred.lhs, LoopIR.BinOp)
+                and pred.lhs.op == "%"
+                and isinstance(pred.lhs.rhs, LoopIR.Const)
+                and pred.lhs.rhs.val > 0
+                and pred.lhs.rhs.val % quot == 0
+                and isinstance(pred.lhs.lhs, LoopIR.Read)
+                and pred.lhs.lhs.name == split_loop.hi.name
+            ):
+                is_N_divisible = True
+
+        if not is_N_divisible:
+            raise SchedulingError(
+                f"cannot perfectly split the '{split_loop.iter}' loop."
+            )
+    elif N.val % quot != 0:
+        raise SchedulingError(
+            f"cannot perfectly split the '{split_loop.iter}' loop "
+            f"because {quot} does not evenly divide "
+            f"{N.val}"
+        )
+
+
+def DoSplit(loop_cursor, quot, hi, lo, tail="guard", perfect=False):
+    split_loop = loop_cursor._node
+    N = split_loop.hi
+    hi_i = Sym(hi)
+    lo_i = Sym(lo)
+    srcinfo = split_loop.srcinfo
+
     assert quot > 1
 
     def substitute(srcinfo):
@@ -497,37 +552,10 @@ def DoSplit(loop_cursor, quot, hi, lo, tail="guard", perfect=False):
     elif tail_strategy in ["cut", "cut_and_guard"]:
         hi_rng = szop("/", N, lo_rng)  # floor div
     elif tail_strategy == "perfect":
+        # CheckSplit made sure that `quot` divides N
         if not isinstance(N, LoopIR.Const):
-            is_N_divisible = False
-            for pred in loop_cursor.get_root().preds:
-                if (
-                    isinstance(pred, LoopIR.BinOp)
-                    and pred.op == "=="
-                    and isinstance(pred.rhs, LoopIR.Const)
-                    and pred.rhs.val == 0
-                    and isinstance(pred.lhs, LoopIR.BinOp)
-                    and pred.lhs.op == "%"
-                    and isinstance(pred.lhs.rhs, LoopIR.Const)
-                    and pred.lhs.rhs.val > 0
-                    and pred.lhs.rhs.val % quot == 0
-                    and isinstance(pred.lhs.lhs, LoopIR.Read)
-                    and pred.lhs.lhs.name == split_loop.hi.name
-                ):
-                    is_N_divisible = True
-
-            if not is_N_divisible:
-                raise SchedulingError(
-                    f"cannot perfectly split the '{split_loop.iter}' loop."
-                )
-
             hi_rng = boolop("/", N, cnst(quot), T.index)
         else:
-            if N.val % quot != 0:
-                raise SchedulingError(
-                    f"cannot perfectly split the '{split_loop.iter}' loop "
-                    f"because {quot} does not evenly divide "
-                    f"{N.val}"
-                )
             hi_rng = cnst(N.val // quot)
     else:
         assert False, f"bad tail strategy: {tail_strategy}"
@@ -587,12 +615,14 @@ def DoSplit(loop_cursor, quot, hi, lo, tail="guard", perfect=False):
 # Unroll scheduling directive
 
 
-def DoUnroll(c_loop):
+def CheckUnroll(c_loop):
     s = c_loop._node
-
     if not isinstance(s.hi, LoopIR.Const) or not isinstance(s.lo, LoopIR.Const):
         raise SchedulingError(f"expected loop '{s.iter}' to have constant bounds")
 
+
+def DoUnroll(c_loop):
+    s = c_loop._node
     iters = s.hi.val - s.lo.val
     orig_body = c_loop.body().resolve_all()
 
@@ -731,17 +761,22 @@ def DoSetTypAndMem(cursor, basetyp=None, win=None, mem=None):
 # Call Swap scheduling directive
 
 
-def DoCallSwap(call_cursor, new_subproc):
+def CheckCallSwap(call_cursor, new_subproc):
     call_s = call_cursor._node
     assert isinstance(call_s, LoopIR.Call)
 
-    is_eqv, configkeys = get_strictest_eqv_proc(call_s.f, new_subproc)
+    is_eqv, _ = get_strictest_eqv_proc(call_s.f, new_subproc)
     if not is_eqv:
         raise SchedulingError(
             f"{call_s.srcinfo}: Cannot swap call because the two "
             f"procedures are not equivalent"
         )
 
+
+def DoCallSwap(call_cursor, new_subproc):
+    call_s = call_cursor._node
+    _, configkeys = get_strictest_eqv_proc(call_s.f, new_subproc)
+
     s_new = call_s.update(f=new_subproc)
     ir = call_cursor.get_root()
     mod_cfg = Check_ExtendEqv(ir, [call_s], [s_new], configkeys)
@@ -975,6 +1010,42 @@ def DoBindExpr(new_name, expr_cursors, cse=False):
     return ir, fwd
 
 
+def CheckLiftLoop(inner_c):
+    """
+    Check that the loop `inner_c` can be lifted out of the loop around it,
+    i.e. that the two loops can be reordered.
+    """
+    inner_s = inner_c._node
+    outer_c = inner_c.parent()
+    outer_s = outer_c._node
+    assert isinstance(inner_s, LoopIR.Seq) and isinstance(outer_s, LoopIR.Seq)
+
+    if len(outer_s.body) > 1:
+        raise SchedulingError("expected for loop to be directly nested in parent")
+
+    reads = get_reads_of_expr(inner_s.lo) + get_reads_of_expr(inner_s.hi)
+    if outer_s.iter in [name for name, _ in reads]:
+        raise SchedulingError(
+            "inner loop's lo or hi depends on outer loop's iteration variable"
+        )
+
+    Check_ReorderLoops(inner_c.get_root(), outer_s)
+
+
+def DoLiftLoop(inner_c):
+    # for OUTER in _:          for INNER in _:
+    #   for INNER in _: A  ~>    for OUTER in _: A
+    outer_c = inner_c.parent()
+    ir, fwd = inner_c._move(outer_c.after())
+    ir, fwd_move = fwd(outer_c)._move(fwd(inner_c).body()[0].before())
+    fwd = _compose(fwd_move, fwd)
+    ir, fwd_move = fwd(inner_c).body()[1:]._move(fwd(outer_c).body()[0].after())
+    fwd = _compose(fwd_move, fwd)
+    ir, fwd_del = fwd(outer_c).body()[0]._delete()
+    fwd = _compose(fwd_del, fwd)
+    return ir, fwd
+
+
 def DoLiftScope(inner_c):
     inner_s = inner_c._node
     assert isinstance(inner_s, (LoopIR.If, LoopIR.Seq))
@@ -1097,23 +1168,8 @@ def DoLiftScope(inner_c):
                 ir, fwd_wrap = fwd(inner_c).orelse()._wrap(loop_wrapper, "body")
                 fwd = _compose(fwd_wrap, fwd)
         elif isinstance(inner_s, LoopIR.Seq):
-            # for OUTER in _:          for INNER in _:
-            #   for INNER in _: A  ~>    for OUTER in _: A
-            reads = get_reads_of_expr(inner_s.lo) + get_reads_of_expr(inner_s.hi)
-            if outer_s.iter in [name for name, _ in reads]:
-                raise SchedulingError(
-                    "inner loop's lo or hi depends on outer loop's iteration variable"
-                )
-
-            Check_ReorderLoops(inner_c.get_root(), outer_s)
-            ir, fwd = inner_c._move(outer_c.after())
-            ir, fwd_move = fwd(outer_c)._move(fwd(inner_c).body()[0].before())
-            fwd = _compose(fwd_move, fwd)
-            ir, fwd_move = fwd(inner_c).body()[1:]._move(fwd(outer_c).body()[0].after())
-            fwd = _compose(fwd_move, fwd)
-            ir, fwd_del = fwd(outer_c).body()[0]._delete()
-            fwd = _compose(fwd_del, fwd)
-            return ir, fwd
+            CheckLiftLoop(inner_c)
+            return DoLiftLoop(inner_c)
 
     ir, fwd_move = fwd(inner_c)._move(fwd(outer_c).after())
     fwd = _compose(fwd_move, fwd)
@@ -1887,7 +1943,7 @@ def _is_idempotent(stmts):
     return all(_stmt(s) for s in stmts)
 
 
-def DoRemoveLoop(loop):
+def CheckRemoveLoop(loop):
     s = loop._node
 
     # Check if we can remove the loop. Conditions are:
@@ -1900,6 +1956,10 @@ def DoRemoveLoop(loop):
     # 2. Body is idempotent
     Check_IsIdempotent(loop.get_root(), [s])
 
+
+def DoRemoveLoop(loop):
+    s = loop._node
+
     # 3. The loop runs at least once;
     #    If not, then place a guard around the statement
     ir, fwd = loop.get_root(), lambda x: x
@@ -2391,6 +2451,263 @@ def DoDeleteConfig(proc_cursor, config_cursor):
     return p, fwd, eq_mod_config
 
 
+# --------------------------------------------------------------------------- #
+# Redundant configuration writes
+
+# Configuration writes are `WriteConfig` statements and calls to procedures
+# (typically accelerator configuration instructions) whose bodies consist of
+# `WriteConfig` statements only.  Their values are tracked syntactically:
+# a write of an expression which is equal to the one last written to the
+# field, and whose free variables and configuration fields have not changed
+# since, leaves the configuration unchanged and can be deleted.
+
+
+class _ConfigRW(LoopIR_Do):
+    # the configuration fields (as symbols) read and written by statements
+    def __init__(self, nodes):
+        self.reads, self.writes = set(), set()
+        for n in nodes:
+            if isinstance(n, LoopIR.stmt):
+                self.do_s(n)
+            else:
+                self.do_e(n)
+
+    def do_s(self, s):
+        if isinstance(s, LoopIR.WriteConfig):
+            self.writes.add(s.config._INTERNAL_sym(s.field))
+        elif isinstance(s, LoopIR.Call):
+            self.do_stmts(s.f.body)
+        super().do_s(s)
+
+    def do_e(self, e):
+        if isinstance(e, LoopIR.ReadConfig):
+            self.reads.add(e.config._INTERNAL_sym(e.field))
+        super().do_e(e)
+
+
+def _same_expr(e1, e2):
+    if type(e1) is not type(e2):
+        return False
+    elif isinstance(e1, LoopIR.Read):
+        return (
+            e1.name == e2.name
+            and len(e1.idx) == len(e2.idx)
+            and all(map(_same_expr, e1.idx, e2.idx))
+        )
+    elif isinstance(e1, LoopIR.Const):
+        return e1.val == e2.val and e1.type == e2.type
+    elif isinstance(e1, LoopIR.USub):
+        return _same_expr(e1.arg, e2.arg)
+    elif isinstance(e1, LoopIR.BinOp):
+        return (
+            e1.op == e2.op and _same_expr(e1.lhs, e2.lhs) and _same_expr(e1.rhs, e2.rhs)
+        )
+    elif isinstance(e1, LoopIR.StrideExpr):
+        return e1.name == e2.name and e1.dim == e2.dim
+    elif isinstance(e1, LoopIR.ReadConfig):
+        return e1.config == e2.config and e1.field == e2.field
+    return False
+
+
+def _is_scalar_expr(e):
+    # expressions whose value only depends on variables (including scalar
+    # buffers) and config fields, whose changes are easy to track
+    if isinstance(e, LoopIR.Read):
+        return not e.idx and not e.type.is_tensor_or_window()
+    elif isinstance(e, LoopIR.USub):
+        return _is_scalar_expr(e.arg)
+    elif isinstance(e, LoopIR.BinOp):
+        return _is_scalar_expr(e.lhs) and _is_scalar_expr(e.rhs)
+    return isinstance(e, (LoopIR.Const, LoopIR.StrideExpr, LoopIR.ReadConfig))
+
+
+def _buffer_writes(stmts):
+    return {name for name, _ in get_writes_of_stmts(stmts)}
+
+
+def _config_stmt_writes(s):
+    """
+    The (field, value) pairs written in order by the configuration write `s`,
+    or None if `s` is not a configuration write.
+    """
+    if isinstance(s, LoopIR.WriteConfig):
+        return [(s.config._INTERNAL_sym(s.field), s.rhs)]
+    elif (
+        isinstance(s, LoopIR.Call)
+        and s.f.body
+        and all(isinstance(b, LoopIR.WriteConfig) for b in s.f.body)
+        and not any(isinstance(a, LoopIR.WindowExpr) for a in s.args)
+    ):
+        binding = {fa.name: a for fa, a in zip(s.f.args, s.args)}
+        rhss = SubstArgs([b.rhs for b in s.f.body], binding).result()
+        return [
+            (b.config._INTERNAL_sym(b.field), rhs) for b, rhs in zip(s.f.body, rhss)
+        ]
+    return None
+
+
+def _redundant_config_writes(stmts):
+    # forward dataflow of the known values of the configuration fields
+    redundant = []
+
+    def kill(known, fields, bufs=frozenset()):
+        return {
+            f: e
+            for f, e in known.items()
+            if f not in fields
+            and not _ConfigRW([e]).reads & fields
+            and not _FV([e]) & bufs
+        }
+
+    def meet(known1, known2):
+        return {
+            f: e for f, e in known1.items() if f in known2 and _same_expr(e, known2[f])
+        }
+
+    def do_stmts(stmts, known):
+        for s in stmts:
+            known = do_s(s, known)
+        return known
+
+    def do_s(s, known):
+        if (writes := _config_stmt_writes(s)) is not None:
+            unchanged = True
+            for f, rhs in writes:
+                if f in known and _same_expr(known[f], rhs):
+                    continue
+                unchanged = False
+                known = kill(known, {f})
+                if _is_scalar_expr(rhs) and f not in _ConfigRW([rhs]).reads:
+                    known[f] = rhs
+            if unchanged:
+                redundant.append(s)
+            return known
+        elif isinstance(s, LoopIR.If):
+            return meet(do_stmts(s.body, known), do_stmts(s.orelse, known))
+        elif isinstance(s, LoopIR.Seq):
+            # the values known in every iteration, and after zero iterations
+            entry = kill(known, _ConfigRW(s.body).writes, _buffer_writes(s.body))
+            return meet(known, do_stmts(s.body, entry))
+        elif isinstance(s, (LoopIR.Assign, LoopIR.Reduce, LoopIR.Call)):
+            return kill(known, _ConfigRW([s]).writes, _buffer_writes([s]))
+        return known
+
+    do_stmts(stmts, dict())
+    return redundant
+
+
+def _bound_syms(stmts):
+    syms = set()
+    for s in stmts:
+        if isinstance(s, LoopIR.Alloc):
+            syms.add(s.name)
+        elif isinstance(s, LoopIR.WindowStmt):
+            syms.add(s.lhs)
+        elif isinstance(s, LoopIR.If):
+            syms |= _bound_syms(s.body) | _bound_syms(s.orelse)
+        elif isinstance(s, LoopIR.Seq):
+            syms |= {s.iter} | _bound_syms(s.body)
+    return syms
+
+
+def _hoistable_config_write(loop):
+    """
+    The index of a configuration write in the body of `loop` which can be
+    moved before the loop: it writes the same values in every iteration
+    (nothing in the loop changes the variables and fields they depend on),
+    nothing else in the loop writes its fields, and nothing before it in the
+    body (or the loop bounds) reads them.
+    """
+    bound = _bound_syms([loop]) | _buffer_writes(loop.body)
+    header = _ConfigRW([loop.lo, loop.hi])
+    for i, s in enumerate(loop.body):
+        if (writes := _config_stmt_writes(s)) is None:
+            continue
+        fields = {f for f, _ in writes}
+        rhs_reads = _ConfigRW([rhs for _, rhs in writes]).reads
+        before = _ConfigRW(loop.body[:i])
+        others = _ConfigRW(loop.body[:i] + loop.body[i + 1 :])
+        if (
+            all(_is_scalar_expr(rhs) for _, rhs in writes)
+            and not _FV([s]) & bound
+            and not fields & (before.reads | others.writes | header.reads)
+            and not rhs_reads & (fields | others.writes)
+        ):
+            return i
+    return None
+
+
+def _find_hoistable_config_write(block):
+    # innermost loops first
+    for c in block:
+        s = c._node
+        if isinstance(s, LoopIR.If):
+            blocks = [c.body()] + ([c.orelse()] if s.orelse else [])
+            for b in blocks:
+                if found := _find_hoistable_config_write(b):
+                    return found
+        elif isinstance(s, LoopIR.Seq):
+            if found := _find_hoistable_config_write(c.body()):
+                return found
+            if (i := _hoistable_config_write(s)) is not None:
+                return c, c.body()[i]
+    return None
+
+
+def _find_stmts(block, stmts):
+    ids = {id(s) for s in stmts}
+    found = []
+    for c in block:
+        if id(c._node) in ids:
+            found.append(c)
+        if isinstance(c._node, (LoopIR.If, LoopIR.Seq)):
+            found += _find_stmts(c.body(), stmts)
+        if isinstance(c._node, LoopIR.If) and c._node.orelse:
+            found += _find_stmts(c.orelse(), stmts)
+    return found
+
+
+def DoEliminateConfigWrites(proc_cursor):
+    ir, fwd = proc_cursor._node, lambda x: x
+    n_deleted, n_hoisted = 0, 0
+    while True:
+        # delete the writes which leave the configuration unchanged
+        redundant = _redundant_config_writes(ir.body)
+        cur_fwd = lambda x: x
+        for c in _find_stmts(ic.Cursor.create(ir).body(), redundant):
+            ir, fwd_del = cur_fwd(c)._delete()
+            cur_fwd = _compose(fwd_del, cur_fwd)
+        fwd = _compose(cur_fwd, fwd)
+        n_deleted += len(redundant)
+
+        # hoist a loop-invariant write out of its loop, which may make
+        # other writes redundant
+        found = _find_hoistable_config_write(ic.Cursor.create(ir).body())
+        if not found:
+            return ir, fwd, n_deleted, n_hoisted
+        loop_c, write_c = found
+        loop, write = loop_c._node, write_c._node
+        try:
+            trips = LoopIR.BinOp("-", loop.hi, loop.lo, T.index, loop.srcinfo)
+            Check_IsPositiveExpr(ir, [loop], trips)
+            runs = True
+        except SchedulingError:
+            runs = False
+
+        ir, fwd_move = write_c._move(loop_c.before())
+        fwd = _compose(fwd_move, fwd)
+        if not runs:
+            # keep the write from happening when the loop does not run
+            cond = LoopIR.BinOp("<", loop.lo, loop.hi, T.bool, loop.srcinfo)
+
+            def wrapper(body):
+                return LoopIR.If(cond, body, [], None, write.srcinfo)
+
+            ir, fwd_wrap = fwd_move(write_c).as_block()._wrap(wrapper, "body")
+            fwd = _compose(fwd_wrap, fwd)
+        n_hoisted += 1
+
+
 class DoDeletePass(Cursor_Rewrite):
     def __init__(self, proc_cursor):
         super().__init__(proc_cursor)
@@ -3754,18 +4071,26 @@ __all__ = [
     "DoSimplify",
     "DoSetTypAndMem",
     "DoInsertPass",
+    "CheckReorderStmt",
     "DoReorderStmt",
     "DoCommuteExpr",
     "DoSpecialize",
+    "CheckSplit",
     "DoSplit",
+    "CheckUnroll",
     "DoUnroll",
     "DoAddLoop",
+    "CheckPartitionLoop",
     "DoPartitionLoop",
+    "CheckProductLoop",
     "DoProductLoop",
+    "CheckRemoveLoop",
     "DoRemoveLoop",
     "DoLiftAllocSimple",
     "DoLiftConstant",
     "DoLiftScope",
+    "CheckLiftLoop",
+    "DoLiftLoop",
     "DoFissionAfterSimple",
     "DoMergeWrites",
     "DoFuseIf",
@@ -3779,6 +4104,7 @@ __all__ = [
     "DoMultiplyDim",
     "DoRearrangeDim",
     "DoInline",
+    "CheckCallSwap",
     "DoCallSwap",
     "DoBindConfig",
     "DoConfigWrite",
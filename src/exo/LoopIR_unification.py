@@ -1,7 +1,8 @@
 import functools
 import itertools
 import re
-from collections import ChainMap
+from collections import ChainMap, defaultdict
+from fractions import Fraction
 
 import pysmt
 from asdl_adt import ADT
@@ -269,120 +270,282 @@ def sub(x, y):
 
 @extclass(UEq.problem)
 def solve(prob):
-    solver = _get_smt_solver()
-
-    known_list = prob.knowns
-    known_idx = {k: i for i, k in enumerate(known_list)}
-    hole_idx = {k: i for i, k in enumerate(prob.holes)}
-    Nk = len(known_list)
+    """
+    Find an assignment of the holes to affine combinations of the knowns
+    (and of the case variables to case indices) satisfying all of the
+    predicates, or return `None` if there is none.
+
+    The problem is first renamed into a canonical form which only depends
+    on the positions of the holes and knowns, so that the solutions of
+    structurally identical problems (e.g. the same instruction unified at
+    different sites) are memoized.
+    """
+    holes, knowns = prob.holes, prob.knowns
+    ids = {x: (_HOLE, i) for i, x in enumerate(holes)}
+    ids.update({x: (_KNOWN, i) for i, x in enumerate(knowns)})
 
-    var_set = dict()
-    case_set = dict()
+    def canon_id(x):
+        if x not in ids:
+            ids[x] = (_OTHER, len(ids))
+        return ids[x]
 
-    def get_var(x):
-        if x in var_set:
-            return var_set[x]
+    def canon_p(p):
+        if isinstance(p, UEq.Eq):
+            coeffs, off = _affine_terms(p.lhs.sub(p.rhs))
+            terms = sorted((canon_id(x), c) for x, c in coeffs.items() if c != 0)
+            return ("eq", tuple(terms), off)
+        elif isinstance(p, UEq.Conj):
+            return ("and", *map(canon_p, p.preds))
+        elif isinstance(p, UEq.Disj):
+            return ("or", *map(canon_p, p.preds))
+        elif isinstance(p, UEq.Cases):
+            return ("cases", canon_id(p.case_var), *map(canon_p, p.cases))
         else:
-            vec = [SMT.Symbol(f"{repr(x)}_{repr(k)}", SMT.INT) for k in known_list] + [
-                SMT.Symbol(f"{repr(x)}_const", SMT.INT)
-            ]
-            var_set[x] = vec
-            return vec
-
-    def get_case(x):
-        if x not in case_set:
-            case_set[x] = SMT.Symbol(f"{repr(x)}", SMT.INT)
-        return case_set[x]
-
-    # initialize all hole variables, ensuring they are defined
-    for x in prob.holes:
-        get_var(x)
-
-    def lower_e(e):
+            assert False, "bad case"
+
+    preds = tuple(canon_p(p) for p in prob.preds)
+    result = _solve_canonical(len(holes), len(knowns), preds)
+    if result is None:
+        return None
+
+    hole_vals, case_vals = result
+    solutions = dict()
+    for hole_var, x_vals in zip(holes, hole_vals):
+        expr = None
+        for xx, v in zip(knowns, x_vals):
+            if v == 0:
+                continue
+            elif v == 1:
+                term = UEq.Var(xx)
+            else:
+                term = UEq.Scale(v, UEq.Var(xx))
+
+            expr = term if expr is None else UEq.Add(expr, term)
+
+        # constant offset
+        off = UEq.Const(x_vals[-1])
+        expr = off if expr is None else UEq.Add(expr, off)
+
+        solutions[hole_var] = expr
+
+    # report on case decisions
+    case_syms = {i: x for x, i in ids.items()}
+    for i, val in case_vals:
+        solutions[case_syms[i]] = val
+
+    return solutions
+
+
+_HOLE, _KNOWN, _OTHER = 0, 1, 2
+
+# Beyond this many combinations of cases, enumerating them and solving each
+# linear system is not worth it compared to asking the SMT solver.
+_MAX_CASE_COMBINATIONS = 256
+
+
+def _affine_terms(e):
+    coeffs = defaultdict(int)
+    off = 0
+
+    def visit(e, scale):
+        nonlocal off
         if isinstance(e, UEq.Const):
-            return ([SMT.Int(0)] * Nk) + [SMT.Int(e.val)]
+            off += scale * e.val
         elif isinstance(e, UEq.Var):
-            if e.name in known_idx:
-                one_hot = [SMT.Int(0)] * (Nk + 1)
-                one_hot[known_idx[e.name]] = SMT.Int(1)
-                return one_hot
-            elif e.name in hole_idx:
-                return get_var(e.name)
-            else:
-                raise UnificationError(
-                    f"Unable to cancel variable '{e.name}' from both sides "
-                    f"of a unification equation"
-                )
+            coeffs[e.name] += scale
         elif isinstance(e, UEq.Add):
-            lhs = lower_e(e.lhs)
-            rhs = lower_e(e.rhs)
-            return [SMT.Plus(x, y) for x, y in zip(lhs, rhs)]
+            visit(e.lhs, scale)
+            visit(e.rhs, scale)
         elif isinstance(e, UEq.Scale):
-            arg = lower_e(e.e)
-            return [SMT.Times(SMT.Int(e.coeff), a) for a in arg]
+            visit(e.e, scale * e.coeff)
         else:
             assert False, "bad case"
 
-    def lower_p(p):
-        if isinstance(p, UEq.Eq):
-            diff = p.lhs.sub(p.rhs).normalize()
-            try:
-                es = lower_e(diff)
-                return SMT.And(*[SMT.Equals(x, SMT.Int(0)) for x in es])
-            except UnificationError:
-                return SMT.FALSE()
-        elif isinstance(p, UEq.Conj):
-            return SMT.And(*[lower_p(pp) for pp in p.preds])
-        elif isinstance(p, UEq.Disj):
-            return SMT.Or(*[lower_p(pp) for pp in p.preds])
-        elif isinstance(p, UEq.Cases):
-            case_var = get_case(p.case_var)
+    visit(e, 1)
+    return coeffs, off
+
+
+class _NeedsSMT(Exception):
+    pass
+
+
+@functools.lru_cache(maxsize=4096)
+def _solve_canonical(n_holes, n_knowns, preds):
+    """
+    Solve a problem in the canonical form built by `solve`.  Returns `None`
+    or a pair of the coefficients of every hole (one per known, then the
+    constant offset) and of the `(case variable id, case index)` decisions.
+    """
+    try:
+        return _solve_linear(n_holes, n_knowns, preds)
+    except _NeedsSMT:
+        return _solve_smt(n_holes, n_knowns, preds)
+
+
+def _solve_linear(n_holes, n_knowns, preds):
+    # Each equation constrains every component (knowns and constant) of the
+    # holes separately, with the same coefficients on the holes.  Hence a
+    # conjunction of equations is a linear system with one right-hand side
+    # per component, which we solve by Gaussian elimination for each choice
+    # of cases, in order.
+    case_vars = dict()
+
+    def find_cases(p):
+        if p[0] == "or":
+            raise _NeedsSMT()
+        elif p[0] == "and":
+            for pp in p[1:]:
+                find_cases(pp)
+        elif p[0] == "cases":
+            case_vars[p[1]] = len(p) - 2
+            for pp in p[2:]:
+                find_cases(pp)
+
+    for p in preds:
+        find_cases(p)
+
+    case_list = list(case_vars)
+    n_combinations = 1
+    for n_cases in case_vars.values():
+        n_combinations *= n_cases
+    if n_combinations > _MAX_CASE_COMBINATIONS:
+        raise _NeedsSMT()
+
+    def flatten(p, choice, eqs):
+        if p[0] == "eq":
+            eqs.append(p)
+        elif p[0] == "and":
+            for pp in p[1:]:
+                flatten(pp, choice, eqs)
+        else:
+            flatten(p[2 + choice[p[1]]], choice, eqs)
+        return eqs
+
+    for cases in itertools.product(*(range(case_vars[c]) for c in case_list)):
+        choice = dict(zip(case_list, cases))
+        eqs = []
+        for p in preds:
+            flatten(p, choice, eqs)
+
+        hole_vals = _solve_eqs(n_holes, n_knowns, eqs)
+        if hole_vals is not None:
+            return hole_vals, tuple(choice.items())
+
+    return None
+
+
+def _solve_eqs(n_holes, n_knowns, eqs):
+    rows = []
+    for _, terms, off in eqs:
+        coeffs = [Fraction(0)] * n_holes
+        rhs = [Fraction(0)] * (n_knowns + 1)
+        rhs[-1] = Fraction(-off)
+        for (kind, i), c in terms:
+            if kind == _HOLE:
+                coeffs[i] = Fraction(c)
+            elif kind == _KNOWN:
+                rhs[i] = Fraction(-c)
+            else:
+                # variables which are neither holes nor knowns can't be
+                # cancelled, so the equation can't hold
+                return None
+        rows.append((coeffs, rhs))
+
+    # reduce to row echelon form
+    pivots = []
+    r = 0
+    for col in range(n_holes):
+        pivot = next((i for i in range(r, len(rows)) if rows[i][0][col] != 0), None)
+        if pivot is None:
+            continue
+        rows[r], rows[pivot] = rows[pivot], rows[r]
+        p_coeffs, p_rhs = rows[r]
+        for i in range(len(rows)):
+            if i == r or rows[i][0][col] == 0:
+                continue
+            f = rows[i][0][col] / p_coeffs[col]
+            coeffs, rhs = rows[i]
+            rows[i] = (
+                [a - f * b for a, b in zip(coeffs, p_coeffs)],
+                [a - f * b for a, b in zip(rhs, p_rhs)],
+            )
+        pivots.append(col)
+        r += 1
+
+    # 0 = rhs rows left over must be trivial
+    for _, rhs in rows[r:]:
+        if any(v != 0 for v in rhs):
+            return None
+
+    # free holes are set to 0
+    hole_vals = [[0] * (n_knowns + 1) for _ in range(n_holes)]
+    for (coeffs, rhs), col in zip(rows, pivots):
+        for j, v in enumerate(rhs):
+            v /= coeffs[col]
+            if v.denominator != 1:
+                # there may still be an integer solution with different
+                # values for the free holes
+                raise _NeedsSMT()
+            hole_vals[col][j] = int(v)
+
+    return tuple(map(tuple, hole_vals))
 
-            def per_case(i, c):
-                pp = lower_p(c)
-                is_case = SMT.Equals(case_var, SMT.Int(i))
-                return SMT.And(is_case, pp)
 
-            disj = SMT.Or(*[per_case(i, c) for i, c in enumerate(p.cases)])
+def _solve_smt(n_holes, n_knowns, preds):
+    solver = _get_smt_solver()
+
+    hole_vars = [
+        [SMT.Symbol(f"hole{i}_known{j}", SMT.INT) for j in range(n_knowns)]
+        + [SMT.Symbol(f"hole{i}_const", SMT.INT)]
+        for i in range(n_holes)
+    ]
+    case_vars = dict()
+
+    def lower_p(p):
+        if p[0] == "eq":
+            _, terms, off = p
+            comps = [[] for _ in range(n_knowns + 1)]
+            comps[-1].append(SMT.Int(off))
+            for (kind, i), c in terms:
+                if kind == _HOLE:
+                    for comp, x in zip(comps, hole_vars[i]):
+                        comp.append(SMT.Times(SMT.Int(c), x))
+                elif kind == _KNOWN:
+                    comps[i].append(SMT.Int(c))
+                else:
+                    return SMT.FALSE()
+            return SMT.And(
+                *[SMT.Equals(SMT.Plus(*comp), SMT.Int(0)) for comp in comps if comp]
+            )
+        elif p[0] == "and":
+            return SMT.And(*map(lower_p, p[1:]))
+        elif p[0] == "or":
+            return SMT.Or(*map(lower_p, p[1:]))
+        elif p[0] == "cases":
+            case_var = case_vars.setdefault(p[1], SMT.Symbol(f"case{p[1][1]}", SMT.INT))
+            disj = SMT.Or(
+                *[
+                    SMT.And(SMT.Equals(case_var, SMT.Int(i)), lower_p(c))
+                    for i, c in enumerate(p[2:])
+                ]
+            )
             case_lo = SMT.GE(case_var, SMT.Int(0))
-            case_hi = SMT.LT(case_var, SMT.Int(len(p.cases)))
+            case_hi = SMT.LT(case_var, SMT.Int(len(p) - 2))
             return SMT.And(disj, case_lo, case_hi)
         else:
             assert False, "bad case"
 
-    prob_pred = SMT.And(*[lower_p(p) for p in prob.preds])
+    prob_pred = SMT.And(*map(lower_p, preds))
     if not solver.is_sat(prob_pred):
         return None
-    else:
-        solutions = dict()
-        for hole_var in prob.holes:
-            x_syms = get_var(hole_var)
-            x_val_dict = solver.get_py_values(x_syms)
-            x_vals = [x_val_dict[x_sym] for x_sym in x_syms]
-            expr = None
-            for xx, v in zip(known_list, x_vals):
-                v = int(v)
-                if v == 0:
-                    continue
-                elif v == 1:
-                    term = UEq.Var(xx)
-                else:
-                    term = UEq.Scale(v, UEq.Var(xx))
-
-                expr = term if expr is None else UEq.Add(expr, term)
-
-            # constant offset
-            off = UEq.Const(int(x_vals[-1]))
-            expr = off if expr is None else UEq.Add(expr, off)
-
-            solutions[hole_var] = expr
 
-        # report on case decisions
-        for x in case_set:
-            val = solver.get_py_value(case_set[x])
-            solutions[x] = int(val)
+    hole_vals = []
+    for x_syms in hole_vars:
+        x_val_dict = solver.get_py_values(x_syms)
+        hole_vals.append(tuple(int(x_val_dict[x]) for x in x_syms))
 
-        return solutions
+    case_vals = tuple((c, int(solver.get_py_value(v))) for c, v in case_vars.items())
+    return tuple(hole_vals), case_vals
 
 
 # --------------------------------------------------------------------------- #
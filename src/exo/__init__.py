@@ -2,12 +2,24 @@ from .API import (
     Procedure,
     compile_procs,
     compile_procs_to_strings,
+    save_procs,
+    load_procs,
+    schedule_procs,
     proc,
     instr,
     config,
     ExoType,
 )
 from .LoopIR_scheduling import SchedulingError
+from .solver_limits import (
+    SMTLimits,
+    SMTLimitError,
+    get_smt_limits,
+    set_smt_limits,
+    smt_limits,
+    smt_limit_report,
+)
+from .solver_service import SolverService, use_solver_service
 from .parse_fragment import ParseFragmentError
 from .configs import Config
 from .memory import Memory, DRAM
@@ -21,6 +33,9 @@ __all__ = [
     "Procedure",
     "compile_procs",
     "compile_procs_to_strings",
+    "save_procs",
+    "load_procs",
+    "schedule_procs",
     "proc",
     "instr",
     "config",
@@ -29,6 +44,14 @@ __all__ = [
     "DRAM",
     "QAST",
     "SchedulingError",
+    "SMTLimits",
+    "SMTLimitError",
+    "get_smt_limits",
+    "set_smt_limits",
+    "smt_limits",
+    "smt_limit_report",
+    "SolverService",
+    "use_solver_service",
     "ParseFragmentError",
     #
     "stdlib",
@@ -1,4 +1,6 @@
-import math
+import numpy as np
+
+from .libs.memories import AVX2, AVX512
 
 
 # --------------------------------------------------------------------------- #
@@ -33,135 +35,152 @@ class BuiltIn:
     def interpret(self, args):
         raise NotImplementedError()
 
-    def compile(self, args):
+    def compile(self, args, prec):
+        """
+        C code for a call to the builtin on the C expressions `args`,
+        computing in the C type `prec`.
+        """
         raise NotImplementedError()
 
-
-class _Sin(BuiltIn):
-    def __init__(self):
-        super().__init__("sin")
-
-    def typecheck(self, args):
-        if len(args) != 1:
-            raise _BErr(f"expected 1 argument, got {len(args)}")
-
-        atyp = args[0].type
-        if not atyp.is_real_scalar():
-            raise _BErr(
-                f"expected argument 1 to be a real scalar value, but "
-                f"got type {atyp}"
-            )
-        return atyp
-
-    def globl(self):
-        return "#include <math.h>"
-
-    def interpret(self, args):
-        return math.sin(args[0])
-
-    def compile(self, args):
-        return f"sin((double)*{args[0]})"
-
-
-sin = _Sin()
-
-
-class _Relu(BuiltIn):
-    def __init__(self):
-        super().__init__("relu")
-
-    def typecheck(self, args):
-        if len(args) != 1:
-            raise _BErr(f"expected 1 argument, got {len(args)}")
-
-        atyp = args[0].type
-        if not atyp.is_real_scalar():
-            raise _BErr(
-                f"expected argument 1 to be a real scalar value, but "
-                f"got type {atyp}"
-            )
-        return atyp
-
-    def globl(self):
-        s = (
-            "double _relu_(double x) {\n"
-            "    if (x > 0.0) return x;\n"
-            "    else return 0.0;\n"
-            "}\n"
+    def vector_compile(self, args, mem, prec):
+        """
+        C code for a call to the builtin on the vector registers `args` of
+        the memory `mem`, holding values of the C type `prec`; used to write
+        the instructions which lower the builtin to vectors.
+        """
+        raise NotImplementedError(
+            f"no {mem.name()} implementation of {self.name()} for {prec}"
         )
-        return s
-
-    def interpret(self, args):
-        if args[0] > 0:
-            return args[0]
-        else:
-            return 0
-
-    def compile(self, args):
-        return f"_relu_((double)*{args[0]})"
-
 
-relu = _Relu()
 
-
-class _Select(BuiltIn):
-    def __init__(self):
-        super().__init__("select")
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Elementwise functions of real scalars
+
+
+class _RealBuiltIn(BuiltIn):
+    """
+    A builtin computing a function of `nargs` real scalars, whose type is the
+    type of its last argument.
+
+    `c_impls` maps C types to C expressions over the arguments `{0}`, `{1}`,
+    ... computing the function in that precision; other precisions compute
+    in double.  `helpers` are the static inline C functions which these
+    expressions call.  `np_impl` computes the function with NumPy, on scalars
+    or elementwise on arrays, and `vector_impls` maps pairs of a vector
+    memory and a C type to intrinsics over registers of that memory.
+    """
+
+    def __init__(
+        self,
+        name,
+        nargs,
+        np_impl,
+        c_impls,
+        helpers=(),
+        includes=("#include <math.h>",),
+        vector_impls=None,
+    ):
+        super().__init__(name)
+        assert "double" in c_impls
+        self.nargs = nargs
+        self.np_impl = np_impl
+        self.c_impls = c_impls
+        self.helpers = helpers
+        self.includes = includes
+        self.vector_impls = vector_impls or dict()
 
     def typecheck(self, args):
-        if len(args) != 4:
-            raise _BErr(f"expected 4 arguments, got {len(args)}")
-
-        atyp = args[0].type
-        if not atyp.is_real_scalar():
-            raise _BErr(
-                f"expected argument 1 to be a real scalar value, but "
-                f"got type {atyp}"
-            )
-
-        atyp = args[1].type
-        if not atyp.is_real_scalar():
-            raise _BErr(
-                f"expected argument 2 to be a real scalar value, but "
-                f"got type {atyp}"
-            )
-
-        atyp = args[2].type
-        if not atyp.is_real_scalar():
-            raise _BErr(
-                f"expected argument 3 to be a real scalar value, but "
-                f"got type {atyp}"
-            )
-
-        atyp = args[3].type
-        if not atyp.is_real_scalar():
-            raise _BErr(
-                f"expected argument 4 to be a real scalar value, but "
-                f"got type {atyp}"
-            )
-        return atyp
+        if len(args) != self.nargs:
+            s = "" if self.nargs == 1 else "s"
+            raise _BErr(f"expected {self.nargs} argument{s}, got {len(args)}")
+
+        for i, a in enumerate(args):
+            if not a.type.is_real_scalar():
+                raise _BErr(
+                    f"expected argument {i + 1} to be a real scalar value, but "
+                    f"got type {a.type}"
+                )
+        return args[-1].type
 
     def globl(self):
-        s = (
-            "double _select_(double x, double v, double y, double z) {\n"
-            "    if (x < v) return y;\n"
-            "    else return z;\n"
-            "}\n"
-        )
-        return s
+        return "\n".join([*self.includes, *self.helpers])
 
     def interpret(self, args):
-        x = args[0]
-        v = args[1]
-        y = args[2]
-        z = args[3]
-        if x < v:
-            return y
-        else:
-            return z
-
-    def compile(self, args):
-        return f"_select_((double)*{args[0]}, (double)*{args[1]}, (double)*{args[2]}, (double)*{args[3]})"
-
-
-select = _Select()
+        with np.errstate(over="ignore"):
+            return self.np_impl(*args)
+
+    def compile(self, args, prec):
+        if impl := self.c_impls.get(prec):
+            return impl.format(*args)
+        return self.c_impls["double"].format(*(f"(double)({a})" for a in args))
+
+    def vector_compile(self, args, mem, prec):
+        if impl := self.vector_impls.get((mem, prec)):
+            return impl.format(*args)
+        return super().vector_compile(args, mem, prec)
+
+
+sin = _RealBuiltIn("sin", 1, np.sin, {"float": "sinf({0})", "double": "sin({0})"})
+
+
+exp = _RealBuiltIn("exp", 1, np.exp, {"float": "expf({0})", "double": "exp({0})"})
+
+
+tanh = _RealBuiltIn("tanh", 1, np.tanh, {"float": "tanhf({0})", "double": "tanh({0})"})
+
+
+relu = _RealBuiltIn(
+    "relu",
+    1,
+    # like fmax in C, np.fmax gives 0 rather than NaN for NaN
+    lambda x: np.fmax(x, 0),
+    # fmax compiles to a single max instruction, without branches
+    {"float": "fmaxf({0}, 0.0f)", "double": "fmax({0}, 0.0)"},
+    vector_impls={
+        (AVX2, "float"): "_mm256_max_ps({0}, _mm256_setzero_ps())",
+        (AVX2, "double"): "_mm256_max_pd({0}, _mm256_setzero_pd())",
+        (AVX512, "float"): "_mm512_max_ps({0}, _mm512_setzero_ps())",
+    },
+)
+
+
+sigmoid = _RealBuiltIn(
+    "sigmoid",
+    1,
+    lambda x: np.reciprocal(1 + np.exp(-x)),
+    {"float": "exo_sigmoidf({0})", "double": "exo_sigmoid({0})"},
+    helpers=(
+        "static inline float exo_sigmoidf(float x) {\n"
+        "    return 1.0f / (1.0f + expf(-x));\n"
+        "}\n",
+        "static inline double exo_sigmoid(double x) {\n"
+        "    return 1.0 / (1.0 + exp(-x));\n"
+        "}\n",
+    ),
+)
+
+
+# select(x, v, y, z) is y if x < v, and z otherwise
+select = _RealBuiltIn(
+    "select",
+    4,
+    lambda x, v, y, z: np.where(x < v, y, z)[()],
+    {
+        "float": "(({0}) < ({1}) ? ({2}) : ({3}))",
+        # C would compare an int32_t with a float in float
+        "double": "((double)({0}) < (double)({1}) ? ({2}) : ({3}))",
+    },
+    includes=(),
+    vector_impls={
+        (AVX2, "float"): (
+            "_mm256_blendv_ps({3}, {2}, _mm256_cmp_ps({0}, {1}, _CMP_LT_OQ))"
+        ),
+        (AVX2, "double"): (
+            "_mm256_blendv_pd({3}, {2}, _mm256_cmp_pd({0}, {1}, _CMP_LT_OQ))"
+        ),
+        (AVX512, "float"): (
+            "_mm512_mask_blend_ps(_mm512_cmp_ps_mask({0}, {1}, _CMP_LT_OQ), {3}, {2})"
+        ),
+    },
+)
@@ -0,0 +1,822 @@
+from dataclasses import dataclass, field
+from fractions import Fraction
+from functools import lru_cache
+from math import comb
+
+from .LoopIR import LoopIR, T
+from .memory import DRAM
+from .prelude import Sym, StmtCache
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Static cost model
+
+"""
+`estimate_cost` counts the work of a procedure without running it: the
+arithmetic operations, the bytes read and written in every memory, the
+calls to every instruction, and the working set of every loop.  The counts
+are polynomials over the size arguments of the procedure, obtained by
+summing the cost of loop bodies in closed form over the iterations (with
+Faulhaber's formulas), so that they can be printed and evaluated for many
+sizes at the cost of evaluating a polynomial.
+
+Calls are counted through the bodies of the callees, including the bodies
+of instructions, which give the semantics of the instruction in terms of
+the memories of its arguments.  Quotients and remainders of divisions by
+constants (e.g. `N / 8` in tiled loops) are opaque variables of the
+polynomials, evaluated along with them.  The counts are exact except for
+conditionals, whose branches are both counted, and divisions by the
+iteration variable of an enclosing loop, which are approximated by their
+value in the first iteration; `exact` tells whether that happened.
+
+Working sets are the bytes touched by one run of a loop (for the first
+iteration of the enclosing loops), approximated by the bounding boxes of
+the accesses to every buffer.
+"""
+
+# bytes of the elements of buffers, by base type; `R` is compiled to float
+_ELEM_BYTES = {
+    T.Num: 4,
+    T.F16: 2,
+    T.F32: 4,
+    T.F64: 8,
+    T.INT8: 1,
+    T.INT32: 4,
+}
+
+
+# --------------------------------------------------------------------------- #
+# Polynomials
+
+
+class Poly:
+    """
+    A polynomial with rational coefficients.  Its variables are symbols
+    (sizes and iteration variables) and opaque `_Quot`ients of divisions.
+    """
+
+    __slots__ = ("terms",)
+
+    def __init__(self, terms=None):
+        # monomial, a sorted tuple of (variable, exponent) -> coefficient
+        self.terms = terms or dict()
+
+    @staticmethod
+    def const(c):
+        return Poly({(): Fraction(c)} if c else None)
+
+    @staticmethod
+    def var(v):
+        return Poly({((v, 1),): Fraction(1)})
+
+    def __add__(self, rhs):
+        terms = dict(self.terms)
+        for m, c in _lift(rhs).terms.items():
+            if c := terms.get(m, 0) + c:
+                terms[m] = c
+            else:
+                del terms[m]
+        return Poly(terms)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Poly({m: -c for m, c in self.terms.items()})
+
+    def __sub__(self, rhs):
+        return self + -_lift(rhs)
+
+    def __rsub__(self, lhs):
+        return _lift(lhs) - self
+
+    def __mul__(self, rhs):
+        terms = dict()
+        for m1, c1 in self.terms.items():
+            for m2, c2 in _lift(rhs).terms.items():
+                m = _mono_mul(m1, m2)
+                if c := terms.get(m, 0) + c1 * c2:
+                    terms[m] = c
+                else:
+                    del terms[m]
+        return Poly(terms)
+
+    __rmul__ = __mul__
+
+    def __pow__(self, k):
+        res = Poly.const(1)
+        for _ in range(k):
+            res = res * self
+        return res
+
+    def __eq__(self, rhs):
+        return isinstance(rhs, (Poly, int, Fraction)) and self.terms == _lift(rhs).terms
+
+    def __hash__(self):
+        return hash(frozenset(self.terms.items()))
+
+    def is_const(self):
+        return all(m == () for m in self.terms)
+
+    def const_term(self):
+        return self.terms.get((), Fraction(0))
+
+    def depends_on(self, v):
+        return any(_var_depends_on(x, v) for m in self.terms for x, _ in m)
+
+    def coeffs(self, v):
+        """
+        The coefficients of the powers of `v`, as a dictionary from the
+        exponents to polynomials, assuming `v` does not occur in quotients.
+        """
+        res = dict()
+        for m, c in self.terms.items():
+            k = dict(m).get(v, 0)
+            rest = tuple((x, e) for x, e in m if x != v)
+            res[k] = res.get(k, Poly()) + Poly({rest: c})
+        return res
+
+    def subst(self, v, p):
+        """
+        Substitute the polynomial `p` for the variable `v`, including in the
+        numerators of the quotients.
+        """
+        res = Poly()
+        for m, c in self.terms.items():
+            term = Poly.const(c)
+            for x, e in m:
+                if x == v:
+                    x = p
+                elif isinstance(x, _Quot) and x.num.depends_on(v):
+                    x = _quot(x.op, x.num.subst(v, p), x.den)
+                else:
+                    x = Poly.var(x)
+                term = term * x**e
+            res = res + term
+        return res
+
+    def subst_quots(self, v, p):
+        """
+        Substitute `p` for `v` in the numerators of the quotients only.
+        """
+        res = Poly()
+        for m, c in self.terms.items():
+            term = Poly.const(c)
+            for x, e in m:
+                if isinstance(x, _Quot) and x.num.depends_on(v):
+                    x = _quot(x.op, x.num.subst(v, p), x.den)
+                else:
+                    x = Poly.var(x)
+                term = term * x**e
+            res = res + term
+        return res
+
+    def evaluate(self, env):
+        """
+        The value of the polynomial, given the values of its symbols as a
+        dictionary from symbols to ints.
+        """
+        res = Fraction(0)
+        for m, c in self.terms.items():
+            for x, e in m:
+                c *= _var_value(x, env) ** e
+            res += c
+        return _number(res)
+
+    def __str__(self):
+        return self._fmt(str)
+
+    # printed with the names of the symbols in the source, like the procs
+    __repr__ = __str__
+
+    def _fmt(self, fmt):
+        if not self.terms:
+            return "0"
+        res = ""
+        for m, c in sorted(
+            self.terms.items(),
+            key=lambda t: (-sum(e for _, e in t[0]), [_var_key(x) for x, _ in t[0]]),
+        ):
+            factors = [_fmt_var(x, fmt) for x, _ in m]
+            factors = [f if e == 1 else f"{f}**{e}" for f, (_, e) in zip(factors, m)]
+            if abs(c) != 1 or not factors:
+                factors.insert(0, str(abs(c)))
+            res += (" - " if c < 0 else " + ") + "*".join(factors)
+        return res[3:] if res.startswith(" + ") else "-" + res[3:]
+
+
+class _Quot:
+    """
+    The quotient (`op == "/"`) or remainder (`op == "%"`) of the floor
+    division of a polynomial by a positive constant.
+    """
+
+    __slots__ = ("op", "num", "den")
+
+    def __init__(self, op, num, den):
+        self.op, self.num, self.den = op, num, den
+
+    def __eq__(self, rhs):
+        return isinstance(rhs, _Quot) and (self.op, self.num, self.den) == (
+            rhs.op,
+            rhs.num,
+            rhs.den,
+        )
+
+    def __hash__(self):
+        return hash((self.op, self.num, self.den))
+
+    def __str__(self):
+        return _fmt_var(self, str)
+
+    __repr__ = __str__
+
+
+def _lift(x):
+    return x if isinstance(x, Poly) else Poly.const(x)
+
+
+def _fmt_var(x, fmt):
+    # `fmt` formats the symbols, including those in quotients
+    if isinstance(x, _Quot):
+        return f"({x.num._fmt(fmt)} {x.op} {x.den})"
+    return fmt(x)
+
+
+def _var_key(x):
+    # symbols first, in their order, then quotients, told apart by the
+    # unique names of their symbols
+    return (0, x, "") if isinstance(x, Sym) else (1, None, _fmt_var(x, repr))
+
+
+def _var_depends_on(x, v):
+    return x == v or (isinstance(x, _Quot) and x.num.depends_on(v))
+
+
+def _mono_mul(m1, m2):
+    if not m1 or not m2:
+        return m1 or m2
+    exps = dict(m1)
+    for x, e in m2:
+        exps[x] = exps.get(x, 0) + e
+    return tuple(sorted(exps.items(), key=lambda t: _var_key(t[0])))
+
+
+def _quot(op, num, den):
+    if num.is_const():
+        n = num.const_term()
+        if n.denominator == 1:
+            n = n.numerator
+            return Poly.const(n // den if op == "/" else n % den)
+    return Poly.var(_Quot(op, num, den))
+
+
+def _var_value(x, env):
+    if isinstance(x, _Quot):
+        n = x.num.evaluate(env)
+        return n // x.den if x.op == "/" else n % x.den
+    if x not in env:
+        raise ValueError(f"no value given for the size '{x}'")
+    return env[x]
+
+
+def _number(x):
+    return x.numerator if x.denominator == 1 else float(x)
+
+
+@lru_cache(maxsize=None)
+def _bernoulli(n):
+    # with B_1 = -1/2
+    if n == 0:
+        return Fraction(1)
+    return -sum(comb(n + 1, j) * _bernoulli(j) for j in range(n)) / (n + 1)
+
+
+@lru_cache(maxsize=None)
+def _faulhaber(k):
+    # coefficients of the powers of x in sum(i**k for i in range(x))
+    coeffs = [Fraction(0)] * (k + 2)
+    for j in range(k + 1):
+        coeffs[k + 1 - j] = comb(k + 1, j) * _bernoulli(j) / (k + 1)
+    return tuple(coeffs)
+
+
+def _at(coeffs, x):
+    res = Poly()
+    for c in reversed(coeffs):
+        res = res * x + c
+    return res
+
+
+def _sum_range(p, v, lo, hi):
+    """
+    The sum of the polynomial `p` for `v` in `[lo, hi)`, assuming `lo <= hi`
+    and that `v` does not occur in quotients.
+    """
+    res = Poly()
+    for k, q in p.coeffs(v).items():
+        f = _faulhaber(k)
+        res = res + q * (_at(f, hi) - _at(f, lo))
+    return res
+
+
+# --------------------------------------------------------------------------- #
+# Results
+
+
+class _Counts:
+    """
+    The operations, bytes moved (by memory) and instruction calls (by name)
+    of a piece of code.
+    """
+
+    __slots__ = ("flops", "bytes", "instrs")
+
+    def __init__(self):
+        self.flops = Poly()
+        self.bytes = dict()
+        self.instrs = dict()
+
+    def add(self, rhs, fn=lambda p: p):
+        self.flops = self.flops + fn(rhs.flops)
+        for d_self, d_rhs in ((self.bytes, rhs.bytes), (self.instrs, rhs.instrs)):
+            for k, p in d_rhs.items():
+                d_self[k] = d_self.get(k, Poly()) + fn(p)
+
+    def map(self, fn):
+        res = _Counts()
+        res.add(self, fn)
+        return res
+
+
+@dataclass
+class BufferFootprint:
+    """
+    The part of a buffer touched by a loop: `extents[d]` consecutive
+    elements along dimension `d` of a buffer of shape `shape`, with
+    elements of `elem_bytes` bytes.
+    """
+
+    name: str
+    mem: type
+    elem_bytes: int
+    extents: list
+    shape: list
+
+    def bytes(self, env):
+        n = self.elem_bytes
+        for ext, dim in zip(self.extents, self.shape):
+            n *= max(0, min(ext.evaluate(env), dim.evaluate(env)))
+        return n
+
+    def __str__(self):
+        extents = ", ".join(str(e) for e in self.extents)
+        return f"{self.name}[{extents}] ({self.mem.name()})"
+
+
+@dataclass
+class LoopEstimate:
+    """
+    A loop of the procedure, with its number of iterations and the
+    footprints of the buffers it touches, for the first iteration of the
+    enclosing loops.
+    """
+
+    iter: str
+    depth: int
+    trips: Poly
+    footprints: list
+
+    def working_set(self, env):
+        res = dict()
+        for fp in self.footprints:
+            res[fp.mem] = res.get(fp.mem, 0) + fp.bytes(env)
+        return res
+
+
+@dataclass
+class Costs:
+    """
+    The costs of a procedure for concrete sizes.
+
+    Attributes:
+        flops (int): arithmetic operations on numeric values
+        bytes (dict): bytes read and written, by memory
+        instr_calls (dict): calls, by instruction name
+        working_sets (list): `(iter, depth, {memory: bytes})` for every loop,
+            in program order
+    """
+
+    flops: int
+    bytes: dict
+    instr_calls: dict
+    working_sets: list = field(default_factory=list)
+
+    @property
+    def total_bytes(self):
+        return sum(self.bytes.values())
+
+
+@dataclass
+class CostEstimate:
+    """
+    The costs of a procedure, as polynomials over its size arguments.
+
+    Attributes:
+        flops (Poly): arithmetic operations on numeric values
+        bytes (dict): bytes read and written, by memory
+        instr_calls (dict): calls, by instruction name
+        loops (list): the `LoopEstimate` of every loop, in program order
+        exact (bool): whether the counts are exact, rather than upper
+            bounds (conditionals) or approximations (divisions by
+            iteration variables)
+    """
+
+    flops: Poly
+    bytes: dict
+    instr_calls: dict
+    loops: list
+    exact: bool
+    sizes: tuple
+
+    def evaluate(self, sizes):
+        """
+        Evaluate the costs for the sizes given by name in `sizes`.
+        """
+        env = _sizes_env(self.sizes, sizes)
+        return Costs(
+            self.flops.evaluate(env),
+            {mem: p.evaluate(env) for mem, p in self.bytes.items()},
+            {nm: p.evaluate(env) for nm, p in self.instr_calls.items()},
+            [(lp.iter, lp.depth, lp.working_set(env)) for lp in self.loops],
+        )
+
+    def __str__(self):
+        lines = [f"flops: {self.flops}"]
+        lines += [f"bytes ({mem.name()}): {p}" for mem, p in self.bytes.items()]
+        lines += [f"calls ({nm}): {p}" for nm, p in self.instr_calls.items()]
+        for lp in self.loops:
+            fps = ", ".join(str(fp) for fp in lp.footprints)
+            lines.append(f"{'  ' * lp.depth}for {lp.iter}: {lp.trips} x [{fps}]")
+        return "\n".join(lines)
+
+
+def _sizes_env(args, sizes):
+    env = dict()
+    for a in args:
+        if str(a) not in sizes:
+            raise ValueError(f"no value given for the size '{a}'")
+        env[a] = sizes[str(a)]
+    return env
+
+
+# --------------------------------------------------------------------------- #
+# Estimation
+
+
+class _Buf:
+    """
+    A buffer, or a window of a buffer: accesses to it are accesses to
+    `base`, with `idx` mapping its dimensions to the dimensions of `base`.
+    """
+
+    __slots__ = ("base", "mem", "elem_bytes", "shape", "idx")
+
+    def __init__(self, base, mem, elem_bytes, shape, idx):
+        self.base, self.mem, self.elem_bytes = base, mem, elem_bytes
+        # shape of the base, and ("pt", index) or ("iv", offset) for each of
+        # its dimensions
+        self.shape, self.idx = shape, idx
+
+    def access(self, idx):
+        idx = iter(idx)
+        return tuple(p if kind == "pt" else p + next(idx) for kind, p in self.idx)
+
+    def window(self, w_idx):
+        w_idx = iter(w_idx)
+        res = []
+        for kind, p in self.idx:
+            if kind == "pt":
+                res.append((kind, p))
+            else:
+                w_kind, w_p = next(w_idx)
+                res.append((w_kind, p + w_p))
+        return _Buf(self.base, self.mem, self.elem_bytes, self.shape, tuple(res))
+
+
+class _Estimator:
+    def __init__(self, proc, target=None):
+        # the accesses, loop bounds and enclosing loops of the loop `target`
+        # are kept in `captured`
+        self.target, self.captured = target, None
+        self.exact = True
+        self.loops = []
+        self.params = tuple(a.name for a in proc.args if a.type in (T.size, T.index))
+
+        bufs = dict()
+        for a in proc.args:
+            if a.type.is_numeric():
+                self.new_buf(bufs, a.name, a.type, a.mem, dict())
+        accesses = []
+        self.counts = self.do_stmts(proc.body, bufs, dict(), accesses, dict(), [])
+
+    def result(self):
+        c = self.counts
+        return CostEstimate(
+            c.flops, c.bytes, c.instrs, self.loops, self.exact, self.params
+        )
+
+    def new_buf(self, bufs, name, typ, mem, sub):
+        shape = tuple(self.poly(e, sub) for e in typ.shape())
+        elem_bytes = _ELEM_BYTES[type(typ.basetype())]
+        idx = tuple(("iv", Poly()) for _ in shape)
+        bufs[name] = _Buf(name, mem or DRAM, elem_bytes, shape, idx)
+
+    # ----------------------------------------------------------------------- #
+    # statements
+
+    def do_stmts(self, stmts, bufs, sub, accesses, ranges, outer, top=True):
+        # `accesses` collects (buffer, index) and `ranges` the bounds of the
+        # loops, for the working sets; `outer` are the iteration variables and
+        # lower bounds of the enclosing loops
+        counts = _Counts()
+        for s in stmts:
+            if isinstance(s, (LoopIR.Assign, LoopIR.Reduce)):
+                self.do_e(s.rhs, bufs, sub, counts, accesses)
+                if isinstance(s, LoopIR.Reduce):
+                    counts.flops = counts.flops + 1
+                    self.access(s.name, s.idx, bufs, sub, counts, accesses)
+                self.access(s.name, s.idx, bufs, sub, counts, accesses)
+            elif isinstance(s, LoopIR.WriteConfig):
+                self.do_e(s.rhs, bufs, sub, counts, accesses)
+            elif isinstance(s, LoopIR.If):
+                self.exact = False
+                for block in (s.body, s.orelse):
+                    counts.add(
+                        self.do_stmts(block, bufs, sub, accesses, ranges, outer, top)
+                    )
+            elif isinstance(s, LoopIR.Seq):
+                counts.add(self.do_loop(s, bufs, sub, accesses, ranges, outer, top))
+            elif isinstance(s, LoopIR.Alloc):
+                if s.type.is_numeric():
+                    self.new_buf(bufs, s.name, s.type, s.mem, sub)
+            elif isinstance(s, LoopIR.WindowStmt):
+                bufs[s.lhs] = self.window(s.rhs, bufs, sub)
+            elif isinstance(s, LoopIR.Call):
+                counts.add(self.do_call(s, bufs, sub, accesses, ranges, outer))
+        return counts
+
+    def do_loop(self, s, bufs, sub, accesses, ranges, outer, top):
+        lo, hi = self.poly(s.lo, sub), self.poly(s.hi, sub)
+        if top:
+            # keep the loops in program order
+            idx = len(self.loops)
+            self.loops.append(None)
+
+        body_accesses, body_ranges = [], {s.iter: (lo, hi)}
+        body = self.do_stmts(
+            s.body, bufs, sub, body_accesses, body_ranges, outer + [(s.iter, lo)], top
+        )
+
+        def sum_body(p):
+            if any(
+                isinstance(x, _Quot) and x.num.depends_on(s.iter)
+                for m in p.terms
+                for x, _ in m
+            ):
+                self.exact = False
+                p = p.subst_quots(s.iter, lo)
+            return _sum_range(p, s.iter, lo, hi)
+
+        if top:
+            trips = self.at_first_iteration(hi - lo, outer)
+            footprints = self.footprints(body_accesses, body_ranges, outer)
+            self.loops[idx] = LoopEstimate(str(s.iter), len(outer), trips, footprints)
+
+        if s is self.target:
+            self.captured = (body_accesses, body_ranges, outer)
+
+        accesses += body_accesses
+        ranges.update(body_ranges)
+        return body.map(sum_body)
+
+    def do_call(self, s, bufs, sub, accesses, ranges, outer):
+        f_bufs, f_sub = dict(), dict()
+        for fa, a in zip(s.f.args, s.args):
+            if fa.type.is_numeric():
+                if isinstance(a, LoopIR.WindowExpr):
+                    f_bufs[fa.name] = self.window(a, bufs, sub)
+                elif isinstance(a, LoopIR.Read) and a.name in bufs:
+                    buf = bufs[a.name]
+                    if a.idx:
+                        buf = buf.window([("pt", self.poly(i, sub)) for i in a.idx])
+                    f_bufs[fa.name] = buf
+            elif fa.type.is_indexable():
+                f_sub[fa.name] = self.poly(a, sub)
+
+        counts = self.do_stmts(
+            s.f.body, f_bufs, f_sub, accesses, ranges, outer, top=False
+        )
+        if s.f.instr is not None:
+            counts.instrs[s.f.name] = counts.instrs.get(s.f.name, Poly()) + 1
+        return counts
+
+    def window(self, e, bufs, sub):
+        w_idx = []
+        for w in e.idx:
+            if isinstance(w, LoopIR.Interval):
+                w_idx.append(("iv", self.poly(w.lo, sub)))
+            else:
+                w_idx.append(("pt", self.poly(w.pt, sub)))
+        return bufs[e.name].window(w_idx)
+
+    # ----------------------------------------------------------------------- #
+    # expressions
+
+    def do_e(self, e, bufs, sub, counts, accesses):
+        if isinstance(e, LoopIR.Read):
+            if e.type.is_numeric():
+                self.access(e.name, e.idx, bufs, sub, counts, accesses)
+        elif isinstance(e, LoopIR.USub):
+            self.do_e(e.arg, bufs, sub, counts, accesses)
+        elif isinstance(e, LoopIR.BinOp):
+            if e.type.is_numeric():
+                counts.flops = counts.flops + 1
+            self.do_e(e.lhs, bufs, sub, counts, accesses)
+            self.do_e(e.rhs, bufs, sub, counts, accesses)
+        elif isinstance(e, LoopIR.BuiltIn):
+            counts.flops = counts.flops + 1
+            for a in e.args:
+                self.do_e(a, bufs, sub, counts, accesses)
+
+    def access(self, name, idx, bufs, sub, counts, accesses):
+        if (buf := bufs.get(name)) is None:
+            # a numeric config field passed to a call
+            return
+        counts.bytes[buf.mem] = counts.bytes.get(buf.mem, Poly()) + buf.elem_bytes
+        accesses.append((buf, buf.access([self.poly(i, sub) for i in idx])))
+
+    def poly(self, e, sub):
+        if isinstance(e, LoopIR.Const):
+            return Poly.const(int(e.val))
+        elif isinstance(e, LoopIR.Read) and not e.idx:
+            return sub[e.name] if e.name in sub else Poly.var(e.name)
+        elif isinstance(e, LoopIR.USub):
+            return -self.poly(e.arg, sub)
+        elif isinstance(e, LoopIR.BinOp):
+            if e.op in ("+", "-", "*"):
+                lhs, rhs = self.poly(e.lhs, sub), self.poly(e.rhs, sub)
+                return (
+                    lhs + rhs
+                    if e.op == "+"
+                    else lhs - rhs
+                    if e.op == "-"
+                    else lhs * rhs
+                )
+            elif e.op in ("/", "%") and isinstance(e.rhs, LoopIR.Const):
+                return _quot(e.op, self.poly(e.lhs, sub), e.rhs.val)
+        raise ValueError(f"cannot estimate the value of '{e}'")
+
+    # ----------------------------------------------------------------------- #
+    # working sets
+
+    def at_first_iteration(self, p, outer):
+        # substitute the lower bounds of the enclosing loops, innermost first
+        for v, lo in reversed(outer):
+            if p.depends_on(v):
+                p = p.subst(v, lo)
+        return p
+
+    def footprints(self, accesses, inner, outer):
+        # per buffer and dimension: the extents of the groups of accesses
+        # with the same non-constant offset, and their offsets
+        boxes = dict()
+        for buf, idx in accesses:
+            dims = boxes.setdefault(buf.base, (buf, [dict() for _ in idx]))[1]
+            for d, p in enumerate(idx):
+                ext, rest = self.extent(p, inner)
+                if ext is None:
+                    dims[d][None] = (buf.shape[d], 0, 0)
+                    continue
+                key = rest - rest.const_term()
+                off = rest.const_term()
+                ext0, lo, hi = dims[d].get(key, (ext, off, off))
+                dims[d][key] = (ext0, min(lo, off), max(hi, off))
+
+        res = []
+        for buf, dims in boxes.values():
+            extents = []
+            for d, groups in enumerate(dims):
+                if None in groups:
+                    ext = buf.shape[d]
+                else:
+                    ext = sum(
+                        (e + _number(hi - lo) for e, lo, hi in groups.values()), Poly()
+                    )
+                extents.append(self.at_first_iteration(ext, outer))
+            shape = [self.at_first_iteration(p, outer) for p in buf.shape]
+            res.append(
+                BufferFootprint(str(buf.base), buf.mem, buf.elem_bytes, extents, shape)
+            )
+        return res
+
+    def extent(self, p, inner):
+        """
+        The number of values of the index `p` for the iteration variables in
+        `inner` ranging over their loops, and `p` without them, or None if
+        `p` is not affine in them with constant coefficients.
+        """
+        ext = Poly.const(1)
+        for v, (lo, hi) in inner.items():
+            if not p.depends_on(v):
+                continue
+            cs = p.coeffs(v)
+            rest = cs.get(0, Poly())
+            # `v` may occur only in quotients, as in `x[i / 2]`
+            if 1 not in cs or max(cs) > 1:
+                return None, None
+            if not cs[1].is_const() or rest.depends_on(v):
+                return None, None
+            ext = ext + abs(cs[1].const_term()) * (hi - lo - 1)
+            p = rest
+        # bounds of triangular loops: the largest values of the inner loops
+        for _ in inner:
+            vs = [v for v in inner if ext.depends_on(v)]
+            if not vs:
+                break
+            for v in vs:
+                ext = ext.subst(v, inner[v][1] - 1)
+        return ext, p
+
+
+def estimate_cost(proc):
+    """
+    Estimate the costs of the LoopIR procedure `proc` (see `CostEstimate`).
+    """
+    if (res := _estimates.get(proc)) is None:
+        res = _Estimator(proc).result()
+        _estimates[proc] = res
+    return res
+
+
+# LoopIR proc -> CostEstimate
+_estimates = StmtCache()
+
+
+class LoopAccesses:
+    """
+    The accesses of a loop to buffers, with the bounds of the loops in it,
+    as polynomials over the iteration variables and the size arguments of
+    the procedure, for the first iteration of the enclosing loops.  See
+    `loop_accesses`.
+
+    Attributes:
+        sizes (tuple): the size arguments of the procedure
+        ranges (dict): `(lo, hi)` bounds of the loop and the loops in it,
+            by iteration variable
+    """
+
+    def __init__(self, est):
+        self._est = est
+        self._accesses, self.ranges, self._outer = est.captured
+        self.sizes = est.params
+
+    def sizes_env(self, sizes):
+        """
+        The environment of the sizes given by name in `sizes`, to evaluate
+        the polynomials in.
+        """
+        return _sizes_env(self.sizes, sizes)
+
+    def indices(self):
+        """
+        The indices accessed in every buffer (by name), one per dimension
+        of every access.
+        """
+        res = dict()
+        for buf, idx in self._accesses:
+            res.setdefault(str(buf.base), []).extend(idx)
+        return res
+
+    def trips(self, iter):
+        """
+        The number of iterations of the loop over `iter`.
+        """
+        lo, hi = self.ranges[iter]
+        return self._est.at_first_iteration(hi - lo, self._outer)
+
+    def footprints(self, ranges):
+        """
+        The `BufferFootprint`s of the accesses with the loops ranging over
+        `ranges` rather than their bounds (e.g. over tiles).
+        """
+        return self._est.footprints(self._accesses, ranges, self._outer)
+
+
+def loop_accesses(proc, loop):
+    """
+    The `LoopAccesses` of the loop `loop` of the LoopIR procedure `proc`.
+    """
+    est = _Estimator(proc, target=loop)
+    if est.captured is None:
+        raise ValueError(f"no loop over {loop.iter} in {proc.name}")
+    return LoopAccesses(est)
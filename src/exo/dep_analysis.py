@@ -0,0 +1,432 @@
+from math import gcd
+
+from .LoopIR import LoopIR, T
+from .prelude import Sym, StmtCache
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Syntactic Dependence Analysis
+
+"""
+A fast, conservative front end to the SMT legality checks of reordering,
+fission and fusion.  Every statement is summarized by the list of locations
+it accesses:
+
+    (loc, kind, idx)
+
+where `loc` is a buffer name or a `(config, field)` pair, `kind` is one of
+`READ`, `WRITE` or `REDUCE`, and `idx` is the tuple of the affine forms of
+the indices (`None` for an index which is not affine), or `None` if the
+access may touch any point of the buffer.  An affine form is a dictionary
+from index variables to their coefficients, with the constant term stored
+under `None`.
+
+Two accesses conflict unless they are both reads or both reductions, and
+conflicting accesses are independent between two iterations of the loops
+around them if, in some dimension, the distance between their indices
+cannot be zero for any distance between the iterations.  That is the GCD
+test on uniform dependence distances, where the variables of the loops
+inside (and the offsets into the windows passed to calls) only widen the
+distance by their constant ranges.
+
+The summaries are cached per statement object, like the effects of
+`effectcheck`, so the summaries of a procedure are only computed once
+while it is being scheduled, and are reused by all the procedures derived
+from it for the statements they share.  The queries below return True when
+the analysis proves the schedule legal and False when it does not know;
+they never reject a schedule, which is left to the SMT checks.
+"""
+
+READ, WRITE, REDUCE = "R", "W", "+"
+
+
+class _Summary:
+    __slots__ = ("accesses", "bound")
+
+    def __init__(self, accesses, bound):
+        # list of (loc, kind, idx)
+        self.accesses = accesses
+        # the index variables bound by the loops inside the statements,
+        # mapped to their (inclusive) range, or None if it is not constant
+        self.bound = bound
+
+
+def _merge_bounds(b1, b2):
+    res = dict(b1)
+    for x, r in b2.items():
+        if x in res and (res[x] is None or r is None):
+            res[x] = None
+        elif x in res:
+            res[x] = (min(res[x][0], r[0]), max(res[x][1], r[1]))
+        else:
+            res[x] = r
+    return res
+
+
+# statement -> _Summary, or None if the statement cannot be summarized
+_summaries = StmtCache()
+# proc -> the names of the windows it defines
+_proc_windows = StmtCache()
+
+
+def _affine(e):
+    if isinstance(e, LoopIR.Const):
+        if type(e.val) is int:
+            return {None: e.val}
+    elif isinstance(e, LoopIR.Read):
+        if not e.idx and e.type.is_indexable():
+            return {e.name: 1}
+    elif isinstance(e, LoopIR.USub):
+        if (a := _affine(e.arg)) is not None:
+            return {x: -c for x, c in a.items()}
+    elif isinstance(e, LoopIR.BinOp) and e.op in ("+", "-", "*"):
+        lhs, rhs = _affine(e.lhs), _affine(e.rhs)
+        if lhs is None or rhs is None:
+            return None
+        if e.op == "*":
+            if rhs.keys() <= {None}:
+                lhs, rhs = rhs, lhs
+            if not lhs.keys() <= {None}:
+                return None
+            scale = lhs.get(None, 0)
+            return {x: scale * c for x, c in rhs.items()}
+        sign = 1 if e.op == "+" else -1
+        res = dict(lhs)
+        for x, c in rhs.items():
+            res[x] = res.get(x, 0) + sign * c
+        return res
+    return None
+
+
+def _expr_accesses(e, acc):
+    if isinstance(e, LoopIR.Read):
+        if e.type.is_numeric():
+            if e.type.is_tensor_or_window() and not e.idx:
+                acc.append((e.name, READ, None))
+            else:
+                acc.append((e.name, READ, tuple(_affine(i) for i in e.idx)))
+        for i in e.idx:
+            _expr_accesses(i, acc)
+    elif isinstance(e, LoopIR.ReadConfig):
+        acc.append(((e.config, e.field), READ, ()))
+    elif isinstance(e, LoopIR.WindowExpr):
+        acc.append((e.name, READ, None))
+        for w in e.idx:
+            if isinstance(w, LoopIR.Interval):
+                _expr_accesses(w.lo, acc)
+                _expr_accesses(w.hi, acc)
+            else:
+                _expr_accesses(w.pt, acc)
+    elif isinstance(e, LoopIR.USub):
+        _expr_accesses(e.arg, acc)
+    elif isinstance(e, LoopIR.BinOp):
+        _expr_accesses(e.lhs, acc)
+        _expr_accesses(e.rhs, acc)
+    elif isinstance(e, LoopIR.BuiltIn):
+        for a in e.args:
+            _expr_accesses(a, acc)
+
+
+def _window_idx(w, bound):
+    """
+    The indices of the points of the window `w`, which offset the lower
+    bound of each interval by a fresh variable ranging over its width,
+    added to `bound`.
+    """
+    idx = []
+    for i in w.idx:
+        if isinstance(i, LoopIR.Point):
+            idx.append(_affine(i.pt))
+            continue
+        lo, hi = _affine(i.lo), _affine(i.hi)
+        if lo is None or hi is None:
+            idx.append(None)
+            continue
+        width = {x: hi.get(x, 0) - lo.get(x, 0) for x in lo.keys() | hi.keys()}
+        if any(c != 0 for x, c in width.items() if x is not None):
+            idx.append(None)
+            continue
+        x = Sym("w")
+        bound[x] = (0, width.get(None, 0) - 1)
+        idx.append({**lo, x: 1})
+    return tuple(idx)
+
+
+def _block_summary(stmts, hide=True):
+    """
+    The summary of a block, which hides the buffers allocated in it (each
+    execution of the block allocates them afresh) if `hide` is set.
+    """
+    accesses, bound, allocs = [], dict(), set()
+    for s in stmts:
+        if (sm := summarize(s)) is None:
+            return None
+        accesses += sm.accesses
+        bound = _merge_bounds(bound, sm.bound)
+        if isinstance(s, LoopIR.Alloc):
+            allocs.add(s.name)
+    if hide and allocs:
+        accesses = [a for a in accesses if a[0] not in allocs]
+    return _Summary(accesses, bound)
+
+
+def _summarize(s):
+    acc = []
+    if isinstance(s, (LoopIR.Assign, LoopIR.Reduce)):
+        kind = WRITE if isinstance(s, LoopIR.Assign) else REDUCE
+        acc.append((s.name, kind, tuple(_affine(i) for i in s.idx)))
+        for i in s.idx:
+            _expr_accesses(i, acc)
+        _expr_accesses(s.rhs, acc)
+        return _Summary(acc, {})
+    elif isinstance(s, LoopIR.WriteConfig):
+        acc.append(((s.config, s.field), WRITE, ()))
+        _expr_accesses(s.rhs, acc)
+        return _Summary(acc, {})
+    elif isinstance(s, LoopIR.Pass):
+        return _Summary(acc, {})
+    elif isinstance(s, LoopIR.If):
+        body, orelse = _block_summary(s.body), _block_summary(s.orelse)
+        if body is None or orelse is None:
+            return None
+        _expr_accesses(s.cond, acc)
+        return _Summary(
+            acc + body.accesses + orelse.accesses,
+            _merge_bounds(body.bound, orelse.bound),
+        )
+    elif isinstance(s, LoopIR.Seq):
+        if (body := _block_summary(s.body)) is None:
+            return None
+        _expr_accesses(s.lo, acc)
+        _expr_accesses(s.hi, acc)
+        lo, hi = _affine(s.lo), _affine(s.hi)
+        rng = None
+        if lo is not None and hi is not None and (lo.keys() | hi.keys()) <= {None}:
+            rng = (lo.get(None, 0), hi.get(None, 0) - 1)
+        return _Summary(acc + body.accesses, _merge_bounds(body.bound, {s.iter: rng}))
+    elif isinstance(s, (LoopIR.Alloc, LoopIR.Free)):
+        acc.append((s.name, WRITE, None))
+        if isinstance(s.type, T.Tensor):
+            for e in s.type.hi:
+                _expr_accesses(e, acc)
+        return _Summary(acc, {})
+    elif isinstance(s, LoopIR.Call):
+        if (callee := _block_summary(s.f.body)) is None:
+            return None
+        # buffer arguments (and numeric configs) are passed by reference, so
+        # the call accesses them the way the callee accesses its arguments
+        kinds = dict()
+        for loc, kind, _ in callee.accesses:
+            kinds.setdefault(loc, set()).add(kind)
+        bound = dict()
+        for fa, a in zip(s.f.args, s.args):
+            kind = kinds.get(fa.name, {READ})
+            kind = next(iter(kind)) if len(kind) == 1 else WRITE
+            if isinstance(a, LoopIR.ReadConfig) and a.type.is_numeric():
+                acc.append(((a.config, a.field), kind, ()))
+            elif isinstance(a, LoopIR.WindowExpr):
+                acc.append((a.name, kind, _window_idx(a, bound)))
+            elif a.type.is_numeric():
+                acc.append((a.name, kind, None if a.type.is_tensor_or_window() else ()))
+            _expr_accesses(a, acc)
+        acc += [a for a in callee.accesses if isinstance(a[0], tuple)]
+        return _Summary(acc, bound)
+    # windows alias the buffers they are taken from, which the summaries
+    # do not track
+    assert isinstance(s, LoopIR.WindowStmt)
+    return None
+
+
+def summarize(s):
+    """
+    The (cached) summary of the accesses of a statement.
+    """
+    if (sm := _summaries.get(s)) is None:
+        sm = _summarize(s)
+        _summaries[s] = sm if sm is not None else False
+    return sm or None
+
+
+def _windows(proc):
+    if (wins := _proc_windows.get(proc)) is None:
+        wins = set()
+
+        def find(stmts):
+            for s in stmts:
+                if isinstance(s, LoopIR.WindowStmt):
+                    wins.add(s.lhs)
+                elif isinstance(s, LoopIR.If):
+                    find(s.body)
+                    find(s.orelse)
+                elif isinstance(s, LoopIR.Seq):
+                    find(s.body)
+
+        find(proc.body)
+        _proc_windows[proc] = wins
+    return wins
+
+
+def _summaries_of(proc, *blocks, hide=False):
+    sms = [_block_summary(b, hide) for b in blocks]
+    if any(sm is None for sm in sms):
+        return None
+    if wins := _windows(proc):
+        if any(a[0] in wins for sm in sms for a in sm.accesses):
+            return None
+    return sms
+
+
+def _conflict(k1, k2):
+    return (k1 is WRITE or k2 is WRITE) or k1 is not k2
+
+
+def _distance(f1, f2, iters, bound):
+    """
+    For the affine indices `f1` at the iteration `iters` and `f2` at the
+    iteration `iters'` of the loops around them, find `cs`, `lo` and `hi`
+    such that
+
+        f1 - f2 = sum(c * (i - i') for c, i in zip(cs, iters)) + k
+
+    for some `k` in `[lo, hi]`, or return None if there are no such
+    constants.
+    """
+    if f1 is None or f2 is None:
+        return None
+    lo = hi = f1.get(None, 0) - f2.get(None, 0)
+    for x in f1.keys() | f2.keys():
+        if x is None:
+            continue
+        c1, c2 = f1.get(x, 0), f2.get(x, 0)
+        if x in bound:
+            # the variables of the loops inside vary independently
+            if (rng := bound[x]) is None:
+                return None
+            r1, r2 = (c1 * rng[0], c1 * rng[1]), (c2 * rng[0], c2 * rng[1])
+            lo, hi = lo + min(r1) - max(r2), hi + max(r1) - min(r2)
+        elif c1 != c2:
+            # and the variables outside must cancel out
+            return None
+    return [f1.get(i, 0) for i in iters], lo, hi
+
+
+def _may_solve(cs, lo, hi):
+    """
+    Whether `sum(c * p for c, p in zip(cs, ps))` may be in `[lo, hi]` for
+    some positive integers `ps`.
+    """
+    cs = [c for c in cs if c != 0]
+    if not cs:
+        return lo <= 0 <= hi
+    elif len(cs) == 1:
+        c = cs[0]
+        if c < 0:
+            c, lo, hi = -c, -hi, -lo
+        return max(1, -(-lo // c)) <= hi // c
+    g = 0
+    for c in cs:
+        g = gcd(g, c)
+    if hi // g * g < lo:
+        return False
+    if all(c > 0 for c in cs):
+        return hi >= sum(cs)
+    if all(c < 0 for c in cs):
+        return lo <= sum(cs)
+    return True
+
+
+def _independent(sm1, sm2, iters, signs):
+    """
+    Whether no access of `sm1` at the iteration `iters` conflicts with an
+    access of `sm2` at an iteration `iters'` of the loops around them, where
+    `i' - i` is positive for the loops `i` with a sign of 1 and negative for
+    the loops with a sign of -1.
+    """
+    bound = _merge_bounds(sm1.bound, sm2.bound)
+    by_loc = dict()
+    for a in sm2.accesses:
+        by_loc.setdefault(a[0], []).append(a)
+    for loc, k1, idx1 in sm1.accesses:
+        for _, k2, idx2 in by_loc.get(loc, ()):
+            if not _conflict(k1, k2):
+                continue
+            if idx1 is None or idx2 is None or len(idx1) != len(idx2):
+                return False
+            for f1, f2 in zip(idx1, idx2):
+                if (dist := _distance(f1, f2, iters, bound)) is None:
+                    continue
+                # f1 - f2 = sum(c * (i - i')) + k = 0, with i' - i = s * p
+                cs, lo, hi = dist
+                if not _may_solve([c * s for c, s in zip(cs, signs)], lo, hi):
+                    break
+            else:
+                return False
+    return True
+
+
+def _bounds_invariant(loops, sms):
+    acc = []
+    for s in loops:
+        _expr_accesses(s.lo, acc)
+        _expr_accesses(s.hi, acc)
+    return _independent(_Summary(acc, {}), _Summary(_all(sms), {}), [], [])
+
+
+def _uses(e, x):
+    if isinstance(e, LoopIR.Read):
+        return e.name == x or any(_uses(i, x) for i in e.idx)
+    elif isinstance(e, LoopIR.USub):
+        return _uses(e.arg, x)
+    elif isinstance(e, LoopIR.BinOp):
+        return _uses(e.lhs, x) or _uses(e.rhs, x)
+    elif isinstance(e, LoopIR.BuiltIn):
+        return any(_uses(a, x) for a in e.args)
+    return False
+
+
+def _all(sms):
+    return [a for sm in sms for a in sm.accesses]
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Legality Queries
+
+
+def commutes(proc, s1, s2):
+    """
+    Whether the statements `s1` and `s2` of `proc` surely commute.
+    """
+    if (sms := _summaries_of(proc, [s1], [s2])) is None:
+        return False
+    return _independent(*sms, [], [])
+
+
+def loops_reorder(proc, s):
+    """
+    Whether the loop `s` of `proc` and the loop directly inside it may
+    surely be interchanged.
+    """
+    x_loop, y_loop = s, s.body[0]
+    if (sms := _summaries_of(proc, y_loop.body, hide=True)) is None:
+        return False
+    if not _bounds_invariant([x_loop, y_loop], sms):
+        return False
+    if _uses(y_loop.lo, x_loop.iter) or _uses(y_loop.hi, x_loop.iter):
+        return False
+    # the body at (x, y) and at (x', y') for x < x' and y' < y
+    return _independent(sms[0], sms[0], [x_loop.iter, y_loop.iter], [1, -1])
+
+
+def loop_fissions(proc, loop, stmts1, stmts2):
+    """
+    Whether the loop `loop` of `proc`, with the body `stmts1 ; stmts2`, may
+    surely be split into a loop over `stmts1` followed by a loop over
+    `stmts2`.
+    """
+    if (sms := _summaries_of(proc, stmts1, stmts2)) is None:
+        return False
+    if not _bounds_invariant([loop], sms):
+        return False
+    # stmts1 at i' must commute with stmts2 at i for i < i'
+    return _independent(sms[1], sms[0], [loop.iter], [1])
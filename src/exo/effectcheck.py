@@ -1,4 +1,5 @@
 from collections import ChainMap
+from weakref import WeakKeyDictionary
 
 import pysmt
 from pysmt import shortcuts as SMT
@@ -32,6 +33,49 @@ def _get_smt_solver():
     return pysmt.shortcuts.Solver(name=next(iter(slvs)))
 
 
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Analysis Caches
+
+"""
+LoopIR is immutable, and scheduling rebuilds only the statements on the path
+to an edit, sharing all the other subtrees with the original procedure.  So
+the results of `InferEffects` and `CheckEffects` are cached per statement
+object, and repeated analyses of large procedures only redo the work for the
+statements which changed.
+
+LoopIR nodes compare structurally, which is both expensive for large
+subtrees and too coarse (source locations are part of effects), so these
+caches are keyed by the identity of the statements, and forget a statement
+as soon as it is garbage collected.
+"""
+
+
+# the value of the entries of a statement which maps to itself, since a
+# reference to the statement would keep it alive
+_SAME = object()
+
+# statement -> (types of the windows it reads, statement with effects)
+_stmt_effects = StmtCache()
+# proc -> proc with effects
+_proc_effects = StmtCache()
+
+# statement -> set of contexts in which it passed `CheckEffects`
+_checked_stmts = StmtCache()
+
+# (context, formula) pairs of the formulas known to be valid in a context
+_valid_facts = set()
+_MAX_VALID_FACTS = 1 << 16
+
+# Symbols of the strides and divisions of CheckEffects, shared between runs
+# so that equal assumptions are equal SMT formulas.  Each division symbol
+# comes with the assumption defining it, so the table can be dropped at
+# any time; that only costs the facts learned about the old symbols.
+_stride_syms = WeakKeyDictionary()
+_div_syms = dict()
+_MAX_DIV_SYMS = 1 << 16
+
+
 # --------------------------------------------------------------------------- #
 # --------------------------------------------------------------------------- #
 # Helper Functions
@@ -83,11 +127,18 @@ class InferEffects:
     def __init__(self, proc):
         self.orig_proc = proc
 
+        if (cached := _proc_effects.get(proc)) is not None:
+            self.proc = proc if cached is _SAME else cached
+            self.effect = self.proc.eff
+            return
+
         self._types = {}
         for a in proc.args:
             self._types[a.name] = a.type
         self.rec_stmts_types(self.orig_proc.body)
 
+        # window types looked up while inferring the current statement
+        self._deps = dict()
         body, eff = self.map_stmts(self.orig_proc.body)
 
         self.proc = LoopIR.proc(
@@ -101,6 +152,8 @@ class InferEffects:
         )
 
         self.effect = eff
+        _proc_effects[proc] = self.proc
+        _proc_effects[self.proc] = _SAME
 
     def get_effect(self):
         return self.effect
@@ -140,7 +193,33 @@ class InferEffects:
                 eff = eff_concat(new_s.eff, eff)
         return (list(reversed(stmts)), eff)
 
+    def lookup_type(self, name):
+        typ = self._types[name]
+        self._deps[name] = typ
+        return typ
+
     def map_s(self, stmt):
+        # The effect of a statement only depends on the statement and on the
+        # types of the windows it reads through, which are recorded as they
+        # are looked up.
+        outer_deps, self._deps = self._deps, dict()
+        entry = _stmt_effects.get(stmt)
+        if entry is not None and all(
+            self._types.get(nm) == typ for nm, typ in entry[0].items()
+        ):
+            deps, new_s = entry
+            new_s = stmt if new_s is _SAME else new_s
+        else:
+            new_s = self.infer_s(stmt)
+            deps = self._deps
+            _stmt_effects[stmt] = (deps, new_s)
+            _stmt_effects[new_s] = (deps, _SAME)
+
+        self._deps = outer_deps
+        outer_deps.update(deps)
+        return new_s
+
+    def infer_s(self, stmt):
         if isinstance(stmt, (LoopIR.Assign, LoopIR.Reduce)):
             styp = type(stmt)
             buf = stmt.name
@@ -266,7 +345,7 @@ class InferEffects:
                 eff = eff_read(e.name, loc, e.srcinfo)
 
                 # x[...], x
-                buf_typ = self._types[e.name]
+                buf_typ = self.lookup_type(e.name)
                 if isinstance(buf_typ, T.Window):
                     eff = self.translate_eff(eff, e.name, buf_typ)
 
@@ -313,7 +392,7 @@ class InferEffects:
             while isinstance(typ, T.Window):
                 buf = typ.src_buf
                 idx = typ.idx
-                typ = self._types[buf]
+                typ = self.lookup_type(buf)
                 loc_i = 0
                 new_loc = []
                 for w_acc in idx:
@@ -508,9 +587,12 @@ class CheckEffects:
         self.config_env = ChainMap()
         self.errors = []
 
-        self.stride_sym = dict()
-
         self.solver = _get_smt_solver()
+        # the assertions in scope, which determine the result of every check
+        self.context = ()
+        self._saved_contexts = []
+        # the prefixes of the context asserted at each level of the solver
+        self._solver_levels = []
 
         self.push()
 
@@ -518,20 +600,20 @@ class CheckEffects:
         for arg in proc.args:
             if isinstance(arg.type, T.Size):
                 pos_sz = SMT.LT(SMT.Int(0), self.sym_to_smt(arg.name))
-                self.solver.add_assertion(pos_sz)
+                self.assume(pos_sz)
             elif arg.type.is_tensor_or_window() and not arg.type.is_win():
                 self.assume_tensor_strides(arg, arg.name, arg.type.shape())
 
         for p in proc.preds:
             # Check whether the assert is even potentially correct
             smt_p = self.expr_to_smt(lift_expr(p))
-            if not self.solver.is_sat(smt_p):
+            if not self.is_sat(smt_p):
                 self.err(
                     p, f"The assertion {p} at {p.srcinfo} is always unsatisfiable."
                 )
             # independently, we will assume the assertion is
             # true while checking the rest of this procedure body
-            self.solver.add_assertion(smt_p)
+            self.assume(smt_p)
 
         self.preprocess_stmts(self.orig_proc.body)
         body_eff = self.map_stmts(self.orig_proc.body)
@@ -564,14 +646,54 @@ class CheckEffects:
         return ",".join(mapping)
 
     def push(self):
-        self.solver.push()
         self.env = self.env.new_child()
         self.config_env = self.config_env.new_child()
+        self._saved_contexts.append(self.context)
 
     def pop(self):
         self.env = self.env.parents
         self.config_env = self.config_env.parents
-        self.solver.pop()
+        self.context = self._saved_contexts.pop()
+
+    def assume(self, smt_pred):
+        self.context += (smt_pred,)
+
+    def sync_solver(self):
+        # Assumptions are only passed to the solver when it is queried,
+        # since most queries are answered from `_valid_facts`.  Pop the
+        # solver levels which are no longer a prefix of the context, and
+        # push the rest of the context as a new level.
+        while self._solver_levels and (
+            self.context[: len(self._solver_levels[-1])] != self._solver_levels[-1]
+        ):
+            self.solver.pop()
+            self._solver_levels.pop()
+
+        n_asserted = len(self._solver_levels[-1]) if self._solver_levels else 0
+        if n_asserted < len(self.context):
+            self.solver.push()
+            for smt_pred in self.context[n_asserted:]:
+                self.solver.add_assertion(smt_pred)
+            self._solver_levels.append(self.context)
+
+    def is_sat(self, smt_pred):
+        self.sync_solver()
+        return self.solver.is_sat(smt_pred)
+
+    def is_valid(self, smt_pred):
+        # Most of the checks of a procedure are the same as the ones of the
+        # procedure it was scheduled from, so remember the valid ones.
+        key = (self.context, smt_pred)
+        if key in _valid_facts:
+            return True
+
+        self.sync_solver()
+        if not self.solver.is_valid(smt_pred):
+            return False
+        if len(_valid_facts) >= _MAX_VALID_FACTS:
+            _valid_facts.clear()
+        _valid_facts.add(key)
+        return True
 
     def err(self, node, msg):
         self.errors.append(f"{node.srcinfo}: {msg}")
@@ -614,13 +736,10 @@ class CheckEffects:
             arg = self.expr_to_smt(expr.arg)
             return SMT.Not(arg)
         elif isinstance(expr, E.Stride):
-            key = (expr.name, expr.dim)
-            if key in self.stride_sym:
-                stride_sym = self.stride_sym[key]
-            else:
-                stride_sym = Sym(f"{expr.name}_stride_{expr.dim}")
-                self.stride_sym[key] = stride_sym
-            return self.sym_to_smt(stride_sym)
+            strides = _stride_syms.setdefault(expr.name, dict())
+            if expr.dim not in strides:
+                strides[expr.dim] = Sym(f"{expr.name}_stride_{expr.dim}")
+            return self.sym_to_smt(strides[expr.dim])
         elif isinstance(expr, E.Select):
             cond = self.expr_to_smt(expr.cond)
             tcase = self.expr_to_smt(expr.tcase)
@@ -694,11 +813,11 @@ class CheckEffects:
                 #
 
                 # Introduce new Sym (z in formula below)
-                div_tmp = self.sym_to_smt(Sym("div_tmp"))
+                div_tmp = self.sym_to_smt(self.div_sym("div_tmp", lhs, rhs))
                 # rhs*z <= lhs < rhs*(z+1)
                 rhs_eq = SMT.LE(SMT.Times(rhs, div_tmp), lhs)
                 lhs_eq = SMT.LT(lhs, SMT.Times(rhs, SMT.Plus(div_tmp, SMT.Int(1))))
-                self.solver.add_assertion(SMT.And(rhs_eq, lhs_eq))
+                self.assume(SMT.And(rhs_eq, lhs_eq))
                 return div_tmp
             elif expr.op == "%":
                 assert isinstance(expr.rhs, E.Const)
@@ -708,10 +827,10 @@ class CheckEffects:
                 #   mod_tmp = floor(lhs / rhs)
                 # Then,
                 #   lhs % rhs = lhs - rhs * mod_tmp
-                mod_tmp = self.sym_to_smt(Sym("mod_tmp"))
+                mod_tmp = self.sym_to_smt(self.div_sym("mod_tmp", lhs, rhs))
                 rhs_eq = SMT.LE(SMT.Times(rhs, mod_tmp), lhs)
                 lhs_eq = SMT.LT(lhs, SMT.Times(rhs, SMT.Plus(mod_tmp, SMT.Int(1))))
-                self.solver.add_assertion(SMT.And(rhs_eq, lhs_eq))
+                self.assume(SMT.And(rhs_eq, lhs_eq))
                 return SMT.Minus(lhs, SMT.Times(rhs, mod_tmp))
 
             elif expr.op == "<":
@@ -738,6 +857,15 @@ class CheckEffects:
         else:
             assert False, f"bad case: {type(expr)}"
 
+    def div_sym(self, name, lhs, rhs):
+        # The quotient only depends on the operands, so reuse its symbol
+        key = (name, lhs, rhs)
+        if key not in _div_syms:
+            if len(_div_syms) >= _MAX_DIV_SYMS:
+                _div_syms.clear()
+            _div_syms[key] = Sym(name)
+        return _div_syms[key]
+
     def assume_tensor_strides(self, node, name, shape):
         # compute statically knowable strides from the shape
         strides = [None] * len(shape)
@@ -755,7 +883,7 @@ class CheckEffects:
                 s_expr = LoopIR.StrideExpr(name, dim, T.stride, node.srcinfo)
                 s_const = LoopIR.Const(s, T.int, node.srcinfo)
                 eq = LoopIR.BinOp("==", s_expr, s_const, T.bool, node.srcinfo)
-                self.solver.add_assertion(self.expr_to_smt(lift_expr(eq)))
+                self.assume(self.expr_to_smt(lift_expr(eq)))
 
     def check_in_bounds(self, sym, shape, eff, eff_str):
         assert isinstance(eff, E.effset), "effset should be passed to in_bounds"
@@ -766,7 +894,7 @@ class CheckEffects:
 
             self.push()
             if eff.pred is not None:
-                self.solver.add_assertion(self.expr_to_smt(eff.pred))
+                self.assume(self.expr_to_smt(eff.pred))
             in_bds = SMT.Bool(True)
 
             assert len(eff.loc) == len(shape)
@@ -777,7 +905,7 @@ class CheckEffects:
                 rhs = SMT.LT(e, self.expr_to_smt(hi))
                 in_bds = SMT.And(in_bds, SMT.And(lhs, rhs))
 
-            if not self.solver.is_valid(in_bds):
+            if not self.is_valid(in_bds):
                 eg = self.counter_example()
                 self.err(eff, f"{sym} is {eff_str} out-of-bounds when:\n  {eg}.")
 
@@ -811,7 +939,7 @@ class CheckEffects:
             SMT.And(SMT.LE(SMT.Int(0), iter1_smt), SMT.LT(iter1_smt, iter2_smt)),
             SMT.LT(iter2_smt, self.expr_to_smt(hi)),
         )
-        self.solver.add_assertion(iter_pred)
+        self.assume(iter_pred)
 
         sub1 = {nm: E.Var(nm.copy(), T.index, null_srcinfo()) for nm in e1.names}
         sub1[iter] = E.Var(iter1, T.index, null_srcinfo())
@@ -820,10 +948,10 @@ class CheckEffects:
 
         if e1.pred is not None:
             pred1 = e1.pred.subst(sub1)
-            self.solver.add_assertion(self.expr_to_smt(pred1))
+            self.assume(self.expr_to_smt(pred1))
         if e2.pred is not None:
             pred2 = e2.pred.subst(sub2)
-            self.solver.add_assertion(self.expr_to_smt(pred2))
+            self.assume(self.expr_to_smt(pred2))
 
         loc1 = [self.expr_to_smt(i.subst(sub1)) for i in e1.loc]
         loc2 = [self.expr_to_smt(i.subst(sub2)) for i in e2.loc]
@@ -831,7 +959,7 @@ class CheckEffects:
         for i1, i2 in zip(loc1, loc2):
             loc_neq = SMT.Or(loc_neq, SMT.NotEquals(i1, i2))
 
-        if not self.solver.is_valid(loc_neq):
+        if not self.is_valid(loc_neq):
             eg = self.counter_example()
             self.err(
                 e1,
@@ -852,7 +980,7 @@ class CheckEffects:
                 pred2 = self.expr_to_smt(e2.pred)
             disjoint = SMT.Not(SMT.And(pred1, pred2))
 
-            if not self.solver.is_valid(disjoint):
+            if not self.is_valid(disjoint):
                 eg = self.counter_example()
                 self.err(
                     e1,
@@ -919,7 +1047,7 @@ class CheckEffects:
 
     def check_pos_size(self, expr):
         e_pos = SMT.LT(SMT.Int(0), self.expr_to_smt(expr))
-        if not self.solver.is_valid(e_pos):
+        if not self.is_valid(e_pos):
             eg = self.counter_example()
             self.err(
                 expr,
@@ -929,7 +1057,7 @@ class CheckEffects:
 
     def check_non_negative(self, expr):
         e_nn = SMT.LE(SMT.Int(0), self.expr_to_smt(expr))
-        if not self.solver.is_valid(e_nn):
+        if not self.is_valid(e_nn):
             eg = self.counter_example()
             self.err(
                 expr,
@@ -943,7 +1071,7 @@ class CheckEffects:
         for a, s in zip(argshp, sigshp):
             eq_here = SMT.Equals(self.expr_to_smt(a), self.expr_to_smt(s))
             eqv_dim = SMT.And(eqv_dim, eq_here)
-        if not self.solver.is_valid(eqv_dim):
+        if not self.is_valid(eqv_dim):
             eg = self.counter_example()
             self.err(
                 node,
@@ -954,6 +1082,110 @@ class CheckEffects:
                 f" It could be non equal when:\n  {eg}",
             )
 
+    def check_s(self, stmt):
+        # Statements are immutable, so a statement which passed all of the
+        # checks under the same assumptions need not be checked again.
+        checked = _checked_stmts.get(stmt)
+        if checked is not None and self.context in checked:
+            return
+        n_errors = len(self.errors)
+
+        if isinstance(stmt, LoopIR.Seq):
+            self.push()
+
+            def bd_pred(x, lo, hi, srcinfo):
+                x = E.Var(x, T.int, srcinfo)
+                lo = lift_expr(lo)
+                hi = lift_expr(hi)
+                return E.BinOp(
+                    "and",
+                    E.BinOp("<=", lo, x, T.bool, srcinfo),
+                    E.BinOp("<", x, hi, T.bool, srcinfo),
+                    T.bool,
+                    srcinfo,
+                )
+
+            # Check if for-loop bound is non-negative
+            # with the context, before adding assertion
+            iters = LoopIR.BinOp("-", stmt.hi, stmt.lo, T.index, stmt.srcinfo)
+            self.check_non_negative(lift_expr(iters))
+
+            self.assume(
+                self.expr_to_smt(bd_pred(stmt.iter, stmt.lo, stmt.hi, stmt.srcinfo))
+            )
+
+            self.map_stmts(stmt.body)
+            self.pop()
+
+        elif isinstance(stmt, LoopIR.If):
+            # first, do the if-branch
+            self.push()
+            self.assume(self.expr_to_smt(lift_expr(stmt.cond)))
+            self.map_stmts(stmt.body)
+            self.pop()
+
+            # then the else-branch
+            if len(stmt.orelse) > 0:
+                self.push()
+                neg_cond = lift_expr(stmt.cond).negate()
+                self.assume(self.expr_to_smt(neg_cond))
+                self.map_stmts(stmt.orelse)
+                self.pop()
+
+        elif isinstance(stmt, LoopIR.Call):
+            subst = dict()
+            for sig, arg in zip(stmt.f.args, stmt.args):
+                if sig.type.is_numeric():
+                    # need to check that the argument shape
+                    # has all positive dimensions
+                    arg_shape = [lift_expr(s) for s in arg.type.shape()]
+                    for e in arg_shape:
+                        self.check_pos_size(e)
+                    # also, need to check that the argument shape
+                    # is exactly the shape specified in the signature
+                    sig_shape = [
+                        lift_expr(loopir_subst(s, subst)) for s in sig.type.shape()
+                    ]
+                    self.check_call_shape_eqv(arg_shape, sig_shape, arg)
+
+                    # bind potential window-expression
+                    subst[sig.name] = arg
+
+                elif (
+                    sig.type.is_indexable()
+                    or sig.type == T.bool
+                    or sig.type.is_stridable()
+                ):
+                    # in this case we have a LoopIR expression...
+                    subst[sig.name] = arg
+                    if sig.type == T.size:
+                        e_arg = lift_expr(arg)
+                        self.check_pos_size(e_arg)
+
+                else:
+                    assert False, "bad case"
+
+            for p in stmt.f.preds:
+                # Check that asserts are correct
+                p_subst = loopir_subst(p, subst)
+                smt_pred = self.expr_to_smt(lift_expr(p_subst))
+                if not self.is_valid(smt_pred):
+                    eg = self.counter_example()
+                    self.err(
+                        stmt,
+                        f"Could not verify assertion {p} in "
+                        f"{stmt.f.name} at {p.srcinfo}."
+                        f" Assertion is false when:\n  {eg}",
+                    )
+
+        else:
+            assert False, "bad case"
+
+        if len(self.errors) == n_errors:
+            if checked is None:
+                checked = _checked_stmts[stmt] = set()
+            checked.add(self.context)
+
     def preprocess_stmts(self, body):
         for stmt in body:
             if isinstance(stmt, LoopIR.If):
@@ -977,7 +1209,7 @@ class CheckEffects:
                     src = LoopIR.StrideExpr(src_buf, src_dim, T.stride, stmt.srcinfo)
                     dst = LoopIR.StrideExpr(dst_buf, dst_dim, T.stride, stmt.srcinfo)
                     eq = LoopIR.BinOp("==", src, dst, T.bool, stmt.srcinfo)
-                    self.solver.add_assertion(self.expr_to_smt(lift_expr(eq)))
+                    self.assume(self.expr_to_smt(lift_expr(eq)))
             else:
                 pass
 
@@ -990,50 +1222,8 @@ class CheckEffects:
         body_eff = eff_null(body[-1].srcinfo)
 
         for stmt in reversed(body):
-            if isinstance(stmt, LoopIR.Seq):
-                self.push()
-
-                def bd_pred(x, lo, hi, srcinfo):
-                    x = E.Var(x, T.int, srcinfo)
-                    lo = lift_expr(lo)
-                    hi = lift_expr(hi)
-                    return E.BinOp(
-                        "and",
-                        E.BinOp("<=", lo, x, T.bool, srcinfo),
-                        E.BinOp("<", x, hi, T.bool, srcinfo),
-                        T.bool,
-                        srcinfo,
-                    )
-
-                # Check if for-loop bound is non-negative
-                # with the context, before adding assertion
-                iters = LoopIR.BinOp("-", stmt.hi, stmt.lo, T.index, stmt.srcinfo)
-                self.check_non_negative(lift_expr(iters))
-
-                self.solver.add_assertion(
-                    self.expr_to_smt(bd_pred(stmt.iter, stmt.lo, stmt.hi, stmt.srcinfo))
-                )
-
-                self.map_stmts(stmt.body)
-                self.pop()
-
-                body_eff = eff_concat(stmt.eff, body_eff)
-
-            if isinstance(stmt, LoopIR.If):
-                # first, do the if-branch
-                self.push()
-                self.solver.add_assertion(self.expr_to_smt(lift_expr(stmt.cond)))
-                self.map_stmts(stmt.body)
-                self.pop()
-
-                # then the else-branch
-                if len(stmt.orelse) > 0:
-                    self.push()
-                    neg_cond = lift_expr(stmt.cond).negate()
-                    self.solver.add_assertion(self.expr_to_smt(neg_cond))
-                    self.map_stmts(stmt.orelse)
-                    self.pop()
-
+            if isinstance(stmt, (LoopIR.Seq, LoopIR.If, LoopIR.Call)):
+                self.check_s(stmt)
                 body_eff = eff_concat(stmt.eff, body_eff)
 
             elif isinstance(stmt, LoopIR.Alloc):
@@ -1045,54 +1235,6 @@ class CheckEffects:
                 self.check_bounds(stmt.name, shape, body_eff)
                 body_eff = eff_remove_buf(stmt.name, body_eff)
 
-            elif isinstance(stmt, LoopIR.Call):
-                subst = dict()
-                for sig, arg in zip(stmt.f.args, stmt.args):
-                    if sig.type.is_numeric():
-                        # need to check that the argument shape
-                        # has all positive dimensions
-                        arg_shape = [lift_expr(s) for s in arg.type.shape()]
-                        for e in arg_shape:
-                            self.check_pos_size(e)
-                        # also, need to check that the argument shape
-                        # is exactly the shape specified in the signature
-                        sig_shape = [
-                            lift_expr(loopir_subst(s, subst)) for s in sig.type.shape()
-                        ]
-                        self.check_call_shape_eqv(arg_shape, sig_shape, arg)
-
-                        # bind potential window-expression
-                        subst[sig.name] = arg
-
-                    elif (
-                        sig.type.is_indexable()
-                        or sig.type == T.bool
-                        or sig.type.is_stridable()
-                    ):
-                        # in this case we have a LoopIR expression...
-                        subst[sig.name] = arg
-                        if sig.type == T.size:
-                            e_arg = lift_expr(arg)
-                            self.check_pos_size(e_arg)
-
-                    else:
-                        assert False, "bad case"
-
-                for p in stmt.f.preds:
-                    # Check that asserts are correct
-                    p_subst = loopir_subst(p, subst)
-                    smt_pred = self.expr_to_smt(lift_expr(p_subst))
-                    if not self.solver.is_valid(smt_pred):
-                        eg = self.counter_example()
-                        self.err(
-                            stmt,
-                            f"Could not verify assertion {p} in "
-                            f"{stmt.f.name} at {p.srcinfo}."
-                            f" Assertion is false when:\n  {eg}",
-                        )
-
-                body_eff = eff_concat(stmt.eff, body_eff)
-
             else:
                 body_eff = eff_concat(stmt.eff, body_eff)
 
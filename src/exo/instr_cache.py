@@ -0,0 +1,178 @@
+import ast as pyast
+import functools
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+from . import LoopIR as _LoopIR_module
+from . import serialization
+from .API_types import ProcedureBase
+from .builtins import BuiltIn
+from .configs import Config
+from .memory import Memory
+from .prelude import *
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# On-disk cache of checked instruction procedures
+
+"""
+Parsing an `@instr` is cheap, but type-, effect- and alias-checking it
+involves an SMT solver and dominates the import time of the platform
+libraries.  Since the checked LoopIR of an instruction only depends on its
+source, on the Python values it refers to and on the version of Exo, it is
+stored on disk under a hash of those.
+
+The cache lives in `$EXO_CACHE_DIR`, defaulting to `$XDG_CACHE_HOME/exo`
+(i.e. `~/.cache/exo`).  Set `EXO_DISABLE_CACHE=1` to bypass it.  Cache
+entries which cannot be read are ignored, as are procs which refer to
+configurations or other procedures, whose identity cannot be preserved, or
+to Python values which cannot be pickled, whose changes cannot be detected.
+"""
+
+CACHE_FORMAT = 1
+
+
+def cache_dir():
+    if os.environ.get("EXO_DISABLE_CACHE", "0") not in ("", "0"):
+        return None
+    if path := os.environ.get("EXO_CACHE_DIR"):
+        return Path(path)
+    xdg = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(xdg) / "exo"
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+@functools.cache
+def _exo_fingerprint():
+    # Any change to the compiler may change the checked IR, so hash the
+    # sources of the whole package rather than relying on its version.
+    from . import __version__
+
+    h = hashlib.sha256(f"{__version__}:{CACHE_FORMAT}".encode())
+    root = Path(__file__).parent
+    for path in sorted(root.rglob("*.py")):
+        h.update(str(path.relative_to(root)).encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def _env_value(val):
+    if val is None or isinstance(val, (bool, int, float, str)):
+        return repr(val)
+    elif isinstance(val, type) and issubclass(val, Memory):
+        return f"{val.__module__}.{val.__qualname__}"
+    elif isinstance(val, BuiltIn):
+        return f"builtin {val.name()}"
+    elif isinstance(val, (ProcedureBase, Config)):
+        raise _Uncacheable()
+    # other values are keyed by their pickle: by value for data, by
+    # reference for functions and classes; those that cannot be pickled
+    # could change without the key changing
+    try:
+        data = pickle.dumps(val, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        raise _Uncacheable()
+    return hashlib.sha256(data).hexdigest()
+
+
+def instr_key(f, instruction, body, srclocals, func_globals):
+    """
+    Cache key of the `@instr(instruction)` function `f`, whose parsed
+    Python AST is `body` and whose free names resolve in `srclocals` or
+    `func_globals`.  Returns `None` if the result cannot be cached.
+    """
+    assert isinstance(body, pyast.FunctionDef)
+
+    h = hashlib.sha256(_exo_fingerprint().encode())
+    h.update(f"{f.__code__.co_filename}:{f.__code__.co_firstlineno}".encode())
+    h.update(instruction.encode())
+    h.update(pyast.dump(body, include_attributes=True).encode())
+
+    names = sorted({n.id for n in pyast.walk(body) if isinstance(n, pyast.Name)})
+    try:
+        for nm in names:
+            if nm in srclocals:
+                val = srclocals[nm]
+            elif nm in func_globals:
+                val = func_globals[nm]
+            else:
+                continue
+            h.update(f"{nm}={_env_value(val)};".encode())
+    except _Uncacheable:
+        return None
+
+    return h.hexdigest()
+
+
+class _ProcPickler(serialization.ProcPickler):
+    def reducer_override(self, obj):
+        # The instruction would get a copy of the config if it is loaded
+        # before the config is defined
+        if isinstance(obj, Config):
+            raise _Uncacheable()
+        return super().reducer_override(obj)
+
+
+def load(key):
+    """
+    Return the cached LoopIR proc stored under `key`, or `None`.
+    """
+    if key is None or (root := cache_dir()) is None:
+        return None
+    try:
+        with open(root / f"{key}.pkl", "rb") as f:
+            proc = serialization.ProcUnpickler(f).load()
+    except Exception:
+        return None
+    return proc if isinstance(proc, _LoopIR_module.LoopIR.proc) else None
+
+
+def store(key, proc):
+    """
+    Store the LoopIR proc `proc` under `key`, unless it cannot be cached.
+    Failing to write the cache is not an error.
+    """
+    assert isinstance(proc, _LoopIR_module.LoopIR.proc)
+    if key is None or (root := cache_dir()) is None:
+        return
+    if _has_calls(proc):
+        return
+
+    buf = io.BytesIO()
+    try:
+        _ProcPickler(buf, protocol=pickle.HIGHEST_PROTOCOL).dump(proc)
+    except (_Uncacheable, pickle.PicklingError, AttributeError, TypeError):
+        return
+
+    # write atomically, so that concurrent imports never see partial entries
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=root, suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(buf.getvalue())
+        os.replace(tmp, root / f"{key}.pkl")
+    except OSError:
+        Path(tmp).unlink(missing_ok=True)
+
+
+def _has_calls(proc):
+    # The callee would be stored by value and go stale silently
+    class FindCalls(_LoopIR_module.LoopIR_Do):
+        found = False
+
+        def do_s(self, s):
+            if isinstance(s, _LoopIR_module.LoopIR.Call):
+                self.found = True
+            super().do_s(s)
+
+    return FindCalls(proc).found
@@ -169,6 +169,10 @@ class AVX2(Memory):
     def global_(cls):
         return "#include <immintrin.h>"
 
+    @classmethod
+    def num_registers(cls):
+        return 16
+
     @classmethod
     def alloc(cls, new_name, prim_type, shape, srcinfo):
         if not shape:
@@ -216,6 +220,10 @@ class AVX512(Memory):
     def global_(cls):
         return "#include <immintrin.h>"
 
+    @classmethod
+    def num_registers(cls):
+        return 32
+
     @classmethod
     def can_read(cls):
         return False
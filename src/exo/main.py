@@ -24,7 +24,22 @@ def main():
         help="output directory for build artifacts",
     )
     parser.add_argument("--stem", required=True, help="base name for .c and .h files")
-    parser.add_argument("source", type=str, nargs="+", help="source file to compile")
+    parser.add_argument(
+        "source",
+        type=str,
+        nargs="+",
+        help="source file to compile, or library saved by exo.save_procs",
+    )
+    parser.add_argument(
+        "--hoist-addresses",
+        action="store_true",
+        help="hoist loop-invariant address computations out of loops",
+    )
+    parser.add_argument(
+        "--header-only",
+        action="store_true",
+        help="emit the whole library as static inline functions in the header",
+    )
     parser.add_argument(
         "--version",
         action="version",
@@ -37,18 +52,21 @@ def main():
     outdir = Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
 
-    library = [
-        proc
-        for mod in args.source
-        for proc in get_procs_from_module(load_user_code(mod))
-    ]
+    library = [proc for src in args.source for proc in get_procs_from_file(src)]
 
-    exo.compile_procs(library, outdir, f"{args.stem}.c", f"{args.stem}.h")
-    write_depfile(outdir, args.stem)
+    exo.compile_procs(
+        library,
+        outdir,
+        f"{args.stem}.c",
+        f"{args.stem}.h",
+        hoist_addresses=args.hoist_addresses,
+        header_only=args.header_only,
+    )
+    write_depfile(outdir, args.stem, args.source)
 
 
-def write_depfile(outdir, stem):
-    modules = set()
+def write_depfile(outdir, stem, sources=()):
+    modules = {str(Path(src).resolve()) for src in sources}
     for mod in sys.modules.values():
         try:
             modules.add(inspect.getfile(mod))
@@ -66,6 +84,14 @@ def write_depfile(outdir, stem):
     depfile.write_text(contents)
 
 
+def get_procs_from_file(path):
+    with open(path, "rb") as f:
+        header = f.read(len(exo.serialization.MAGIC))
+    if exo.serialization.is_serialized(header):
+        return exo.load_procs(path)
+    return get_procs_from_module(load_user_code(path))
+
+
 def get_procs_from_module(user_module):
     symbols = dir(user_module)
     has_export_list = "__all__" in symbols
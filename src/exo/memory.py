@@ -117,6 +117,15 @@ class Memory(ABC):
     def can_read(cls):
         raise NotImplementedError()
 
+    @classmethod
+    def num_registers(cls):
+        """
+        If this memory is a register file, the number of registers in it;
+        each register holds one row of the innermost dimension of a buffer.
+        `None` for memories that are not register files.
+        """
+        return None
+
     @classmethod
     def write(cls, s, lhs, rhs):
         raise MemGenError(
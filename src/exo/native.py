@@ -0,0 +1,207 @@
+import ctypes
+import os
+import subprocess
+
+import numpy as np
+
+from .LoopIR import LoopIR, T
+from .LoopIR_compiler import find_all_configs, find_all_subprocs, run_compile
+from .LoopIR_interpreter import eval_control_expr
+from .memory import DRAM
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Running compiled procedures from Python
+
+"""
+Helpers to compile a LoopIR procedure to a shared library with the C compiler
+`$CC` (or `cc`) and call it through `ctypes` on numpy buffers, and to draw
+random arguments satisfying its assertions.  `exo.verify` runs scheduled
+procedures with them, and `exo.search` times them.
+
+    write_sources(ir, workdir)
+    lib = NativeLibrary(
+        compile_library(ir.name, workdir, cflags), [str(a.name) for a in ir.args]
+    )
+    args = random_args(ir, np.random.default_rng(0), max_size=32)
+    outputs = lib.run(args)
+
+The library is built in two steps so that the compilation and the loading
+can happen in different processes: a loaded library cannot be pickled.
+"""
+
+_DTYPE = {
+    T.Num: np.float32,
+    T.F16: np.float16,
+    T.F32: np.float32,
+    T.F64: np.float64,
+    T.INT8: np.int8,
+    T.INT32: np.int32,
+}
+
+# sizes are drawn as multiples of one of these, to satisfy divisibility
+# assertions with reasonable probability
+_GRANULES = (1, 2, 4, 8, 16)
+_MAX_ATTEMPTS = 1000
+
+
+# --------------------------------------------------------------------------- #
+# Random arguments
+
+
+def _sample_control(rng, ir, max_size):
+    g = int(rng.choice([g for g in _GRANULES if g <= max_size]))
+    vals = dict()
+    for a in ir.args:
+        if a.type is T.size:
+            vals[str(a.name)] = g * int(rng.integers(1, max_size // g + 1))
+        elif a.type is T.index:
+            vals[str(a.name)] = int(rng.integers(0, max_size + 1))
+        elif a.type is T.bool:
+            vals[str(a.name)] = bool(rng.integers(0, 2))
+    return vals
+
+
+def _random_buffer(rng, shape, typ, simple):
+    dtype = _DTYPE[type(typ)]
+    if simple:
+        # small integers, which every precision represents exactly
+        return rng.integers(-2, 3, size=shape).astype(dtype)
+    elif np.issubdtype(dtype, np.integer):
+        return rng.integers(-8, 8, size=shape).astype(dtype)
+    return rng.uniform(-1, 1, size=shape).astype(dtype)
+
+
+def random_args(ir, rng, max_size, control=None, simple=False):
+    """
+    Draw arguments for `ir` satisfying its assertions, with the given values
+    for the control arguments if `control` is given.  Returns None if there
+    are none with the given control values.
+    """
+    for _ in range(_MAX_ATTEMPTS):
+        args = dict(control or _sample_control(rng, ir, max_size))
+        env = {a.name: args[str(a.name)] for a in ir.args if str(a.name) in args}
+        for a in ir.args:
+            if not a.type.is_numeric():
+                continue
+            if a.type.is_real_scalar():
+                shape = (1,)
+            else:
+                shape = tuple(eval_control_expr(hi, env) for hi in a.type.shape())
+            if any(n < 0 for n in shape):
+                break
+            buf = _random_buffer(rng, shape, a.type.basetype(), simple)
+            args[str(a.name)] = env[a.name] = buf
+        else:
+            if all(eval_control_expr(p, env) for p in ir.preds):
+                return args
+        if control is not None:
+            return None
+
+    raise ValueError(
+        f"could not find arguments satisfying the assertions of {ir.name} "
+        f"with sizes up to {max_size}"
+    )
+
+
+# --------------------------------------------------------------------------- #
+# Building and calling the library
+
+
+def _entry_proc(ir):
+    """
+    A proc taking the arguments of `ir` as dense DRAM buffers and calling it,
+    so that windows are created by the generated code.
+    """
+    args, call_args = [], []
+    for a in ir.args:
+        if a.type.is_numeric() and not issubclass(a.mem or DRAM, DRAM):
+            raise TypeError(
+                f"cannot call {ir.name} from Python: argument '{a.name}' is in "
+                f"{a.mem.name()}, not DRAM"
+            )
+        typ = a.type
+        if typ.is_win():
+            typ = typ.update(is_window=False)
+        args.append(a.update(type=typ))
+        call_args.append(LoopIR.Read(a.name, [], typ, a.srcinfo))
+
+    body = [LoopIR.Call(ir, call_args, None, ir.srcinfo)]
+    return LoopIR.proc("exo_native_entry", args, [], body, None, None, ir.srcinfo)
+
+
+_SIZE_QUERY = """
+int exo_native_sizeof_int_fast32(void) { return (int)sizeof(int_fast32_t); }
+int exo_native_sizeof_ctxt(void) { return %s; }
+"""
+
+
+def write_sources(ir, workdir):
+    """
+    Write the C sources of a library calling `ir` to the new directory
+    `workdir`.
+
+    Raises:
+        TypeError: if `ir` takes a buffer outside of DRAM
+    """
+    workdir.mkdir(parents=True)
+    entry = _entry_proc(ir)
+    c_file, h_file = run_compile([entry], "native.h")
+    # procedures using configurations take a context holding them
+    configs = find_all_configs(find_all_subprocs([entry]))
+    ctxt_size = "(int)sizeof(native_Context)" if configs else "0"
+    (workdir / "native.c").write_text(c_file + _SIZE_QUERY % ctxt_size)
+    (workdir / "native.h").write_text(h_file)
+
+
+def compile_library(name, workdir, cflags):
+    """
+    Compile the sources written by `write_sources` to `workdir` with the
+    flags `cflags`, and return the path of the shared library.
+
+    Raises:
+        RuntimeError: if the compiler fails, with its output
+    """
+    cc = os.environ.get("CC", "cc")
+    lib = workdir / "libnative.so"
+    cmd = [cc, *cflags, "-shared", "-fPIC", "-o", str(lib), "native.c", "-lm"]
+    res = subprocess.run(cmd, cwd=workdir, capture_output=True, text=True)
+    if res.returncode != 0:
+        raise RuntimeError(f"failed to compile {name}:\n{res.stderr}")
+    return lib
+
+
+class NativeLibrary:
+    """
+    The library at `path` built by `compile_library`, for a procedure with
+    the arguments `arg_names`.
+    """
+
+    def __init__(self, path, arg_names):
+        self.dll = ctypes.CDLL(str(path))
+        self.fn = self.dll.exo_native_entry
+        self.fn.restype = None
+        self.arg_names = arg_names
+        int_size = self.dll.exo_native_sizeof_int_fast32()
+        self.c_int = ctypes.c_int64 if int_size == 8 else ctypes.c_int32
+        self.ctxt_size = self.dll.exo_native_sizeof_ctxt()
+
+    def run(self, args):
+        """
+        Call the procedure on copies of the buffers of `args` (by argument
+        name), and return the copies.  The configurations it uses start out
+        zeroed.
+        """
+        bufs = {nm: v.copy() for nm, v in args.items() if isinstance(v, np.ndarray)}
+        ctxt = ctypes.create_string_buffer(self.ctxt_size) if self.ctxt_size else None
+        c_args = [ctypes.cast(ctxt, ctypes.c_void_p)]
+        for nm in self.arg_names:
+            v = args[nm]
+            if isinstance(v, np.ndarray):
+                c_args.append(bufs[nm].ctypes.data_as(ctypes.c_void_p))
+            elif isinstance(v, bool):
+                c_args.append(ctypes.c_bool(v))
+            else:
+                c_args.append(self.c_int(v))
+        self.fn(*c_args)
+        return bufs
@@ -1,3 +1,5 @@
+import inspect
+import time
 from collections import ChainMap
 from dataclasses import dataclass
 from typing import Any, Union
@@ -11,6 +13,8 @@ from pysmt import shortcuts as SMT
 
 from asdl_adt import ADT, validators
 from asdl_adt.validators import ValidationError
+from . import solver_limits
+from .solver_service import get_solver_service
 from .LoopIR import T, LoopIR
 from .prelude import *
 
@@ -614,6 +618,69 @@ def is_ternary(x):
     return isinstance(x, TernVal)
 
 
+_Z3_NO_TIMEOUT = 2**32 - 1
+
+
+def _z3_rlimit_count(slv):
+    # the resources used by z3 so far, over all solvers
+    return slv.statistics().get_key_value("rlimit count")
+
+
+def _z3_run(slv, rlimit, timeout):
+    # the result of checking the assertions of `slv`, the reason if it is
+    # unknown, and the resources and the time (in ms) the check used
+    slv.set("rlimit", rlimit or 0)
+    slv.set("timeout", timeout or _Z3_NO_TIMEOUT)
+    count0, time0 = _z3_rlimit_count(slv), time.perf_counter()
+    result = slv.check()
+    used = _z3_rlimit_count(slv) - count0
+    elapsed = 1000 * (time.perf_counter() - time0)
+    reason = slv.reason_unknown() if result == Z3.unknown else ""
+    return str(result), reason, used, elapsed
+
+
+def _z3_check_smt2(smt2, rlimit, timeout):
+    # run by the workers of the solver service, in a solver of their own
+    slv = z3lib.Solver()
+    slv.from_string(smt2)
+    return _z3_run(slv, rlimit, timeout)
+
+
+class SMTQuery:
+    """
+    The answer to a query of `SMTSolver.verify_async` or `satisfy_async`,
+    which may still be computed by the solver service.
+    """
+
+    def __init__(self, finish):
+        self._finish = finish
+        self._answer = None
+
+    @staticmethod
+    def done(answer):
+        query = SMTQuery(None)
+        query._answer = answer
+        return query
+
+    def result(self):
+        """
+        Wait for the answer, and return it.
+        """
+        if self._finish is not None:
+            finish, self._finish = self._finish, None
+            self._answer = finish()
+        return self._answer
+
+
+def _current_check():
+    frame = inspect.currentframe()
+    while frame is not None:
+        if frame.f_code.co_name.startswith("Check_"):
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return "<<<unknown check>>>"
+
+
 class SMTSolver:
     def __init__(self, verbose=False):
         self.env = ChainMap()
@@ -725,6 +792,13 @@ class SMTSolver:
             # self.solver.add_assertion(smt_e)
 
     def satisfy(self, e):
+        return self.satisfy_async(e).result()
+
+    def satisfy_async(self, e):
+        """
+        Start checking whether `e` is satisfiable under the assumptions, and
+        return the `SMTQuery` of the answer.
+        """
         assert e.type is T.bool
         e = e.simplify()
         self.push()
@@ -734,21 +808,22 @@ class SMTSolver:
         assert not is_ternary(smt_e), "formulas must be classical"
         if self.Z3_MODE:
             self.z3slv.assert_exprs(smt_e)
-            result = self.z3slv.check()
-            if result == Z3.sat:
-                is_sat = True
-            elif result == Z3.unsat:
-                is_sat = False
-            else:
-                raise TypeError("unknown result from z3")
+            query = self._z3_check(e, lambda result: result == "sat")
         else:
             self.z3.add_assertion(smt_e)
-            is_sat = self.z3.run_check_sat()
+            query = SMTQuery.done(self.z3.run_check_sat())
         # is_sat      = self.solver.is_sat(smt_e)
         self.pop()
-        return is_sat
+        return query
 
     def verify(self, e):
+        return self.verify_async(e).result()
+
+    def verify_async(self, e):
+        """
+        Start checking whether `e` is valid under the assumptions, and return
+        the `SMTQuery` of the answer.
+        """
         assert e.type is T.bool
         e = e.simplify()
         self.push()
@@ -771,19 +846,43 @@ class SMTSolver:
             self.z3slv.assert_exprs(Z3.Not(smt_e))
             if self.verbose and self.Z3_MODE:
                 print(self.z3slv.to_smt2())
-            result = self.z3slv.check()
-            if result == Z3.sat:
-                is_valid = False
-            elif result == Z3.unsat:
-                is_valid = True
-            else:
-                raise TypeError("unknown result from z3")
+            query = self._z3_check(e, lambda result: result == "unsat")
         else:
             self.z3.add_assertion(SMT.Not(smt_e))
-            is_valid = not self.z3.run_check_sat()
+            query = SMTQuery.done(not self.z3.run_check_sat())
         # is_valid    = self.solver.is_valid(smt_e)
         self.pop()
-        return is_valid
+        return query
+
+    def _z3_check(self, e, answer):
+        # check the assertions under the limits of `smt_limits`, on the
+        # solver service if there is one
+        rlimit, timeout, from_budget = solver_limits.query_limits()
+        settle = solver_limits.reserve(rlimit)
+        check = _current_check()
+        if service := get_solver_service():
+            smt2 = self.z3slv.to_smt2()
+            run = service.submit(_z3_check_smt2, smt2, rlimit, timeout).result
+        else:
+            local = _z3_run(self.z3slv, rlimit, timeout)
+            run = lambda: local
+
+        def finish():
+            result, reason, used, elapsed = run()
+            settle(used)
+            if result != "unknown":
+                return answer(result)
+
+            # z3 does not always tell which limit interrupted it
+            if "resource limit" in reason or (rlimit and used >= rlimit):
+                limit = "schedule_rlimit" if from_budget else "rlimit"
+            elif reason in ("timeout", "canceled") or (timeout and elapsed >= timeout):
+                limit = "timeout"
+            else:
+                raise TypeError(f"unknown result from z3: {reason}")
+            raise solver_limits.limit_hit(check, limit, str(e))
+
+        return SMTQuery(finish)
 
     def counter_example(self):
         raise NotImplementedError("Out of Date")
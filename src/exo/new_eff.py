@@ -4,6 +4,7 @@ from itertools import chain
 
 from .LoopIR import Alpha_Rename, SubstArgs, LoopIR_Do
 from .configs import reverse_config_lookup, Config
+from .dep_analysis import commutes, loops_reorder, loop_fissions
 from .new_analysis_core import *
 from .proc_eqv import get_repr_proc
 
@@ -1550,6 +1551,11 @@ class SchedulingError(Exception):
             message += self._format_named_blob(name.title(), blob)
         super().__init__(message)
 
+    def __reduce__(self):
+        # the message is already formatted, and must not be prefixed again
+        # when unpickled (e.g. from a worker of the solver service)
+        return _unpickle_error, (type(self), self.args), self.__dict__
+
     @staticmethod
     def _format_named_blob(name, blob):
         blob = str(blob).rstrip()
@@ -1559,17 +1565,27 @@ class SchedulingError(Exception):
 
     @staticmethod
     def _get_scheduling_ops():
+        # walk the frames directly: `inspect.stack()` also reads the source
+        # of every frame, which dominates the cost of failed operations
         ops = []
-        for frame in inspect.stack():
-            if obj := frame[0].f_locals.get("self"):
-                fn = frame.function
+        frame = inspect.currentframe()
+        while frame is not None:
+            if obj := frame.f_locals.get("self"):
+                fn = frame.f_code.co_name
                 if isinstance(obj, ProcedureBase) and not fn.startswith("_"):
                     ops.append(fn)
+            frame = frame.f_back
         if not ops:
             ops = ["<<<unknown directive>>>"]
         return ops
 
 
+def _unpickle_error(cls, args):
+    err = Exception.__new__(cls)
+    err.args = args
+    return err
+
+
 def loop_globenv(i, lo_expr, hi_expr, body):
     assert isinstance(lo_expr, LoopIR.expr)
     assert isinstance(hi_expr, LoopIR.expr)
@@ -1579,6 +1595,9 @@ def loop_globenv(i, lo_expr, hi_expr, body):
 
 
 def Check_ReorderStmts(proc, s1, s2):
+    if commutes(proc, s1, s2):
+        return
+
     ctxt = ContextExtraction(proc, [s1, s2])
 
     p = ctxt.get_control_predicate()
@@ -1601,6 +1620,11 @@ def Check_ReorderStmts(proc, s1, s2):
 
 
 def Check_ReorderLoops(proc, s):
+    assert len(s.body) == 1
+    assert isinstance(s.body[0], LoopIR.Seq)
+    if loops_reorder(proc, s):
+        return
+
     ctxt = ContextExtraction(proc, [s])
 
     p = ctxt.get_control_predicate()
@@ -1610,8 +1634,6 @@ def Check_ReorderLoops(proc, s):
     slv.push()
     slv.assume(AMay(p))
 
-    assert len(s.body) == 1
-    assert isinstance(s.body[0], LoopIR.Seq)
     x_loop = s
     y_loop = s.body[0]
     body = y_loop.body
@@ -1679,6 +1701,10 @@ def Check_ReorderLoops(proc, s):
 #                     Commutes(a1', a2) /\ AllocCommutes(a1, a2) )
 #
 def Check_FissionLoop(proc, loop, stmts1, stmts2, no_loop_var_1=False):
+    assert isinstance(loop, LoopIR.Seq)
+    if loop_fissions(proc, loop, stmts1, stmts2):
+        return
+
     ctxt = ContextExtraction(proc, [loop])
     chgG = get_changing_scalars(proc.body)
 
@@ -1775,11 +1801,11 @@ def Check_DeleteConfigWrite(proc, stmts):
         pt_e = A.Var(pt.name, pt.typ, null_srcinfo())
         # cfg_unwritten = ADef( ANot(is_elem(pt, WrG)) )
         cfg_unchanged = ADef(G(AEq(pt_e, stmtsG(pt_e))))
-        return slv.verify(cfg_unchanged)
+        return slv.verify_async(cfg_unchanged)
 
-    cfg_mod = {
-        pt.name: pt for pt in get_point_exprs(WrG) if not is_cfg_unmod_by_stmts(pt)
-    }
+    # the queries of the variables are independent, make all of them first
+    cfg_unmod = [(pt, is_cfg_unmod_by_stmts(pt)) for pt in get_point_exprs(WrG)]
+    cfg_mod = {pt.name: pt for pt, unmod in cfg_unmod if not unmod.result()}
 
     # consider every global that might be modified
     cfg_mod_visible = set()
@@ -1909,8 +1935,9 @@ def Check_BufferRW(proc, stmts, buf, ndim):
     write = LIsct(wholebuf, Mod)
     read = LIsct(wholebuf, LUnion(Rd, Red))
 
-    no_read = slv.verify(ADef(is_empty(read)))
-    no_write = slv.verify(ADef(is_empty(write)))
+    no_read = slv.verify_async(ADef(is_empty(read)))
+    no_write = slv.verify_async(ADef(is_empty(write)))
+    no_read, no_write = no_read.result(), no_write.result()
     slv.pop()
 
     return (not no_read), (not no_write)
@@ -2096,8 +2123,10 @@ def Check_CodeIsDead(proc, stmts):
 
     slv = SMTSolver(verbose=False)
     slv.push()
-    mod_unread_in_proc = slv.verify(mod_unread_in_proc)
-    mod_unread_outside = slv.verify(mod_unread_outside)
+    mod_unread_in_proc = slv.verify_async(mod_unread_in_proc)
+    mod_unread_outside = slv.verify_async(mod_unread_outside)
+    mod_unread_in_proc = mod_unread_in_proc.result()
+    mod_unread_outside = mod_unread_outside.result()
     slv.pop()
     if not mod_unread_in_proc:
         raise SchedulingError(
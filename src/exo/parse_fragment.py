@@ -1,4 +1,4 @@
-import inspect
+import sys
 from collections import ChainMap
 
 from . import pyparser
@@ -23,10 +23,12 @@ def parse_fragment(
     proc, fragment, ctx_stmt, call_depth=0, configs=[], scope="before", expr_holes=None
 ):
     # get source location where this is getting called from
-    caller = inspect.getframeinfo(inspect.stack()[call_depth + 1][0])
+    caller = sys._getframe(call_depth + 1)
 
     # parse the pattern we're going to use to match
-    p_ast = pyparser.pattern(fragment, filename=caller.filename, lineno=caller.lineno)
+    p_ast = pyparser.pattern(
+        fragment, filename=caller.f_code.co_filename, lineno=caller.f_lineno
+    )
     if isinstance(p_ast, PAST.expr):
         return ParseFragment(
             p_ast, proc, ctx_stmt, configs, scope, expr_holes
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-import inspect
 import re
+import sys
 from typing import Optional, Iterable
 
 import exo.pyparser as pyparser
@@ -67,11 +67,11 @@ def match_pattern(context, pattern_str, call_depth=0, default_match_no=None):
         match_no = default_match_no  # None means match-all
 
     # get source location where this is getting called from
-    caller = inspect.getframeinfo(inspect.stack()[call_depth + 1][0])
+    caller = sys._getframe(call_depth + 1)
 
     # parse the pattern we're going to use to match
     p_ast = pyparser.pattern(
-        pattern_str, filename=caller.filename, lineno=caller.lineno
+        pattern_str, filename=caller.f_code.co_filename, lineno=caller.f_lineno
     )
 
     # do the pattern match, to find the nodes in ast
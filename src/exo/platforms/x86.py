@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import numpy as np
+
 from .. import instr, DRAM
+from ..builtins import relu, select
 from ..libs.memories import AVX2, AVX512
 
 
@@ -178,6 +181,24 @@ def mm256_add_pd(out: [f64][4] @ AVX2, x: [f64][4] @ AVX2, y: [f64][4] @ AVX2):
         out[i] = x[i] + y[i]
 
 
+@instr(f"{{dst_data}} = {relu.vector_compile(['{src_data}'], AVX2, 'float')};")
+def mm256_relu_ps(dst: [f32][8] @ AVX2, src: [f32][8] @ AVX2):
+    assert stride(dst, 0) == 1
+    assert stride(src, 0) == 1
+
+    for i in seq(0, 8):
+        dst[i] = relu(src[i])
+
+
+@instr(f"{{dst_data}} = {relu.vector_compile(['{src_data}'], AVX2, 'double')};")
+def mm256_relu_pd(dst: [f64][4] @ AVX2, src: [f64][4] @ AVX2):
+    assert stride(dst, 0) == 1
+    assert stride(src, 0) == 1
+
+    for i in seq(0, 4):
+        dst[i] = relu(src[i])
+
+
 # --------------------------------------------------------------------------- #
 #   AVX512 intrinsics
 # --------------------------------------------------------------------------- #
@@ -261,7 +282,7 @@ def mm512_mask_fmadd_ps(
             C[i] += A[i] * B[i]
 
 
-@instr("{dst_data} = _mm512_max_ps({src_data}, (__m512){{0}});")
+@instr(f"{{dst_data}} = {relu.vector_compile(['{src_data}'], AVX512, 'float')};")
 def mm512_relu_ps(dst: [f32][16] @ AVX512, src: [f32][16] @ AVX512):
     assert stride(dst, 0) == 1
     assert stride(src, 0) == 1
@@ -336,12 +357,10 @@ def avx2_fmadd_memu_ps(dst: [f32][8] @ DRAM, val: [f32][8] @ AVX2):
         dst[i] += val[i]
 
 
-@instr(
-    """
-{out_data} = _mm256_blendv_ps ({z_data}, {y_data}, 
-_mm256_cmp_ps ({x_data}, {v_data}, _CMP_LT_OQ));
-"""
-)
+_select_args = ["{x_data}", "{v_data}", "{y_data}", "{z_data}"]
+
+
+@instr(f"{{out_data}} = {select.vector_compile(_select_args, AVX2, 'float')};")
 def avx2_select_ps(
     out: [f32][8] @ AVX2,
     x: [f32][8] @ AVX2,
@@ -349,9 +368,6 @@ def avx2_select_ps(
     y: [f32][8] @ AVX2,
     z: [f32][8] @ AVX2,
 ):
-    # WARNING: This instruction above use a lower precision
-    #    float32 (C float) than the implementation of
-    #    the builtin which uses float64 (C double)
     assert stride(out, 0) == 1
     assert stride(x, 0) == 1
     assert stride(v, 0) == 1
@@ -362,12 +378,7 @@ def avx2_select_ps(
         out[i] = select(x[i], v[i], y[i], z[i])
 
 
-@instr(
-    """
-{out_data} = _mm256_blendv_pd ({z_data}, {y_data},
-_mm256_cmp_pd ({x_data}, {v_data}, _CMP_LT_OQ));
-"""
-)
+@instr(f"{{out_data}} = {select.vector_compile(_select_args, AVX2, 'double')};")
 def avx2_select_pd(
     out: [f64][4] @ AVX2,
     x: [f64][4] @ AVX2,
@@ -511,3 +522,78 @@ def avx2_convert_f32_upper_to_f64(dst: [f64][4] @ AVX2, src: [f32][8] @ AVX2):
 
     for i in seq(0, 4):
         dst[i] = src[4 + i]
+
+
+# --------------------------------------------------------------------------- #
+#   NumPy implementations, used by the interpreter
+# --------------------------------------------------------------------------- #
+
+
+def _copy(dst, src):
+    dst[:] = src
+
+
+def _add_to(dst, src):
+    dst += src
+
+
+def _fmadd(dst, src1, src2):
+    dst += src1 * src2
+
+
+def _set0(dst):
+    dst[:] = 0.0
+
+
+def _masked_copy(N, dst, src):
+    dst[:N] = src[:N]
+
+
+def _relu(dst, src):
+    dst[:] = relu.interpret([src])
+
+
+def _select(out, x, v, y, z):
+    out[:] = select.interpret([x, v, y, z])
+
+
+for _instr, _impl in [
+    (mm256_setzero_ps, _set0),
+    (mm256_setzero_pd, _set0),
+    (avx2_set0_ps, _set0),
+    (mm256_loadu_ps, _copy),
+    (mm256_loadu_pd, _copy),
+    (mm256_storeu_ps, _copy),
+    (mm256_storeu_pd, _copy),
+    (mm512_loadu_ps, _copy),
+    (mm512_storeu_ps, _copy),
+    (avx2_reg_copy_ps, _copy),
+    (avx2_reg_copy_pd, _copy),
+    (mm256_broadcast_ss, _copy),
+    (mm256_broadcast_sd, _copy),
+    (mm256_broadcast_ss_scalar, _copy),
+    (mm256_broadcast_sd_scalar, _copy),
+    (mm512_set1_ps, _copy),
+    (mm256_fmadd_ps, _fmadd),
+    (mm256_fmadd_pd, _fmadd),
+    (mm256_fmadd_ps_broadcast, _fmadd),
+    (mm512_fmadd_ps, lambda A, B, C: _fmadd(C, A, B)),
+    (avx2_fmadd_memu_ps, _add_to),
+    (avx2_reduce_add_wide_ps, _add_to),
+    (avx2_reduce_add_wide_pd, _add_to),
+    (mm256_mul_ps, lambda out, x, y: np.multiply(x, y, out=out)),
+    (mm256_mul_pd, lambda out, x, y: np.multiply(x, y, out=out)),
+    (mm256_add_ps, lambda out, x, y: np.add(x, y, out=out)),
+    (mm256_add_pd, lambda out, x, y: np.add(x, y, out=out)),
+    (avx2_sign_ps, lambda dst, src: np.negative(src, out=dst)),
+    (avx2_sign_pd, lambda dst, src: np.negative(src, out=dst)),
+    (mm256_relu_ps, _relu),
+    (mm256_relu_pd, _relu),
+    (mm512_relu_ps, _relu),
+    (avx2_select_ps, _select),
+    (avx2_select_pd, _select),
+    (mm512_maskz_loadu_ps, _masked_copy),
+    (mm512_mask_storeu_ps, _masked_copy),
+    (avx2_mask_storeu_ps, _masked_copy),
+]:
+    _instr.numpy_impl(_impl)
@@ -1,5 +1,8 @@
 from inspect import currentframe as _curr_frame, getframeinfo as _get_frame_info
+from itertools import count as _count
 from re import compile as _re_compile
+from sys import intern as _intern
+from weakref import ref as _ref
 
 
 def is_pos_int(obj):
@@ -18,15 +21,39 @@ def is_valid_name(obj):
     )
 
 
+# ids order the symbols by creation; `next` on a count is a single C call
+_next_sym_id = _count(1).__next__
+_new_sym = object.__new__
+
+# validated symbol names, each mapped to its interned copy
+_sym_names = dict()
+
+
+def _sym_name(nm):
+    if not is_valid_name(nm):
+        raise TypeError(f"expected an alphanumeric name string, but got '{nm}'")
+    if len(_sym_names) >= 1 << 16:
+        _sym_names.clear()
+    nm = _intern(str(nm))
+    _sym_names[nm] = nm
+    return nm
+
+
 class Sym:
-    _unq_count = 1
+    """
+    A unique symbol with a (not necessarily unique) name.
+
+    Symbols compare equal only to themselves, and are ordered by name and
+    then by creation.  They are created by the thousand during rewrites and
+    analyses, so they are kept small (slots, interned names), and each name
+    is only validated the first time it is used.
+    """
+
+    __slots__ = ("_nm", "_id", "__weakref__")
 
     def __init__(self, nm):
-        if not is_valid_name(nm):
-            raise TypeError(f"expected an alphanumeric name string, but got '{nm}'")
-        self._nm = nm
-        self._id = Sym._unq_count
-        Sym._unq_count += 1
+        self._nm = _sym_names.get(nm) or _sym_name(nm)
+        self._id = _next_sym_id()
 
     def __str__(self):
         return self._nm
@@ -34,26 +61,52 @@ class Sym:
     def __repr__(self):
         return f"{self._nm}_{self._id}"
 
-    def __hash__(self):
-        return id(self)
+    # identity hash, implemented in C
+    __hash__ = object.__hash__
 
     def __lt__(self, rhs):
         assert isinstance(rhs, Sym)
-        return (self._nm, self._id) < (rhs._nm, rhs._id)
+        if self._nm == rhs._nm:
+            return self._id < rhs._id
+        return self._nm < rhs._nm
 
     def __eq__(self, rhs):
-        if not isinstance(rhs, Sym):
-            return False
-        return self._nm == rhs._nm and self._id == rhs._id
-
-    def __ne__(self, rhs):
-        return not (self == rhs)
+        return self is rhs or (isinstance(rhs, Sym) and self._id == rhs._id)
 
     def name(self):
         return self._nm
 
     def copy(self):
-        return Sym(self._nm)
+        # the name was validated when `self` was created
+        sym = _new_sym(Sym)
+        sym._nm = self._nm
+        sym._id = _next_sym_id()
+        return sym
+
+
+class StmtCache:
+    """
+    A cache keyed by the identity of LoopIR nodes (which compare
+    structurally), which forgets a node as soon as it is garbage collected.
+    """
+
+    def __init__(self):
+        self._entries = dict()
+
+    def get(self, stmt):
+        entry = self._entries.get(id(stmt))
+        if entry is None or entry[0]() is not stmt:
+            return None
+        return entry[1]
+
+    def __setitem__(self, stmt, value):
+        key, entries = id(stmt), self._entries
+
+        def forget(r):
+            if (entry := entries.get(key)) is not None and entry[0] is r:
+                del entries[key]
+
+        entries[key] = (_ref(stmt, forget), value)
 
 
 # from a github gist by victorlei
@@ -79,9 +79,8 @@ def get_src_locals(*, depth):
     """
     Get global and local environments for context capture purposes
     """
-    stack_frames: [inspect.FrameInfo] = inspect.stack()
-    assert len(stack_frames) >= depth
-    func_locals = stack_frames[depth].frame.f_locals
+    # `inspect.stack()` would look up the source of every frame on the stack
+    func_locals = sys._getframe(depth).f_locals
     assert isinstance(func_locals, dict)
     return ChainMap(func_locals)
 
@@ -150,7 +149,14 @@ class Parser:
 
         self.push()
 
-        builtins = {"sin": sin, "relu": relu, "select": select}
+        builtins = {
+            "sin": sin,
+            "exp": exp,
+            "tanh": tanh,
+            "sigmoid": sigmoid,
+            "relu": relu,
+            "select": select,
+        }
         if is_fragment:
             self.AST = PAST
         else:
@@ -1,4 +1,18 @@
-from .LoopIR import LoopIR
+import math
+
+from .LoopIR import LoopIR, T
+
+
+def _mul_bound(a, b):
+    # 0 * inf is nan in Python, but an empty factor bounds the product
+    if a == 0 or b == 0:
+        return 0
+    return a * b
+
+
+def _div_bound(a, d):
+    # inf // d is nan in Python; unbounded stays unbounded
+    return a if math.isinf(a) else a // d
 
 
 class IndexRangeAnalysis:
@@ -16,6 +30,10 @@ class IndexRangeAnalysis:
         `[T[0], T[1]]` (both inclusive).
         2. A `None` representing no knowledge of the value range
         or a failure to perform the analysis.
+
+    Either end of a range tuple may be infinite (`-math.inf` or
+    `math.inf`) when only one side of the range is known, e.g. a
+    `size` argument is in `[1, math.inf]`.
     """
 
     @staticmethod
@@ -31,7 +49,7 @@ class IndexRangeAnalysis:
         if lhs_range[0] < 0 or rhs_range[0] < 0:
             return None
 
-        a = [i * j for i in lhs_range for j in rhs_range]
+        a = [_mul_bound(i, j) for i in lhs_range for j in rhs_range]
         return (min(a), max(a))
 
     @staticmethod
@@ -43,7 +61,7 @@ class IndexRangeAnalysis:
             return None
 
         d = rhs_range[0]
-        return (lhs_range[0] // d, lhs_range[1] // d)
+        return (_div_bound(lhs_range[0], d), _div_bound(lhs_range[1], d))
 
     @staticmethod
     def merge_mod(lhs_range, rhs_range):
@@ -51,6 +69,9 @@ class IndexRangeAnalysis:
         assert rhs_range[0] > 0
 
         m = rhs_range[0]
+        if math.isinf(lhs_range[0]) or math.isinf(lhs_range[1]):
+            return (0, m)
+
         if lhs_range[0] // m == lhs_range[1] // m:
             return (lhs_range[0] % m, lhs_range[1] % m)
 
@@ -105,3 +126,62 @@ class IndexRangeAnalysis:
             return merge_binop[e.op](lhs_range, rhs_range)
         else:
             return None
+
+
+def _refine_arg_range(env, pred):
+    # Narrow the range of an index/size argument `x` from a precondition
+    # comparing `x` or `x / d` against a constant, e.g. `N >= 4`
+    if not isinstance(pred, LoopIR.BinOp):
+        return
+    flipped = {"<": ">", ">": "<", "<=": ">=", ">=": "<=", "==": "=="}
+    if pred.op not in flipped:
+        return
+
+    op, lhs, rhs = pred.op, pred.lhs, pred.rhs
+    if isinstance(lhs, LoopIR.Const):
+        op, lhs, rhs = flipped[op], rhs, lhs
+    if not isinstance(rhs, LoopIR.Const):
+        return
+
+    d = 1
+    if (
+        isinstance(lhs, LoopIR.BinOp)
+        and lhs.op == "/"
+        and isinstance(lhs.rhs, LoopIR.Const)
+    ):
+        lhs, d = lhs.lhs, lhs.rhs.val
+    if not (isinstance(lhs, LoopIR.Read) and lhs.name in env):
+        return
+
+    # `x / d` rounds down, so `x / d` in `[c_lo, c_hi]` iff
+    # `x` in `[c_lo * d, c_hi * d + d - 1]`
+    c = rhs.val
+    c_lo, c_hi = {
+        "<": (-math.inf, c - 1),
+        "<=": (-math.inf, c),
+        ">": (c + 1, math.inf),
+        ">=": (c, math.inf),
+        "==": (c, c),
+    }[op]
+    lo, hi = env[lhs.name] or (-math.inf, math.inf)
+    env[lhs.name] = (max(lo, c_lo * d), min(hi, c_hi * d + d - 1))
+
+
+def arg_range_env(proc):
+    """
+    Build an environment for `IndexRangeAnalysis` with the ranges of the
+    `size` and `index` arguments of `proc` which follow from sizes being
+    positive and from its preconditions.  Arguments with no known range
+    are left out.
+    """
+    env = dict()
+    for a in proc.args:
+        if a.type == T.size:
+            env[a.name] = (1, math.inf)
+        elif a.type == T.index:
+            env[a.name] = None
+
+    for pred in proc.preds:
+        _refine_arg_range(env, pred)
+
+    return {nm: rng for nm, rng in env.items() if rng is not None}
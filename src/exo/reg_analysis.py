@@ -0,0 +1,138 @@
+import math
+import warnings
+from collections import Counter
+
+from .LoopIR import LoopIR, FreeVars
+from .range_analysis import IndexRangeAnalysis, arg_range_env
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Register Pressure Analysis
+
+"""
+Memories like `AVX2` or `AVX512` model a register file: every allocation
+becomes an array of vector registers, one per row of the innermost,
+vector-wide dimension.  Nothing stops a schedule from staging more of those
+than the ISA has, in which case the C compiler silently spills them to the
+stack.  This pass estimates how many registers of each register-file memory
+(see `Memory.num_registers`) are live at once.
+
+A buffer is considered live from its `Alloc` up to the last statement of
+the same block which uses it, either directly or through a window, and
+throughout every statement nested in that range; in particular a buffer
+used inside a loop is live for all iterations of that loop.  Buffers passed
+as arguments in a register-file memory are live throughout the proc.
+"""
+
+
+class RegisterPressureWarning(UserWarning):
+    """
+    Issued at compile time for procs which are estimated to need more
+    registers than a register-file memory provides. Turn it into an error
+    with `warnings.simplefilter("error", RegisterPressureWarning)`.
+    """
+
+
+def alloc_registers(mem, typ, env):
+    """
+    Number of registers of `mem` that a buffer of type `typ` occupies at
+    most, given the ranges `env` of the size variables in its shape (see
+    `IndexRangeAnalysis`).  Zero if `mem` is not a register file and
+    `math.inf` if the number of rows cannot be bounded.
+    """
+    if mem is None or mem.num_registers() is None:
+        return 0
+
+    n_regs = 1
+    for sz in typ.shape()[:-1]:
+        sz_range = IndexRangeAnalysis(sz, env).result()
+        if sz_range is None:
+            return math.inf
+        n_regs *= sz_range[1]
+    return n_regs
+
+
+def _live_ranges(stmts, env):
+    # alloc name -> [first index, last index, mem, #registers]
+    ranges = dict()
+    aliases = dict()
+    for i, s in enumerate(stmts):
+        if isinstance(s, LoopIR.Alloc):
+            if n_regs := alloc_registers(s.mem, s.type, env):
+                ranges[s.name] = [i, i, s.mem, n_regs]
+        elif isinstance(s, LoopIR.WindowStmt):
+            aliases[s.lhs] = s.rhs.name
+
+        for nm in FreeVars([s]).result():
+            while nm in aliases:
+                nm = aliases[nm]
+            if nm in ranges:
+                ranges[nm][1] = i
+
+    return ranges.values()
+
+
+def _live_at(ranges, i):
+    live = Counter()
+    for lo, hi, mem, n_regs in ranges:
+        if lo <= i <= hi:
+            live[mem] += n_regs
+    return live
+
+
+def _block_peak(stmts, live, env, rng=None):
+    ranges = _live_ranges(stmts, env)
+    peak = Counter(live)
+    for i in rng if rng is not None else range(len(stmts)):
+        s = stmts[i]
+        live_here = live + _live_at(ranges, i)
+        peak |= live_here
+        if isinstance(s, LoopIR.If):
+            peak |= _block_peak(s.body, live_here, env)
+            peak |= _block_peak(s.orelse, live_here, env)
+        elif isinstance(s, LoopIR.Seq):
+            peak |= _block_peak(s.body, live_here, env)
+
+    return peak
+
+
+def register_pressure(proc, path=(), attr="body", rng=None):
+    """
+    Estimate the peak number of live registers of every register-file memory
+    within the statements `rng` (default: all) of the block `attr` of the
+    node reached from `proc` by the cursor path `path`.  Returns a `Counter`
+    mapping memories to register counts.
+    """
+    assert isinstance(proc, LoopIR.proc)
+
+    env = arg_range_env(proc)
+    live = Counter()
+    for a in proc.args:
+        if a.type.is_numeric():
+            live[a.mem] += alloc_registers(a.mem, a.type, env)
+    live = +live
+
+    node = proc
+    for step_attr, i in path:
+        block = getattr(node, step_attr)
+        live += _live_at(_live_ranges(block, env), i)
+        node = block[i]
+
+    return _block_peak(getattr(node, attr), live, env, rng)
+
+
+def check_register_pressure(proc):
+    """
+    Warn with a `RegisterPressureWarning` for each register-file memory
+    of which `proc` may need more registers than are available.
+    """
+    for mem, n_regs in register_pressure(proc).items():
+        if n_regs > mem.num_registers():
+            n_regs = "an unbounded number of" if n_regs == math.inf else n_regs
+            warnings.warn(
+                f"{proc.srcinfo}: {proc.name} may keep {n_regs} {mem.name()} "
+                f"registers live, but only {mem.num_registers()} are available; "
+                f"the C compiler will spill the excess to memory",
+                RegisterPressureWarning,
+            )
@@ -0,0 +1,317 @@
+import itertools
+import math
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .API import Procedure
+from .API_scheduling import is_atomic_scheduling_op
+from .memory import DRAM
+from .native import NativeLibrary, compile_library, random_args, write_sources
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Schedule search
+
+"""
+`search` explores the schedules of a procedure reachable by applying the
+scheduling operations of a search space, with a beam search: every round
+applies every move of the space to every procedure of the beam, drops the
+procedures seen before, ranks the new ones with a cost function and keeps
+the `beam_width` cheapest procedures seen so far as the next beam.
+
+Moves which do not apply are rejected with `can_apply`, without raising and
+formatting errors.  Procedures are identified by their printed IR, so that
+different orders of independent moves are only explored once.  The cost
+function is evaluated for concrete sizes of the size arguments, and can be
+followed by timing the best procedures, compiled with the C compiler `$CC`
+(or `cc`) and run on random arguments.  Costs and timings are computed in a
+process pool, so cost functions must be picklable (e.g. module-level
+functions).
+"""
+
+
+class OpSpace:
+    """
+    A scheduling operation with the ranges of its parameters.  Every
+    parameter (other than the procedure) is a list or range of values, or a
+    function `f(proc, args)` of the procedure and the values chosen for the
+    previous parameters which returns the list of values to try.  Other
+    values are fixed.
+
+    OpSpace(divide_loop, loop_cursor=["i", "j"], div_const=[4, 8],
+            new_iters=lambda p, args: [[args["loop_cursor"] + "o", args["loop_cursor"] + "i"]],
+            tail=["cut"])
+    """
+
+    def __init__(self, op, **params):
+        if not is_atomic_scheduling_op(op):
+            raise TypeError("expected an atomic scheduling operation")
+        self.op = op
+        self.params = params
+
+    def moves(self, proc):
+        """
+        The keyword arguments of all the applications of the operation to
+        `proc` in this space.
+        """
+        choices = [dict()]
+        for nm, vals in self.params.items():
+            choices = [
+                {**args, nm: v}
+                for args in choices
+                for v in self._values(vals, proc, args)
+            ]
+        return choices
+
+    @staticmethod
+    def _values(vals, proc, args):
+        if callable(vals):
+            return list(vals(proc, args))
+        elif isinstance(vals, (list, tuple, range)):
+            return list(vals)
+        return [vals]
+
+
+@dataclass
+class Step:
+    """
+    One scheduling operation applied during the search.
+    """
+
+    op: str
+    args: dict
+
+    def __str__(self):
+        args = ", ".join(f"{nm}={v!r}" for nm, v in self.args.items())
+        return f"{self.op}({args})"
+
+
+@dataclass
+class Candidate:
+    """
+    A procedure found by the search.
+
+    Attributes:
+        proc (Procedure): the scheduled procedure
+        steps (tuple): the `Step`s applied to the original to obtain it
+        cost (float): the estimated cost of the procedure
+        time (float): its best running time in seconds, if it was timed;
+            infinite if the sizes do not satisfy its assertions
+    """
+
+    proc: Procedure
+    steps: tuple
+    cost: float
+    time: Optional[float] = None
+
+    @property
+    def score(self):
+        return self.cost if self.time is None else self.time
+
+
+@dataclass
+class SearchResult:
+    """
+    Result of `search`.
+
+    Attributes:
+        best (Candidate): the cheapest (or fastest, if timed) procedure
+        candidates (list): the `Candidate`s of the final beam, best first
+        explored (int): number of distinct procedures evaluated
+        duplicates (int): number of moves which led to a procedure which
+            was already seen
+        rejected (int): number of moves which did not apply
+    """
+
+    best: Candidate
+    candidates: list = field(default_factory=list)
+    explored: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+
+
+# --------------------------------------------------------------------------- #
+# Costs
+
+
+def static_cost(proc, sizes):
+    """
+    A rough estimate of the cost of running `proc` with the given sizes,
+    from `Procedure.estimate_cost`: the arithmetic operations and calls to
+    instructions, plus the bytes moved, where bytes moved in memories other
+    than DRAM (e.g. registers) count a quarter.
+    """
+    costs = proc.estimate_cost().evaluate(sizes)
+    moved = sum(n if issubclass(mem, DRAM) else n / 4 for mem, n in costs.bytes.items())
+    return costs.flops + sum(costs.instr_calls.values()) + moved
+
+
+# --------------------------------------------------------------------------- #
+# Evaluation, run in the worker processes
+
+
+def _evaluate(proc, cost, sizes):
+    return cost(proc, sizes)
+
+
+def _time(proc, sizes, cflags, repeats):
+    ir = proc._loopir_proc
+    control = {
+        str(a.name): sizes[str(a.name)] for a in ir.args if not a.type.is_numeric()
+    }
+    args = random_args(ir, np.random.default_rng(0), 0, control)
+    if args is None:
+        # the schedule added assertions which the sizes do not satisfy
+        return math.inf
+
+    with tempfile.TemporaryDirectory(prefix="exo_search_") as tmp:
+        workdir = Path(tmp) / "src"
+        write_sources(ir, workdir)
+        lib = NativeLibrary(
+            compile_library(proc.name(), workdir, cflags),
+            [str(a.name) for a in ir.args],
+        )
+        lib.run(args)
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            lib.run(args)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+# --------------------------------------------------------------------------- #
+# Entry point
+
+
+def search(
+    proc,
+    space,
+    sizes,
+    *,
+    cost=static_cost,
+    beam_width=4,
+    depth=3,
+    timing=0,
+    workers=1,
+    cflags=("-O2", "-march=native"),
+    repeats=5,
+):
+    """
+    Search the schedules of `proc` reachable by applying up to `depth`
+    moves of the search space `space`, a list of `OpSpace`s.
+
+    result = search(gemm, [
+        OpSpace(divide_loop, loop_cursor=["i", "j"], div_const=[4, 8],
+                new_iters=lambda p, args: [[args["loop_cursor"] + "o",
+                                             args["loop_cursor"] + "i"]],
+                perfect=True),
+        OpSpace(reorder_loops, nested_loops=["j k", "ji k", "ii j"]),
+    ], sizes={"M": 64, "N": 64, "K": 64}, timing=4)
+    print(result.best.proc, *result.best.steps, sep="\\n")
+
+    Args:
+        proc (Procedure): the procedure to schedule
+        space (list): the `OpSpace`s of the moves to try
+        sizes (dict): values of the size (and index) arguments, by name, to
+            evaluate the costs with
+        cost (callable): `cost(proc, sizes)` estimates the cost of a
+            procedure; defaults to `static_cost`
+        beam_width (int): number of procedures kept in every round
+        depth (int): maximum number of moves applied to `proc`
+        timing (int): number of the cheapest procedures to compile and time
+            at the end, to pick the best one by running time
+        workers (int): number of processes evaluating the costs and timings;
+            1 evaluates them in this process
+        cflags (tuple): flags to compile the timed procedures with
+        repeats (int): number of timed runs of every timed procedure
+
+    Raises:
+        TypeError: if `proc` is not a Procedure or `space` is not a list of
+            OpSpaces
+        ValueError: if a size is missing
+
+    Returns:
+        SearchResult: the best procedures found
+    """
+    if not isinstance(proc, Procedure):
+        raise TypeError("expected a Procedure")
+    if not all(isinstance(s, OpSpace) for s in space):
+        raise TypeError("expected a list of OpSpaces")
+    # fail early rather than in the workers
+    proc.estimate_cost().evaluate(sizes)
+
+    pool = ProcessPoolExecutor(workers) if workers != 1 else None
+    map_fn = pool.map if pool else map
+    try:
+        return _search(
+            proc, space, sizes, cost, beam_width, depth, timing, map_fn, cflags, repeats
+        )
+    finally:
+        if pool:
+            pool.shutdown()
+
+
+def _search(
+    proc, space, sizes, cost, beam_width, depth, timing, map_fn, cflags, repeats
+):
+    res = SearchResult(None)
+    seen = {str(proc)}
+    beam = [Candidate(proc, (), cost(proc, sizes))]
+    res.explored = 1
+
+    # only the candidates found in the previous round are expanded, the
+    # children of the others were found when they were new
+    frontier = beam
+    for _ in range(depth):
+        children = []
+        for cand in frontier:
+            for opspace in space:
+                op = opspace.op
+                for args in opspace.moves(cand.proc):
+                    applied = op.can_apply(cand.proc, **args)
+                    if not applied:
+                        res.rejected += 1
+                        continue
+                    key = str(applied.proc)
+                    if key in seen:
+                        res.duplicates += 1
+                        continue
+                    seen.add(key)
+                    step = Step(op.__name__, args)
+                    children.append((applied.proc, cand.steps + (step,)))
+        if not children:
+            break
+
+        procs = [p for p, _ in children]
+        costs = map_fn(
+            _evaluate, procs, itertools.repeat(cost), itertools.repeat(sizes)
+        )
+        res.explored += len(children)
+        new = [Candidate(p, steps, c) for (p, steps), c in zip(children, costs)]
+        beam = sorted(beam + new, key=lambda c: c.cost)[:beam_width]
+        new_ids = {id(c) for c in new}
+        frontier = [c for c in beam if id(c) in new_ids]
+
+    if timing:
+        timed = beam[:timing]
+        times = map_fn(
+            _time,
+            [c.proc for c in timed],
+            itertools.repeat(sizes),
+            itertools.repeat(cflags),
+            itertools.repeat(repeats),
+        )
+        for c, t in zip(timed, times):
+            c.time = t
+        beam = sorted(timed, key=lambda c: c.score) + beam[timing:]
+
+    res.best = beam[0]
+    res.candidates = beam
+    return res
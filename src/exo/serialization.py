@@ -0,0 +1,172 @@
+import functools
+import io
+import pickle
+
+from asdl_adt.adt import _AsdlAdtBase
+
+from . import LoopIR as _LoopIR_module
+from . import builtins as _builtins_module
+from . import configs as _configs_module
+from .builtins import BuiltIn
+from .configs import Config
+from .prelude import *
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Binary serialization of LoopIR procedures
+
+"""
+A serialized library is the magic string `MAGIC`, the format version as two
+little-endian bytes, a pickle of the version of Exo it was written by, and a
+pickle of the list of LoopIR procs.  Libraries are only loaded by the same
+version of Exo, since the IR changes between versions.  The procs are stored
+together with everything they refer to (effects, source locations, called
+procs, configs), with the following exceptions:
+
+- IR nodes are stored as their class and fields.  Loading rebuilds them
+  without running the field validators again, but still interns the nodes
+  of memoized classes.
+- Symbols are stored by name and identity.  Loading gives every symbol a
+  fresh identity in the current process, so that it cannot clash with the
+  symbols of other procs, but two references to the same symbol still load
+  as the same symbol.
+- Built-in functions are stored by name.
+- Memories are stored by reference, so the modules defining them must be
+  importable when loading.
+- Configs are stored by value.  Loading reuses a live config with the same
+  name and fields, if there is one, so that procs loaded into the process
+  which defined them share their configs with the procs already there.
+"""
+
+MAGIC = b"EXOPROCS"
+FORMAT_VERSION = 1
+
+
+class SerializationError(Exception):
+    pass
+
+
+@functools.cache
+def _node_class(qualname):
+    cls = _LoopIR_module
+    for part in qualname.split("."):
+        cls = getattr(cls, part)
+    return cls
+
+
+def _make_node(qualname, *fields):
+    # The fields were validated when the node was first built, so skip the
+    # validators, which dominate the loading time.  `__new__` still interns
+    # the nodes of memoized classes.
+    cls = _node_class(qualname)
+    node = cls.__new__(cls, *fields)
+    for name, val in zip(cls.__match_args__, fields):
+        object.__setattr__(node, name, val)
+    return node
+
+
+def _load_config(name, fields, disable_rw):
+    for config, _ in list(_configs_module._reverse_symbol_lookup.values()):
+        if (
+            config.name() == name
+            and config.fields() == fields
+            and config.is_allow_rw() != disable_rw
+        ):
+            return config
+    return Config(name, fields, disable_rw)
+
+
+class ProcPickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        if isinstance(obj, Sym):
+            return ("sym", obj.name(), obj._id)
+        elif isinstance(obj, BuiltIn):
+            return ("builtin", obj.name())
+        return None
+
+    def reducer_override(self, obj):
+        if isinstance(obj, _AsdlAdtBase):
+            fields = [getattr(obj, f) for f in type(obj).__match_args__]
+            return _make_node, (type(obj).__qualname__, *fields)
+        elif isinstance(obj, Config):
+            return _load_config, (obj.name(), obj.fields(), not obj.is_allow_rw())
+        return NotImplemented
+
+
+class ProcUnpickler(pickle.Unpickler):
+    def __init__(self, file):
+        super().__init__(file)
+        self.syms = dict()
+
+    def persistent_load(self, pid):
+        if pid[0] == "sym":
+            # Give every symbol a fresh identity in this process
+            if pid not in self.syms:
+                self.syms[pid] = Sym(pid[1])
+            return self.syms[pid]
+        elif pid[0] == "builtin":
+            return getattr(_builtins_module, pid[1])
+        raise pickle.UnpicklingError(f"unknown persistent id {pid}")
+
+
+def dumps(procs):
+    """
+    Serialize a list of LoopIR procs into bytes.
+    """
+    from . import __version__
+
+    assert all(isinstance(p, _LoopIR_module.LoopIR.proc) for p in procs)
+
+    buf = io.BytesIO()
+    buf.write(MAGIC)
+    buf.write(FORMAT_VERSION.to_bytes(2, "little"))
+    pickle.dump(__version__, buf)
+    try:
+        ProcPickler(buf, protocol=pickle.HIGHEST_PROTOCOL).dump(list(procs))
+    except (pickle.PicklingError, AttributeError, TypeError) as err:
+        raise SerializationError(f"cannot serialize procedure: {err}") from err
+    return buf.getvalue()
+
+
+def is_serialized(data):
+    """
+    Whether `data` (a prefix of a file is enough) starts like the output of
+    `dumps`.
+    """
+    return data[: len(MAGIC)] == MAGIC
+
+
+def loads(data):
+    """
+    Load the list of LoopIR procs serialized by `dumps`.
+    """
+    if not is_serialized(data):
+        raise SerializationError("not a serialized Exo library")
+    version = int.from_bytes(data[len(MAGIC) : len(MAGIC) + 2], "little")
+    if version != FORMAT_VERSION:
+        raise SerializationError(
+            f"unsupported serialization format version {version} "
+            f"(expected {FORMAT_VERSION})"
+        )
+
+    from . import __version__
+
+    buf = io.BytesIO(data[len(MAGIC) + 2 :])
+    try:
+        exo_version = pickle.load(buf)
+    except Exception as err:
+        raise SerializationError(f"corrupt serialized Exo library: {err}") from err
+    if exo_version != __version__:
+        raise SerializationError(
+            f"the library was saved by Exo version {exo_version}, "
+            f"but this is version {__version__}"
+        )
+
+    try:
+        procs = ProcUnpickler(buf).load()
+    except Exception as err:
+        raise SerializationError(f"corrupt serialized Exo library: {err}") from err
+
+    if not all(isinstance(p, _LoopIR_module.LoopIR.proc) for p in procs):
+        raise SerializationError("corrupt serialized Exo library")
+    return procs
@@ -0,0 +1,194 @@
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Optional
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Resource limits of the SMT queries
+
+"""
+The effect checks of scheduling operations (the `Check_*` functions of
+`exo.new_eff`) prove their preconditions with z3, which can run for minutes
+on some formulas (e.g. non-linear indexing after `mult_loops`).  Every query
+can be given a limit on the resources z3 spends on it, counted in z3's own
+deterministic resource units (its `rlimit`) so that a query hits its limit on
+every machine or on none, and optionally a wall-clock timeout.  A budget
+bounds the resources of all the queries of a scheduling operation.
+
+The limits are read from the environment when Exo is imported:
+
+    EXO_SMT_RLIMIT           resource limit of every query
+    EXO_SMT_TIMEOUT          timeout of every query, in milliseconds
+    EXO_SMT_SCHEDULE_RLIMIT  resource limit of the queries of an operation
+
+and can be changed with `set_smt_limits` or, within a block, `smt_limits`.
+A query which hits a limit raises an `SMTLimitError` and is recorded in the
+report returned by `smt_limit_report`.
+"""
+
+
+@dataclass(frozen=True)
+class SMTLimits:
+    """
+    Limits of the SMT queries; None stands for no limit.
+
+    Attributes:
+        rlimit (int): the z3 resources each query may use
+        timeout (int): the time each query may take, in milliseconds
+        schedule_rlimit (int): the z3 resources all the queries of a
+            scheduling operation may use
+    """
+
+    rlimit: Optional[int] = None
+    timeout: Optional[int] = None
+    schedule_rlimit: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class SMTLimitHit:
+    """
+    A query which hit a limit: the check which made it, the scheduling
+    operation it was made for (if any), the limit which was hit (`"rlimit"`,
+    `"timeout"` or `"schedule_rlimit"`), and the formula.
+    """
+
+    check: str
+    op: Optional[str]
+    limit: str
+    formula: str
+
+    def __str__(self):
+        op = f" in {self.op}" if self.op else ""
+        return f"{self.check}{op}: exceeded the SMT {self.limit}"
+
+
+class SMTLimitError(Exception):
+    def __init__(self, hit):
+        self.hit = hit
+        super().__init__(
+            f"{hit}; the precondition could not be proven or disproven "
+            f"(see exo.set_smt_limits)"
+        )
+
+
+def _env_limit(name):
+    if val := os.environ.get(name):
+        try:
+            return int(val)
+        except ValueError:
+            raise ValueError(f"{name} should be an integer, got {val!r}") from None
+    return None
+
+
+_limits = SMTLimits(
+    rlimit=_env_limit("EXO_SMT_RLIMIT"),
+    timeout=_env_limit("EXO_SMT_TIMEOUT"),
+    schedule_rlimit=_env_limit("EXO_SMT_SCHEDULE_RLIMIT"),
+)
+_report = []
+
+
+@dataclass
+class _Budget:
+    op: str
+    remaining: Optional[int]
+
+
+_budget = None
+
+
+def get_smt_limits():
+    """
+    The current `SMTLimits`.
+    """
+    return _limits
+
+
+def set_smt_limits(**limits):
+    """
+    Set some of the fields of the current `SMTLimits` (e.g.
+    `set_smt_limits(rlimit=10**6)`), and return the previous limits.
+    """
+    global _limits
+    prev = _limits
+    _limits = replace(_limits, **limits)
+    return prev
+
+
+@contextmanager
+def smt_limits(**limits):
+    """
+    Set some of the fields of the current `SMTLimits` within a block.
+    """
+    global _limits
+    prev = set_smt_limits(**limits)
+    try:
+        yield _limits
+    finally:
+        _limits = prev
+
+
+def smt_limit_report(clear=False):
+    """
+    The list of `SMTLimitHit`s since the start (or since the report was last
+    cleared), oldest first.
+    """
+    report = list(_report)
+    if clear:
+        _report.clear()
+    return report
+
+
+@contextmanager
+def schedule_budget(op):
+    """
+    Charge the SMT queries made within the block to the budget of the
+    scheduling operation `op`; nested operations share the budget of the
+    outermost one.
+    """
+    global _budget
+    if _budget is not None:
+        yield
+        return
+    _budget = _Budget(op, _limits.schedule_rlimit)
+    try:
+        yield
+    finally:
+        _budget = None
+
+
+def query_limits():
+    """
+    The resource limit and the timeout of the next query, and whether the
+    resource limit is the rest of the budget of the current operation.
+    """
+    rlimit, from_budget = _limits.rlimit, False
+    if _budget is not None and _budget.remaining is not None:
+        if rlimit is None or _budget.remaining < rlimit:
+            rlimit, from_budget = max(_budget.remaining, 1), True
+    return rlimit, _limits.timeout, from_budget
+
+
+def reserve(rlimit):
+    """
+    Reserve the resource limit `rlimit` of a query starting now on the budget
+    of the current operation, so that queries running at the same time do
+    not each get all of it.  Returns the function to call with the resources
+    the query used once it finished, which gives back the rest.
+    """
+    budget = _budget
+    if budget is None or budget.remaining is None:
+        return lambda used: None
+    budget.remaining -= rlimit
+
+    def settle(used):
+        budget.remaining += rlimit - used
+
+    return settle
+
+
+def limit_hit(check, limit, formula):
+    hit = SMTLimitHit(check, _budget and _budget.op, limit, formula)
+    _report.append(hit)
+    return SMTLimitError(hit)
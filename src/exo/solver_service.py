@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# A pool of worker processes for the SMT queries and independent procs
+
+"""
+All the z3 work of Exo runs in the thread which schedules or compiles, one
+query at a time.  A `SolverService` is a pool of worker processes, each with
+its own z3 context, which the work on independent procs and independent
+queries can be dispatched to:
+
+- `SMTSolver.verify_async` and `satisfy_async` send their formula to a worker
+  and return immediately; the checks which make several independent queries
+  start all of them before waiting for the first answer.
+- `compile_procs` compiles the procs of a library on the workers.
+- `schedule_procs` applies a schedule to each of a list of procs on the
+  workers.
+
+Within `with use_solver_service(workers):`, all of these go through the
+service.  The results are always collected in the order the work was
+submitted, so that they are the same as without the service.
+
+The workers are forked from the current process, so that they see the procs,
+instructions and memories defined in it; the service is not available on
+platforms which cannot fork.
+"""
+
+
+def _fork_context():
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def _init_worker():
+    # a worker has no pool of its own, its copy of the parent's is not usable
+    global _service
+    _service = None
+
+
+class SolverService:
+    """
+    A pool of `workers` processes (by default, one per CPU), each with its own
+    z3 context.  The pool is started by the first query and stopped by
+    `close`.
+    """
+
+    def __init__(self, workers=None):
+        if _fork_context() is None:
+            raise OSError("the solver service needs to fork worker processes")
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+
+    def _new_pool(self, workers):
+        return ProcessPoolExecutor(
+            workers, mp_context=_fork_context(), initializer=_init_worker
+        )
+
+    def submit(self, fn, *args):
+        """
+        Run `fn(*args)` on a worker, and return a `concurrent.futures.Future`
+        of its result.  `fn`, its arguments and its result are pickled.
+        """
+        if self._pool is None:
+            self._pool = self._new_pool(self.workers)
+        return self._pool.submit(fn, *args)
+
+    def map(self, fn, items):
+        """
+        The list of `fn(x)` for the `items`, in order.  They are computed by
+        processes forked for this call, so that only the results are pickled.
+        """
+        global _batch
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(x) for x in items]
+
+        assert _batch is None, "batches of the solver service do not nest"
+        _batch = (fn, items)
+        try:
+            with self._new_pool(min(self.workers, len(items))) as pool:
+                return list(pool.map(_run_batch_item, range(len(items))))
+        finally:
+            _batch = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_batch = None
+
+
+def _run_batch_item(i):
+    fn, items = _batch
+    return fn(items[i])
+
+
+_service = None
+
+
+def get_solver_service():
+    """
+    The `SolverService` in use, or None if the work is done in this process.
+    """
+    return _service
+
+
+@contextmanager
+def use_solver_service(workers=None):
+    """
+    Dispatch the SMT queries, the compilation of procs and batch scheduling
+    to a new `SolverService` of `workers` processes within the block.
+    """
+    global _service
+    prev = _service
+    _service = SolverService(workers)
+    try:
+        yield _service
+    finally:
+        _service.close()
+        _service = prev
@@ -2,6 +2,7 @@ from exo import DRAM
 
 import exo.API_cursors as _PC
 from ..API import Procedure, SchedulingError
+from ..reg_analysis import register_pressure as _register_pressure
 
 
 def get_observed_stmts(stmt_cursor):
@@ -104,3 +105,56 @@ def check_call_mem_types(call_cursor):
                 return False
 
     return True
+
+
+def register_pressure(cursor):
+    """
+    estimate how many registers of each register-file memory (e.g. `AVX2`,
+    `AVX512`) are live at once within a procedure, statement or block.
+    Buffers allocated outside of the cursor but used inside of it count
+    towards the estimate.
+
+    Args:
+        cursor (Procedure | StmtCursor | BlockCursor): code to analyze
+
+    Raises:
+        TypeError: if the cursor provided isn't of a supported type
+
+    Returns:
+        dict: mapping from memories to their peak number of live
+        registers; memories with no live registers are omitted
+    """
+    if isinstance(cursor, Procedure):
+        pressure = _register_pressure(cursor._loopir_proc)
+    elif isinstance(cursor, _PC.BlockCursor):
+        impl = cursor._impl
+        pressure = _register_pressure(
+            cursor.proc()._loopir_proc, impl._anchor._path, impl._attr, impl._range
+        )
+    elif isinstance(cursor, _PC.StmtCursor):
+        *path, (attr, i) = cursor._impl._path
+        pressure = _register_pressure(
+            cursor.proc()._loopir_proc, path, attr, range(i, i + 1)
+        )
+    else:
+        raise TypeError("cursor must be a Procedure, StmtCursor or BlockCursor")
+
+    return dict(pressure)
+
+
+def exceeds_register_budget(cursor):
+    """
+    check whether the code at the cursor may need more registers of some
+    register-file memory than are available, so that the C compiler would
+    spill them to memory. Useful to reject schedules without compiling them.
+
+    Args:
+        cursor (Procedure | StmtCursor | BlockCursor): code to analyze
+
+    Returns:
+        bool: whether the register budget of some memory is exceeded
+    """
+    return any(
+        n_regs > mem.num_registers()
+        for mem, n_regs in register_pressure(cursor).items()
+    )
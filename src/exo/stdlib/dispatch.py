@@ -0,0 +1,122 @@
+from functools import reduce as _reduce
+
+from ..API import Procedure, SchedulingError
+from ..API_scheduling import rename
+from ..LoopIR import LoopIR, T
+from ..LoopIR_scheduling import DoPartialEval
+from ..parse_fragment import parse_fragment
+from ..proc_eqv import check_eqv_proc
+
+
+def _specialized(proc, facts, name):
+    """
+    Restrict `proc` to the inputs satisfying `facts`: facts of the form
+    `x == c` on size or index arguments are partially evaluated away, the
+    remaining ones become assertions.
+    """
+    ir = proc._loopir_proc
+    arg_types = {a.name: a.type for a in ir.args}
+
+    consts, preds = dict(), []
+    for f in facts:
+        if (
+            isinstance(f, LoopIR.BinOp)
+            and f.op == "=="
+            and isinstance(f.lhs, LoopIR.Read)
+            and arg_types.get(f.lhs.name, T.R).is_indexable()
+            and isinstance(f.rhs, LoopIR.Const)
+        ):
+            consts[f.lhs.name] = f.rhs.val
+        else:
+            preds.append(f)
+
+    ir = ir.update(name=name, preds=ir.preds + preds)
+    if consts:
+        ir = DoPartialEval(consts).apply_proc(ir)
+
+    return Procedure(ir)  # No provenance because signature changed
+
+
+def dispatch(proc, variants, name=None):
+    """
+    build a procedure which branches on its runtime arguments to call the
+    first applicable specialized variant of `proc`, or `proc` itself if
+    none of them applies.
+
+    Each variant is a pair `(facts, schedule)`.  `facts` is a list of Exo
+    expressions over the arguments of `proc`, e.g. `"M == 6"` or
+    `"stride(A, 1) == 1"`, which are checked at runtime.  Facts of the
+    form `size == constant` are partially evaluated away, the others become
+    assertions of the specialized procedure.  `schedule` is called on that
+    specialized procedure and must return an equivalent procedure.
+
+    def sgemm(M: size, N: size, K: size, ...):
+        ...
+
+    sgemm = dispatch(sgemm, [(["M == 6", "N == 64"], sched_6x64)])
+
+    def sgemm(M: size, N: size, K: size, ...):
+        if M == 6 and N == 64:
+            sgemm_0(K, ...)
+        else:
+            sgemm_generic(M, N, K, ...)
+
+    Args:
+        proc (Procedure): the generic procedure
+        variants (list): list of `(facts, schedule)` pairs, most specific
+            first
+        name (str): name of the dispatching procedure; defaults to the
+            name of `proc`, in which case the generic fallback is renamed
+            to `<name>_generic`
+
+    Raises:
+        ValueError: if a variant has no facts
+        SchedulingError: if a scheduled variant is not equivalent to its
+            specialization of `proc`
+
+    Returns:
+        Procedure: the dispatching procedure, equivalent to `proc`
+    """
+    if not isinstance(proc, Procedure):
+        raise TypeError("expected a Procedure")
+
+    if name is None:
+        name = proc.name()
+        proc = rename(proc, f"{name}_generic")
+
+    ir = proc._loopir_proc
+    srcinfo = ir.srcinfo
+    params = {a.name.name(): a for a in ir.args}
+
+    def call(callee):
+        args = [
+            LoopIR.Read(
+                params[a.name.name()].name, [], params[a.name.name()].type, srcinfo
+            )
+            for a in callee._loopir_proc.args
+        ]
+        return LoopIR.Call(callee._loopir_proc, args, None, srcinfo)
+
+    def conj(lhs, rhs):
+        return LoopIR.BinOp("and", lhs, rhs, T.bool, srcinfo)
+
+    body = [call(proc)]
+    for i, (facts, schedule) in reversed(list(enumerate(variants))):
+        if not facts:
+            raise ValueError(f"variant {i} of {name} has no facts to dispatch on")
+
+        facts = [parse_fragment(ir, f, ir.body[0]) for f in facts]
+        specialized = _specialized(proc, facts, f"{name}_{i}")
+        variant = schedule(specialized)
+        if not check_eqv_proc(specialized._loopir_proc, variant._loopir_proc):
+            raise SchedulingError(
+                f"variant {i} of {name} is not equivalent to the specialization "
+                f"of {proc.name()} it was scheduled from"
+            )
+
+        body = [LoopIR.If(_reduce(conj, facts), [call(variant)], body, None, srcinfo)]
+
+    # Each branch is equivalent to `proc` under its condition, so the whole
+    # dispatcher is too.
+    ir = ir.update(name=name, body=body, instr=None)
+    return Procedure(ir, _provenance_eq_Procedure=proc)
@@ -0,0 +1,310 @@
+import types as _types
+from collections import ChainMap, defaultdict
+from dataclasses import dataclass, field
+
+from .. import API_cursors as _PC
+from .. import internal_cursors as _ic
+from ..API import Procedure
+from ..LoopIR import LoopIR, T, Alpha_Rename
+from ..LoopIR_unification import Unification, UnificationError
+from ..memory import DRAM
+
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Bulk instruction selection
+
+"""
+`replace` unifies a single instruction with a single block, so replacing
+every occurrence of many instructions one `replace` at a time walks and
+rebuilds the procedure once per attempt.  Instead, `select_instrs` indexes
+the instructions by the shape of their bodies (the statement structure and
+the operators of the data computations, i.e. everything unification must
+match exactly), finds all candidate sites in one traversal, runs
+unification only on candidates of the same shape, and rewrites all the
+selected sites at once.
+"""
+
+
+@dataclass
+class InstrSelection:
+    """
+    Result of `select_instrs`.
+
+    Attributes:
+        proc (Procedure): the procedure with all selected sites replaced
+        replaced (list): `(site, instr)` pairs of the replaced blocks of the
+            original procedure and the instructions they were replaced with
+        failed (list): `(site, instr, reason)` triples of the candidate
+            sites at which an instruction with the right shape was tried and
+            failed to unify, and why
+    """
+
+    proc: Procedure
+    replaced: list = field(default_factory=list)
+    failed: list = field(default_factory=list)
+
+
+def _expr_shape(e):
+    if e.type.is_indexable() or e.type in (T.bool, T.stride):
+        # unified as affine equations or holes, no structure to match
+        return "_"
+    elif isinstance(e, (LoopIR.Read, LoopIR.WindowExpr)):
+        return "buf"
+    elif isinstance(e, LoopIR.Const):
+        return ("const", e.val)
+    elif isinstance(e, LoopIR.USub):
+        return ("-", _expr_shape(e.arg))
+    elif isinstance(e, LoopIR.BinOp):
+        return (e.op, _expr_shape(e.lhs), _expr_shape(e.rhs))
+    elif isinstance(e, LoopIR.BuiltIn):
+        return (e.f.name(), *map(_expr_shape, e.args))
+    elif isinstance(e, LoopIR.ReadConfig):
+        return ("config", e.config.name(), e.field)
+    else:
+        return type(e).__name__
+
+
+def _stmt_shape(s, memo):
+    if (shape := memo.get(id(s))) is not None:
+        return shape
+
+    if isinstance(s, (LoopIR.Assign, LoopIR.Reduce)):
+        shape = (type(s).__name__, _expr_shape(s.rhs))
+    elif isinstance(s, LoopIR.WriteConfig):
+        shape = ("WriteConfig", s.config.name(), s.field, _expr_shape(s.rhs))
+    elif isinstance(s, LoopIR.If):
+        shape = ("If", _block_shape(s.body, memo), _block_shape(s.orelse, memo))
+    elif isinstance(s, LoopIR.Seq):
+        shape = ("Seq", _block_shape(s.body, memo))
+    elif isinstance(s, LoopIR.Call):
+        shape = ("Call", s.f.name, tuple(map(_expr_shape, s.args)))
+    elif isinstance(s, LoopIR.WindowStmt):
+        shape = ("WindowStmt", _expr_shape(s.rhs))
+    else:
+        shape = type(s).__name__
+
+    memo[id(s)] = shape
+    return shape
+
+
+def _block_shape(stmts, memo):
+    return tuple(_stmt_shape(s, memo) for s in stmts)
+
+
+class _Site:
+    def __init__(self, path, attr, lo, stmts, live_vars, mems, aliases):
+        self.path = path
+        self.attr = attr
+        self.lo = lo
+        self.stmts = stmts
+        self.live_vars = live_vars
+        self.mems = mems
+        self.aliases = aliases
+
+    def block(self, ir):
+        anchor = _ic.Node(ir, list(self.path))
+        return _ic.Block(
+            ir, anchor, self.attr, range(self.lo, self.lo + len(self.stmts))
+        )
+
+    def stmt_paths(self):
+        return [
+            (*self.path, (self.attr, i))
+            for i in range(self.lo, self.lo + len(self.stmts))
+        ]
+
+    def ancestor_paths(self):
+        return [self.path[:k] for k in range(1, len(self.path) + 1)]
+
+    def sort_key(self):
+        return (*self.path, (self.attr, self.lo))
+
+
+def _find_sites(proc, shapes, memo):
+    """
+    Find all blocks of `proc` whose shape is one of `shapes`, in pre-order,
+    and return them grouped by shape.
+    """
+    sites = defaultdict(list)
+    lengths = {len(shape) for shape in shapes}
+
+    def do_block(stmts, path, attr, live_vars, mems, aliases):
+        block_shape = _block_shape(stmts, memo)
+        for i, s in enumerate(stmts):
+            for n in lengths:
+                shape = block_shape[i : i + n]
+                if i + n <= len(stmts) and shape in shapes:
+                    sites[shape].append(
+                        _Site(
+                            path,
+                            attr,
+                            i,
+                            stmts[i : i + n],
+                            live_vars,
+                            mems,
+                            aliases,
+                        )
+                    )
+
+            # mirror `Get_Live_Variables` for the statements nested in `s`
+            s_path = (*path, (attr, i))
+            if isinstance(s, LoopIR.If):
+                for sub_attr in ("body", "orelse"):
+                    do_block(
+                        getattr(s, sub_attr),
+                        s_path,
+                        sub_attr,
+                        live_vars.new_child(),
+                        mems,
+                        aliases,
+                    )
+                live_vars = live_vars.new_child()
+            elif isinstance(s, LoopIR.Seq):
+                body_vars = live_vars.new_child()
+                body_vars[s.iter] = T.index
+                do_block(s.body, s_path, "body", body_vars, mems, aliases)
+                live_vars = live_vars.new_child()
+                live_vars[s.iter] = T.index
+            elif isinstance(s, LoopIR.Alloc):
+                live_vars = live_vars.new_child({s.name: s.type})
+                mems = mems.new_child({s.name: s.mem or DRAM})
+            elif isinstance(s, LoopIR.WindowStmt):
+                src = aliases.get(s.rhs.name, s.rhs.name)
+                live_vars = live_vars.new_child({s.lhs: s.rhs.type})
+                mems = mems.new_child({s.lhs: mems.get(src, DRAM)})
+                aliases = aliases.new_child({s.lhs: src})
+
+    live_vars = ChainMap({a.name: a.type for a in proc.args})
+    mems = ChainMap({a.name: a.mem or DRAM for a in proc.args if a.type.is_numeric()})
+    do_block(proc.body, (), "body", live_vars, mems, ChainMap())
+    return sites
+
+
+def _check_call(site, call, mem_aware):
+    # the checks `replace` and `call_site_mem_aware_replace` run on the
+    # whole procedure, restricted to the new call
+    passed = set()
+    for fa, a in zip(call.f.args, call.args):
+        if not fa.type.is_numeric():
+            continue
+        name = site.aliases.get(a.name, a.name)
+        if name in passed:
+            return f"the same buffer '{name}' would be passed via multiple arguments"
+        passed.add(name)
+        if mem_aware:
+            mem = site.mems.get(a.name, DRAM)
+            if not issubclass(mem, fa.mem or DRAM):
+                return (
+                    f"memory type mismatch: '{a.name}' is in {mem.name()}, but "
+                    f"argument '{fa.name}' of {call.f.name} expects "
+                    f"{(fa.mem or DRAM).name()}"
+                )
+    return None
+
+
+def _instr_list(instrs):
+    if isinstance(instrs, _types.ModuleType):
+        return [
+            p
+            for p in vars(instrs).values()
+            if isinstance(p, Procedure) and p.is_instr()
+        ]
+    elif isinstance(instrs, Procedure):
+        return [instrs]
+    return list(instrs)
+
+
+def select_instrs(proc, instrs, mem_aware=True):
+    """
+    Replace every block of `proc` that unifies with the body of one of
+    `instrs` with a call to it, as if by `replace`.  Instructions earlier in
+    `instrs` take priority, and each instruction is applied outer-most first
+    to the blocks that remain after the previous ones, like a sequence of
+    `replace` calls at every match would.
+
+    sel = select_instrs(proc, exo.platforms.x86)
+    proc = sel.proc
+    for site, instr, reason in sel.failed:
+        print(f"{instr.name()} failed at {site}: {reason}")
+
+    Args:
+        proc (Procedure): procedure to select instructions in
+        instrs (list | module | Procedure): the candidate procedures, or a
+            module whose instructions are all candidates, in definition order
+        mem_aware (bool): only select instructions whose buffer arguments
+            are in memories compatible with the memories at the call site,
+            like `call_site_mem_aware_replace`
+
+    Raises:
+        TypeError: if `proc` or one of the `instrs` is not a Procedure
+
+    Returns:
+        InstrSelection: the new procedure, with reports of the replaced
+        sites and of the failed attempts
+    """
+    if not isinstance(proc, Procedure):
+        raise TypeError("expected a Procedure")
+    instrs = _instr_list(instrs)
+    if not all(isinstance(p, Procedure) for p in instrs):
+        raise TypeError("expected instrs to be Procedures")
+
+    memo = dict()
+    shapes = [_block_shape(instr._loopir_proc.body, memo) for instr in instrs]
+
+    ir = proc._loopir_proc
+    sites = _find_sites(ir, set(shapes), memo)
+
+    def lift(site):
+        return _PC.lift_cursor(site.block(ir), proc)
+
+    # paths of the statements replaced so far, and of their ancestors
+    claimed, enclosing = set(), set()
+
+    def overlaps(site):
+        return any(p in claimed or p in enclosing for p in site.stmt_paths()) or any(
+            p in claimed for p in site.ancestor_paths()
+        )
+
+    # Alpha-rename every instruction once rather than once per attempt; the
+    # sites are never rewritten before all of them have been tried.
+    selected = []
+    result = InstrSelection(proc)
+    for instr, shape in zip(instrs, shapes):
+        renamed = None
+        for site in sites[shape]:
+            if overlaps(site):
+                continue
+
+            renamed = renamed or Alpha_Rename(instr._loopir_proc).result()
+            try:
+                args = Unification(renamed, site.stmts, site.live_vars).result()
+            except (UnificationError, NotImplementedError) as err:
+                result.failed.append((lift(site), instr, str(err)))
+                continue
+
+            call = LoopIR.Call(instr._loopir_proc, args, None, site.stmts[0].srcinfo)
+            if reason := _check_call(site, call, mem_aware):
+                result.failed.append((lift(site), instr, reason))
+                continue
+
+            selected.append((site, call))
+            claimed.update(site.stmt_paths())
+            enclosing.update(site.ancestor_paths())
+            result.replaced.append((lift(site), instr))
+
+    # Rewrite back to front, so that the paths of the remaining sites stay
+    # valid, and chain the forwarding functions.
+    fwds = []
+    for site, call in sorted(selected, key=lambda sc: sc[0].sort_key(), reverse=True):
+        ir, fwd = site.block(ir)._replace([call])
+        fwds.append(fwd)
+
+    def forward(cursor):
+        for fwd in fwds:
+            cursor = fwd(cursor)
+        return cursor
+
+    if selected:
+        result.proc = Procedure(ir, _provenance_eq_Procedure=proc, _forward=forward)
+    return result
@@ -8,6 +8,7 @@ from functools import wraps as _wraps
 from ..API import (
     SchedulingError,
 )
+from ..solver_limits import SMTLimitError
 
 from ..API_scheduling import (
     is_atomic_scheduling_op,
@@ -44,6 +45,8 @@ from ..API_scheduling import (
     bind_config,
     delete_config,
     write_config,
+    eliminate_config_writes,
+    ConfigWriteCounts,
     #
     # buffer and window oriented operations
     expand_dim,
@@ -89,6 +92,8 @@ from .analysis import (
     check_call_mem_types,
 )
 
+from .isel import select_instrs
+
 # --------------------------------------------------------------------------- #
 # --------------------------------------------------------------------------- #
 # Higher-order Scheduling operations
@@ -96,7 +101,9 @@ from .analysis import (
 
 def repeat(sched, n_times=None, verbose=False):
     """
-    TODO: Documentation
+    Apply `sched` `n_times` times, or if `n_times` is None, until it no
+    longer applies (i.e. raises a SchedulingError, TypeError or ValueError,
+    or one of its checks hits a limit of the SMT solver).
     """
     if n_times is not None and (not isinstance(n_times, int) or n_times < 1):
         raise TypeError("expected n_times to be None or a positive int")
@@ -109,11 +116,17 @@ def repeat(sched, n_times=None, verbose=False):
             local_kwargs = kwargs.copy()
             proc = sched(proc, *local_args, **local_kwargs)
 
-        if n_times is None:
+        if n_times is None and is_atomic_scheduling_op(sched):
+            # check for the end without raising (and formatting) an error
+            while res := sched.can_apply(proc, *args, **kwargs):
+                proc = res.proc
+            if verbose:
+                print("repeat ended with error", res.error)
+        elif n_times is None:
             try:
                 while True:
                     do_iter()
-            except (SchedulingError, TypeError, ValueError) as err:
+            except (SchedulingError, SMTLimitError, TypeError, ValueError) as err:
                 if verbose:
                     print("repeat ended with error", err)
         else:
@@ -189,7 +202,6 @@ def loop_hack(sched, find_func, verbose=False):
 
 import exo.API_cursors as _PC
 from ..API import Procedure as _Procedure
-from ..LoopIR_unification import UnificationError as _UnificationError
 
 
 class MemoryError(Exception):
@@ -227,9 +239,14 @@ def call_site_mem_aware_replace(proc, block_cursor, subproc, quiet=False):
 
 def replace_all(proc, subprocs, mem_aware=True):
     """
-    DEPRECATED ?
-    Is there a better way to write this out of primitives?
-    Does this simply require that we have better introspection facilities?
+    Replace every block which unifies with one of `subprocs` with a call to
+    it, trying the subprocedures in order.  See `select_instrs`, which also
+    reports the sites where unification failed.
+
+    args:
+        subprocs        - Procedure or list of single-statement Procedures
+        mem_aware       - only replace blocks whose buffers are in memories
+                          compatible with those of the subprocedure arguments
     """
 
     if not isinstance(subprocs, list):
@@ -243,38 +260,20 @@ def replace_all(proc, subprocs, mem_aware=True):
             "subprocedure bodies right now"
         )
 
-    patterns = {
-        _PC.AssignCursor: "_ = _",
-        _PC.ReduceCursor: "_ += _",
-        _PC.AssignConfigCursor: "TODO",
-        _PC.PassCursor: "TODO",
-        _PC.IfCursor: "TODO",
-        _PC.ForSeqCursor: "for _ in _: _",
-        _PC.AllocCursor: "TODO",
-        _PC.CallCursor: "TODO",
-        _PC.WindowStmtCursor: "TODO",
-    }
+    return select_instrs(proc, subprocs, mem_aware=mem_aware).proc
 
-    for subproc in subprocs:
-        body = subproc.body()
-        pattern = patterns[type(body[0])]
-        i = 0
-        while True:
-            try:
-                if mem_aware:
-                    proc = call_site_mem_aware_replace(
-                        proc, f"{pattern} #{i}", subproc, quiet=True
-                    )
-                else:
-                    proc = replace(proc, f"{pattern} #{i}", subproc, quiet=True)
-            except (TypeError, SchedulingError) as e:
-                if "failed to find matches" in str(e):
-                    break
-                raise
-            except (_UnificationError, MemoryError, NotImplementedError):
-                i += 1
 
-    return proc
+def eliminate_config_writes_counted(proc):
+    """
+    `eliminate_config_writes`, which also counts the configuration writes
+    it hoisted out of loops and deleted.
+
+    returns:
+        (proc, n_hoisted, n_deleted)
+    """
+    counts = ConfigWriteCounts()
+    proc = eliminate_config_writes(proc, counts)
+    return proc, counts.n_hoisted, counts.n_deleted
 
 
 def lift_if(proc, cursor, n_lifts=1):
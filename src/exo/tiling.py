@@ -0,0 +1,198 @@
+from dataclasses import dataclass, field
+
+from .LoopIR import LoopIR
+from .cost_model import Poly, loop_accesses
+from .memory import DRAM
+from .prelude import Sym
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Tile sizes for a cache hierarchy
+
+"""
+`advise_tiling` picks tile sizes for the perfect nest of loops starting at a
+loop, so that the data touched by a tile fits in each level of a cache
+hierarchy.  The footprint of a tile is computed as in `exo.cost_model`,
+from the bounding boxes of the accesses to every buffer, with every loop of
+the nest running over `T_<iter>` iterations; it is a polynomial over these
+tile sizes (and the sizes of the procedure).  Only buffers in DRAM occupy the
+caches, and the contiguous rows of the footprints are rounded up to cache
+lines.
+
+The reuse distance of a buffer is the footprint of one iteration of the
+innermost loop of the nest which its accesses do not depend on: the bytes
+touched between two uses of the same elements.  Buffers whose accesses
+depend on every loop of the nest are streamed and have no reuse.
+
+Tiles are grown greedily, level by level from the smallest cache, starting
+from the tiles of the previous level: every step doubles the tile of one
+loop (or extends it to the whole loop) so as to most reduce the bytes
+touched per iteration of the tile, as long as the footprint fits in the
+usable part of the cache.
+"""
+
+
+@dataclass(frozen=True)
+class Cache:
+    """
+    A level of the cache hierarchy, with its size and line size in bytes.
+    """
+
+    name: str
+    size: int
+    line_size: int = 64
+
+
+DEFAULT_CACHES = (
+    Cache("L1", 32 * 1024),
+    Cache("L2", 1024 * 1024),
+    Cache("L3", 8 * 1024 * 1024),
+)
+
+
+@dataclass
+class TileLevel:
+    """
+    Tile sizes (by loop) chosen for a cache level, with the footprint of a
+    tile and the bytes it touches per iteration.
+    """
+
+    cache: Cache
+    tiles: dict
+    footprint: int
+    bytes_per_iter: float
+
+
+@dataclass
+class TilingAdvice:
+    """
+    Result of `advise_tiling`.
+
+    Attributes:
+        loops (list): the names of the loops of the nest, outermost first
+        footprints (dict): the bytes of every buffer touched by a tile, as
+            polynomials over the tile sizes `T_<iter>`
+        reuse (dict): for every buffer, `(loop, distance)` with the loop
+            carrying its reuse and the reuse distance in bytes, as a
+            polynomial over the tile sizes, or None if it is streamed
+        levels (dict): the `TileLevel` of every cache level, by name
+    """
+
+    loops: list
+    footprints: dict
+    reuse: dict
+    levels: dict = field(default_factory=dict)
+
+    def tiles(self, level):
+        """
+        The tile sizes for the cache level `level`, by loop name.
+        """
+        return self.levels[level].tiles
+
+
+def _nest(loop):
+    nest = [loop]
+    while len(nest[-1].body) == 1 and isinstance(nest[-1].body[0], LoopIR.Seq):
+        nest.append(nest[-1].body[0])
+    return nest
+
+
+def _cache_bytes(fps, env, line_size):
+    total = 0
+    for fp in fps:
+        if not issubclass(fp.mem, DRAM):
+            continue
+        n = 1
+        for ext, dim in zip(fp.extents[:-1], fp.shape[:-1]):
+            n *= max(0, min(ext.evaluate(env), dim.evaluate(env)))
+        row = fp.elem_bytes
+        if fp.extents:
+            row *= max(0, min(fp.extents[-1].evaluate(env), fp.shape[-1].evaluate(env)))
+        total += n * (-(-row // line_size) * line_size)
+    return total
+
+
+def _poly_bytes(fp):
+    res = Poly.const(fp.elem_bytes)
+    for ext in fp.extents:
+        res = res * ext
+    return res
+
+
+def advise_tiling(
+    proc, loop, sizes, caches=DEFAULT_CACHES, multiple_of=None, usable=0.5
+):
+    """
+    Advise tile sizes for the perfect nest of loops starting at `loop`, a
+    loop of the LoopIR procedure `proc`, for the sizes given by name in
+    `sizes`.  `multiple_of` optionally maps loop names to the granule of
+    their tiles (e.g. a vector width), and `usable` is the fraction of every
+    cache the tiles may fill.
+    """
+    multiple_of = multiple_of or dict()
+    acc = loop_accesses(proc, loop)
+    env = acc.sizes_env(sizes)
+
+    nest = _nest(loop)
+    names = [str(s.iter) for s in nest]
+    if unknown := set(multiple_of) - set(names):
+        raise ValueError(f"no loop {sorted(unknown)[0]} in the nest {names}")
+
+    tile_syms = {s.iter: Sym(f"T_{s.iter}") for s in nest}
+    tile_ranges = dict(acc.ranges)
+    trips = dict()
+    for s in nest:
+        tile_ranges[s.iter] = (Poly(), Poly.var(tile_syms[s.iter]))
+        trips[s.iter] = acc.trips(s.iter).evaluate(env)
+    fps = acc.footprints(tile_ranges)
+
+    footprints = {fp.name: _poly_bytes(fp) for fp in fps if issubclass(fp.mem, DRAM)}
+    indices = acc.indices()
+    reuse = dict()
+    for name in footprints:
+        carriers = [
+            s for s in nest if not any(p.depends_on(s.iter) for p in indices[name])
+        ]
+        if not carriers:
+            reuse[name] = None
+            continue
+        # one iteration of the carrying loop, and so of the loops around it
+        carrier = carriers[-1]
+        depth = nest.index(carrier)
+        distance = sum(footprints.values(), Poly())
+        for s in nest[: depth + 1]:
+            distance = distance.subst(tile_syms[s.iter], Poly.const(1))
+        reuse[name] = (str(carrier.iter), distance)
+
+    advice = TilingAdvice(names, footprints, reuse)
+    tiles = {s.iter: min(multiple_of.get(str(s.iter), 1), trips[s.iter]) for s in nest}
+
+    def measure(tiles):
+        tenv = {**env, **{tile_syms[v]: t for v, t in tiles.items()}}
+        volume = 1
+        for t in tiles.values():
+            volume *= t
+        fp = _cache_bytes(fps, tenv, cache.line_size)
+        return fp, fp / volume
+
+    for cache in caches:
+        capacity = cache.size * usable
+        footprint, per_iter = measure(tiles)
+        while True:
+            best = None
+            # prefer growing the inner loops, which keeps rows contiguous
+            for s in reversed(nest):
+                t = tiles[s.iter]
+                if t >= trips[s.iter]:
+                    continue
+                grown = {**tiles, s.iter: min(2 * t, trips[s.iter])}
+                fp, cost = measure(grown)
+                if fp <= capacity and (best is None or cost < best[2]):
+                    best = (grown, fp, cost)
+            if best is None or best[2] > per_iter:
+                break
+            tiles, footprint, per_iter = best
+        advice.levels[cache.name] = TileLevel(
+            cache, {str(v): t for v, t in tiles.items()}, footprint, per_iter
+        )
+    return advice
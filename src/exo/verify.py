@@ -0,0 +1,335 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .API import Procedure
+from .LoopIR import T
+from .LoopIR_interpreter import Interpreter
+from .native import NativeLibrary, compile_library, random_args, write_sources
+from .proc_eqv import check_eqv_proc
+
+# --------------------------------------------------------------------------- #
+# --------------------------------------------------------------------------- #
+# Differential testing of scheduled procedures
+
+"""
+`verify` checks a scheduled procedure against the procedure it was scheduled
+from by running both on random arguments: the original is interpreted, the
+scheduled one is compiled to C and called through `ctypes` (see
+`exo.native`).  Every trial draws sizes satisfying the assertions of the
+original, fills the buffers with random values and compares all buffers
+afterwards, with a tolerance depending on their precision.  The first failing trial of each variant is
+shrunk to smaller sizes and simpler values before it is reported.
+
+The trials run in a process pool.  Each trial interprets the original once
+and compares all the variants against that result, so checking many
+variants of one kernel costs little more than checking one.
+"""
+
+# relative tolerances, by base type
+_RTOL = {
+    T.Num: 1e-4,
+    T.F16: 1e-2,
+    T.F32: 1e-4,
+    T.F64: 1e-10,
+    T.INT8: 0,
+    T.INT32: 0,
+}
+
+
+@dataclass
+class Mismatch:
+    """
+    A trial in which the scheduled procedure disagreed with the original.
+
+    Attributes:
+        trial (int): index of the trial
+        args (dict): the arguments of the trial by name, buffers with their
+            contents before the call
+        buffer (str): name of the first buffer which differed afterwards
+        expected (np.ndarray): its contents after interpreting the original
+        actual (np.ndarray): its contents after running the scheduled
+            procedure
+    """
+
+    trial: int
+    args: dict
+    buffer: str
+    expected: np.ndarray
+    actual: np.ndarray
+
+    def __str__(self):
+        sizes = ", ".join(
+            f"{nm}={v}" for nm, v in self.args.items() if not isinstance(v, np.ndarray)
+        )
+        err = np.max(np.abs(self.expected.astype(float) - self.actual.astype(float)))
+        return f"trial {self.trial} ({sizes}): '{self.buffer}' differs by {err}"
+
+
+@dataclass
+class VerifyResult:
+    """
+    Result of `verify`.
+
+    Attributes:
+        proc (Procedure): the scheduled procedure which was checked
+        trials (int): number of trials run
+        mismatches (list): the failing trials, as `Mismatch`es
+        counterexample (Mismatch): the first failing trial, shrunk to the
+            smallest sizes and simplest values which still fail
+    """
+
+    proc: Procedure
+    trials: int
+    mismatches: list = field(default_factory=list)
+    counterexample: Optional[Mismatch] = None
+
+    @property
+    def ok(self):
+        return not self.mismatches
+
+
+# --------------------------------------------------------------------------- #
+# Running both sides
+
+
+def _interpret(ir, args):
+    kwargs = dict()
+    for nm, v in args.items():
+        if isinstance(v, np.ndarray) and np.issubdtype(v.dtype, np.integer):
+            kwargs[nm] = v.astype(np.float64)
+        elif isinstance(v, np.ndarray):
+            kwargs[nm] = v.copy()
+        else:
+            kwargs[nm] = v
+    Interpreter(ir, kwargs).run()
+    return {
+        nm: kwargs[nm].astype(v.dtype)
+        for nm, v in args.items()
+        if isinstance(v, np.ndarray)
+    }
+
+
+def _compare(ir, expected, actual, rtol):
+    for a in ir.args:
+        nm = str(a.name)
+        if nm not in expected:
+            continue
+        typ = type(a.type.basetype())
+        tol = _RTOL[typ] if rtol is None or _RTOL[typ] == 0 else rtol
+        exp, act = expected[nm].astype(float), actual[nm].astype(float)
+        scale = max(1.0, float(np.max(np.abs(exp), initial=0)))
+        if not np.allclose(act, exp, rtol=tol, atol=tol * scale, equal_nan=True):
+            return nm
+    return None
+
+
+# --------------------------------------------------------------------------- #
+# Trials, run in the worker processes
+
+# the session of this process, set by `_init_session`
+_session = None
+
+
+class _Session:
+    def __init__(self, original, libs, max_size, seed, rtol):
+        self.ir = original._loopir_proc
+        self.lib_specs = libs
+        self.libs = dict()
+        self.max_size = max_size
+        self.seed = seed
+        self.rtol = rtol
+
+    def lib(self, i):
+        if i not in self.libs:
+            self.libs[i] = NativeLibrary(*self.lib_specs[i])
+        return self.libs[i]
+
+    def check(self, i, trial, args):
+        expected = _interpret(self.ir, args)
+        return self.compare(i, trial, args, expected)
+
+    def compare(self, i, trial, args, expected):
+        actual = self.lib(i).run(args)
+        if (nm := _compare(self.ir, expected, actual, self.rtol)) is not None:
+            return Mismatch(trial, args, nm, expected[nm], actual[nm])
+        return None
+
+    def run_trial(self, trial):
+        rng = np.random.default_rng([self.seed, trial])
+        args = random_args(self.ir, rng, self.max_size)
+        expected = _interpret(self.ir, args)
+        return [
+            self.compare(i, trial, args, expected) for i in range(len(self.lib_specs))
+        ]
+
+    def shrink(self, i, mismatch):
+        trial = mismatch.trial
+        best = mismatch
+        control = {
+            nm: v for nm, v in best.args.items() if not isinstance(v, np.ndarray)
+        }
+
+        def attempt(control, simple):
+            rng = np.random.default_rng([self.seed, trial])
+            args = random_args(self.ir, rng, self.max_size, control, simple)
+            return args and self.check(i, trial, args)
+
+        progress = True
+        while progress:
+            progress = False
+            for a in self.ir.args:
+                nm = str(a.name)
+                if a.type not in (T.size, T.index):
+                    continue
+                v, lo = control[nm], 1 if a.type is T.size else 0
+                for smaller in sorted({lo, v // 2, v - 1}):
+                    if not lo <= smaller < v:
+                        continue
+                    if found := attempt({**control, nm: smaller}, False):
+                        best, control = found, {**control, nm: smaller}
+                        progress = True
+                        break
+
+        return attempt(control, True) or best
+
+
+def _init_session(*args):
+    global _session
+    _session = _Session(*args)
+
+
+def _run_trial(trial):
+    return _session.run_trial(trial)
+
+
+def _shrink(i, mismatch):
+    return _session.shrink(i, mismatch)
+
+
+# --------------------------------------------------------------------------- #
+# Entry points
+
+
+def verify(original, scheduled, **kwargs):
+    """
+    Check `scheduled` against `original` on random arguments, see
+    `verify_variants`.
+
+    Returns:
+        VerifyResult: the result of the check
+    """
+    return verify_variants(original, [scheduled], **kwargs)[0]
+
+
+def verify_variants(
+    original,
+    variants,
+    *,
+    trials=16,
+    max_size=32,
+    seed=0,
+    rtol=None,
+    workers=None,
+    cflags=("-O2", "-march=native"),
+    shrink=True,
+):
+    """
+    Check scheduled variants of `original` against it on random arguments.
+    `original` is interpreted, the variants are compiled with the C compiler
+    `$CC` (or `cc`) and run on the same arguments, and all buffers are
+    compared afterwards.
+
+    results = verify_variants(gemm, [gemm_avx2, gemm_avx512], trials=100)
+    for res in results:
+        if not res.ok:
+            print(res.proc.name(), res.counterexample)
+
+    Args:
+        original (Procedure): the reference procedure
+        variants (list): procedures scheduled from `original`
+        trials (int): number of random arguments to try
+        max_size (int): upper bound on the sizes and indices drawn
+        seed (int): seed of the random arguments, trial `i` draws from the
+            seed sequence `[seed, i]`
+        rtol (float): relative tolerance of floating-point buffers; defaults
+            to a tolerance suited to the precision of each buffer.  Integer
+            buffers are always compared exactly.
+        workers (int): number of processes to run the trials in; defaults to
+            the number of CPUs, 1 runs them in this process
+        cflags (tuple): flags to compile the variants with
+        shrink (bool): shrink the first failing trial of every variant
+
+    Raises:
+        TypeError: if an argument is not a Procedure, or a variant takes a
+            buffer outside of DRAM
+        ValueError: if a variant was not scheduled from `original`, or no
+            arguments satisfying the assertions of `original` are found
+        RuntimeError: if a variant fails to compile
+
+    Returns:
+        list: a `VerifyResult` for every variant
+    """
+    if not isinstance(original, Procedure) or not all(
+        isinstance(v, Procedure) for v in variants
+    ):
+        raise TypeError("expected Procedures")
+
+    ir = original._loopir_proc
+    for v in variants:
+        if not check_eqv_proc(ir, v._loopir_proc):
+            raise ValueError(f"{v.name()} was not scheduled from {original.name()}")
+        if [str(a.name) for a in v._loopir_proc.args] != [str(a.name) for a in ir.args]:
+            raise ValueError(
+                f"{v.name()} does not take the same arguments as {original.name()}"
+            )
+    # fail early rather than in every worker
+    random_args(ir, np.random.default_rng([seed, 0]), max_size)
+
+    workers = workers or os.cpu_count()
+    with tempfile.TemporaryDirectory(prefix="exo_verify_") as tmp:
+        dirs = [Path(tmp) / str(i) for i in range(len(variants))]
+        for v, d in zip(variants, dirs):
+            write_sources(v._loopir_proc, d)
+        with ThreadPoolExecutor(workers) as pool:
+            paths = list(
+                pool.map(
+                    lambda vd: compile_library(vd[0].name(), vd[1], cflags),
+                    zip(variants, dirs),
+                )
+            )
+
+        libs = [
+            (path, [str(a.name) for a in v._loopir_proc.args])
+            for path, v in zip(paths, variants)
+        ]
+        session = (original, libs, max_size, seed, rtol)
+        if workers == 1:
+            _init_session(*session)
+            return _collect(variants, trials, map, shrink)
+
+        with ProcessPoolExecutor(
+            workers, initializer=_init_session, initargs=session
+        ) as pool:
+            return _collect(variants, trials, pool.map, shrink)
+
+
+def _collect(variants, trials, map_fn, shrink):
+    results = [VerifyResult(v, trials) for v in variants]
+    for mismatches in map_fn(_run_trial, range(trials)):
+        for res, m in zip(results, mismatches):
+            if m is not None:
+                res.mismatches.append(m)
+
+    failed = [(i, res) for i, res in enumerate(results) if not res.ok]
+    firsts = [res.mismatches[0] for _, res in failed]
+    if shrink:
+        firsts = map_fn(_shrink, [i for i, _ in failed], firsts)
+    for (_, res), m in zip(failed, firsts):
+        res.counterexample = m
+    return results
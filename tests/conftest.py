@@ -1,12 +1,14 @@
 import ctypes
 import distutils.spawn
 import functools
+import hashlib
 import os
 import platform
 import re
 import shlex
 import subprocess
 import textwrap
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, Any, Dict, Union, List, Set
@@ -16,7 +18,10 @@ import pytest
 from _pytest.config import argparsing, Config
 from _pytest.nodes import Node
 
-from exo import Procedure, compile_procs
+import exo
+import exo.main
+from exo import Procedure, compile_procs, compile_procs_to_strings
+from exo.solver_service import SolverService
 
 
 # ---------------------------------------------------------------------------- #
@@ -37,6 +42,17 @@ def pytest_configure(config: Config):
     config.addinivalue_line(
         "markers", "isa(name): mark test to run only when required ISA is available"
     )
+    config.addinivalue_line(
+        "markers", "app(path): the app under apps/ compiled for the `app` fixture"
+    )
+
+    # Keep the instruction cache out of the user's home directory. This has
+    # to happen here rather than in a fixture, since collecting the tests
+    # already loads instructions.
+    if cache := getattr(config, "cache", None):
+        os.environ["EXO_CACHE_DIR"] = str(cache.mkdir("exo_instrs"))
+    else:
+        os.environ["EXO_DISABLE_CACHE"] = "1"
 
 
 def pytest_runtest_setup(item: Node):
@@ -46,6 +62,27 @@ def pytest_runtest_setup(item: Node):
             pytest.skip(f"skipping test because {isa} is not available")
 
 
+def pytest_terminal_summary(terminalreporter):
+    timings = [
+        (report.nodeid, timing)
+        for reports in terminalreporter.stats.values()
+        for report in reports
+        if getattr(report, "when", None) == "call"
+        for name, timing in report.user_properties
+        if name == "app_timing"
+    ]
+    if not timings:
+        return
+
+    terminalreporter.section("app compilation times")
+    for nodeid, timing in sorted(timings):
+        cached = " (cached)" if timing["cached"] else ""
+        terminalreporter.write_line(
+            f"{nodeid}: schedule {timing['schedule']:.1f}s, "
+            f"codegen {timing['codegen']:.1f}s{cached}"
+        )
+
+
 # ---------------------------------------------------------------------------- #
 # Pytest fixtures                                                              #
 # ---------------------------------------------------------------------------- #
@@ -73,6 +110,34 @@ def golden(request):
     yield GoldenOutput(p, text, request.config)
 
 
+@pytest.fixture(scope="session")
+def app_cache(request):
+    apps = AppCache(request.config)
+    # with pytest-xdist, the tests (and so the apps) are already distributed
+    if not hasattr(request.config, "workerinput"):
+        apps.prefetch(
+            request.config.rootpath / "apps" / mark.args[0]
+            for item in request.session.items
+            for mark in item.iter_markers(name="app")
+        )
+    return apps
+
+
+@pytest.fixture
+def app(app_cache, request):
+    """
+    A fixture to compile the app of the `app` mark of the requesting test,
+    given as a path under apps/, to the text of its header and source. The
+    time the app took to schedule and to compile is shown at the end of the
+    test session.
+    """
+
+    mark = request.node.get_closest_marker("app")
+    text, timing = app_cache.get(request.config.rootpath / "apps" / mark.args[0])
+    request.node.user_properties.append(("app_timing", timing))
+    return text
+
+
 @pytest.fixture
 def compiler(tmp_path, request):
     return Compiler(tmp_path, request.node.name)
@@ -138,6 +203,93 @@ class GoldenOutput(str):
         return equal or self.update
 
 
+def _compile_app(module_file: Path):
+    time0 = time.perf_counter()
+    mod = exo.main.load_user_code(module_file)
+    procs = exo.main.get_procs_from_module(mod)
+    time1 = time.perf_counter()
+    c_file, h_file = compile_procs_to_strings(procs, "test_case.h")
+    time2 = time.perf_counter()
+
+    timing = {"schedule": time1 - time0, "codegen": time2 - time1, "cached": False}
+    return f"{h_file}\n{c_file}", timing
+
+
+def _try_compile_app(module_file: Path):
+    # failures are reported by the test of the app, when it compiles again
+    try:
+        return _compile_app(module_file)
+    except Exception:
+        return None
+
+
+class AppCache:
+    """
+    The compiled apps, kept in the pytest cache under the hash of the sources
+    of the app and of Exo, so that an app is only scheduled again when one of
+    them changes. Run with --cache-clear to compile all the apps again.
+    """
+
+    def __init__(self, config: Config):
+        self.apps_dir = config.rootpath / "apps"
+        self.cache = getattr(config, "cache", None)
+        self.compiled = {}
+
+    def _key(self, module_file: Path):
+        app_hash = hashlib.sha256(exo_source_hash().encode())
+        for path in sorted(module_file.parent.glob("*.py")):
+            app_hash.update(path.read_bytes())
+        app = module_file.relative_to(self.apps_dir).with_suffix("")
+        return f"exo/apps/{app.as_posix()}", app_hash.hexdigest()
+
+    def _lookup(self, module_file: Path):
+        if module_file in self.compiled:
+            return self.compiled[module_file]
+        if self.cache is None:
+            return None
+
+        key, app_hash = self._key(module_file)
+        entry = self.cache.get(key, None)
+        if entry is None or entry["hash"] != app_hash:
+            return None
+        return entry["text"], {**entry["timing"], "cached": True}
+
+    def _store(self, module_file: Path, text: str, timing):
+        self.compiled[module_file] = text, timing
+        if self.cache is not None:
+            key, app_hash = self._key(module_file)
+            self.cache.set(key, {"hash": app_hash, "text": text, "timing": timing})
+
+    def prefetch(self, module_files):
+        """
+        Compile the apps which are not cached yet, in parallel.
+        """
+        module_files = sorted({m.resolve(strict=True) for m in module_files})
+        module_files = [m for m in module_files if self._lookup(m) is None]
+        if len(module_files) < 2:
+            return
+        try:
+            service = SolverService()
+        except OSError:
+            return  # the apps are compiled one at a time by their tests
+
+        with service:
+            results = service.map(_try_compile_app, module_files)
+        for module_file, result in zip(module_files, results):
+            if result is not None:
+                self._store(module_file, *result)
+
+    def get(self, module_file: Path):
+        """
+        The text of the compiled app, and the time it took to compile.
+        """
+        module_file = module_file.resolve(strict=True)
+        if (result := self._lookup(module_file)) is None:
+            result = _compile_app(module_file)
+            self._store(module_file, *result)
+        return result
+
+
 @dataclass
 class ProcWrapper:
     fn_ptr: Any  # CDLL's internal _FuncPtr
@@ -187,13 +339,21 @@ class Compiler:
         additional_file=None,
         compile_only: bool = False,
         skip_on_fail: bool = False,
+        compile_options: Optional[Dict[str, Any]] = None,
         **kwargs,
     ):
         test_files = test_files or {}
+        compile_options = compile_options or {}
         if isinstance(procs, Procedure):
             procs = [procs]
 
-        compile_procs(procs, self.workdir, f"{self.basename}.c", f"{self.basename}.h")
+        compile_procs(
+            procs,
+            self.workdir,
+            f"{self.basename}.c",
+            f"{self.basename}.h",
+            **compile_options,
+        )
 
         atl = self.workdir / f"{self.basename}_pretty.atl"
         atl.write_text("\n".join(map(str, procs)))
@@ -292,6 +452,17 @@ class Compiler:
         return cml_body
 
 
+@functools.cache
+def exo_source_hash() -> str:
+    exo_dir = Path(exo.__file__).parent
+    src_hash = hashlib.sha256()
+    for path in sorted(exo_dir.rglob("*")):
+        if path.is_file() and "__pycache__" not in path.parts:
+            src_hash.update(str(path.relative_to(exo_dir)).encode())
+            src_hash.update(path.read_bytes())
+    return src_hash.hexdigest()
+
+
 @functools.cache
 def get_cpu_features() -> Set[str]:
     def get_cpuinfo_string() -> str:
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import subprocess
+import textwrap
 from pathlib import Path
 
 import numpy as np
@@ -226,6 +228,228 @@ def test_unroll_blur(compiler, tmp_path):
 # --- End Blur Test ---
 
 
+# --- Address hoisting ---
+
+
+def test_hoist_addresses_blur(golden, compiler):
+    blur = gen_blur()
+    blur = old_split(blur, "j", 4, ["j1", "j2"])
+
+    c_file, h_file = compile_procs_to_strings([blur], "test.h", hoist_addresses=True)
+    assert f"{h_file}{c_file}" == golden
+
+    n, m, k_size = 13, 10, 3
+    image = np.random.rand(n, m).astype(np.float32)
+    kernel = np.random.rand(k_size, k_size).astype(np.float32)
+    expected = np.zeros_like(image)
+    blur.interpret(n=n, m=m, k_size=k_size, image=image, kernel=kernel, res=expected)
+
+    res = np.zeros_like(image)
+    fn = compiler.compile(blur, compile_options={"hoist_addresses": True})
+    fn(None, n, m, k_size, image, kernel, res)
+
+    np.testing.assert_allclose(res, expected, rtol=1e-5)
+
+
+def test_hoist_addresses_windows(golden, compiler):
+    @proc
+    def dot(K: size, a: [f32][K], b: [f32][K], c: [f32][1]):
+        for k in seq(0, K):
+            c[0] += a[k] * b[k]
+
+    @proc
+    def matmul(M: size, N: size, K: size, A: f32[M, K], B: f32[N, K], C: f32[M, N]):
+        for i in seq(0, M):
+            for j in seq(0, N):
+                dot(K, A[i, :], B[j, :], C[i, j : j + 1])
+
+    c_file, h_file = compile_procs_to_strings([matmul], "test.h", hoist_addresses=True)
+    assert f"{h_file}{c_file}" == golden
+
+    M, N, K = 5, 7, 9
+    A = np.random.rand(M, K).astype(np.float32)
+    B = np.random.rand(N, K).astype(np.float32)
+    C = np.zeros((M, N), dtype=np.float32)
+
+    fn = compiler.compile(matmul, compile_options={"hoist_addresses": True})
+    fn(None, M, N, K, A, B, C)
+
+    np.testing.assert_allclose(C, A @ B.T, rtol=1e-5)
+
+
+# --- Header-only libraries ---
+
+
+def test_header_only(golden, compiler):
+    @proc
+    def scal(n: size, alpha: f32, x: [f32][n]):
+        for i in seq(0, n):
+            x[i] = alpha * x[i]
+
+    @proc
+    def scal_rows(M: size, N: size, alpha: f32, A: f32[M, N]):
+        for i in seq(0, M):
+            scal(N, alpha, A[i, :])
+
+    c_file, h_file = compile_procs_to_strings([scal_rows], "test.h", header_only=True)
+    assert c_file == '#include "test.h"\n'
+    assert h_file == golden
+    assert "static EXO_ALWAYS_INLINE void scal_rows(" in h_file
+    assert "static EXO_ALWAYS_INLINE void scal(" in h_file
+
+    # static inline procs cannot be loaded from a shared library, so
+    # include the header from two translation units of a test program
+    main_c = textwrap.dedent(
+        """
+        #include "test_header_only.h"
+
+        void scale_twice(int M, int N, float *A);
+
+        int main() {
+            float A[3][5];
+            for (int i = 0; i < 15; i++) A[i / 5][i % 5] = (float)i;
+
+            float alpha = 2.0f;
+            scal_rows(NULL, 3, 5, &alpha, &A[0][0]);
+            scale_twice(3, 5, &A[0][0]);
+
+            for (int i = 0; i < 15; i++) {
+                if (A[i / 5][i % 5] != 4.0f * i) return 1;
+            }
+            return 0;
+        }
+        """
+    )
+    other_c = textwrap.dedent(
+        """
+        #include "test_header_only.h"
+
+        void scale_twice(int M, int N, float *A) {
+            float alpha = 2.0f;
+            scal_rows(NULL, M, N, &alpha, A);
+        }
+        """
+    )
+
+    main = compiler.compile(
+        scal_rows,
+        test_files={"main.c": main_c, "other.c": other_c},
+        compile_options={"header_only": True},
+    )
+    subprocess.run([main], check=True)
+
+
+# --- Specialization dispatch ---
+
+
+def test_dispatch(golden, compiler):
+    from exo.stdlib.dispatch import dispatch
+
+    @proc
+    def axpy(n: size, alpha: f32, x: f32[n], y: f32[n]):
+        for i in seq(0, n):
+            y[i] += alpha * x[i]
+
+    def unrolled(p):
+        p = divide_loop(p, "i", 4, ["io", "ii"], perfect=True)
+        return unroll_loop(p, "ii")
+
+    axpy = dispatch(axpy, [(["n == 8"], unrolled), (["n == 4"], unrolled)])
+
+    c_file, h_file = compile_procs_to_strings([axpy], "test.h")
+    assert f"{h_file}{c_file}" == golden
+
+    fn = compiler.compile(axpy)
+    for n in (4, 8, 13):
+        x = np.random.rand(n).astype(np.float32)
+        y = np.random.rand(n).astype(np.float32)
+        alpha = np.array([1.5], dtype=np.float32)
+        expected = y + alpha * x
+
+        fn(None, n, alpha, x, y)
+        np.testing.assert_allclose(y, expected, rtol=1e-6)
+
+
+def test_dispatch_unit_stride(golden):
+    from exo.stdlib.dispatch import dispatch
+
+    @proc
+    def axpy(n: size, alpha: f32, x: [f32][n], y: [f32][n]):
+        for i in seq(0, n):
+            y[i] += alpha * x[i]
+
+    axpy = dispatch(
+        axpy, [(["stride(x, 0) == 1", "stride(y, 0) == 1"], simplify)], "axpy_dispatch"
+    )
+
+    c_file, h_file = compile_procs_to_strings([axpy], "test.h")
+    assert f"{h_file}{c_file}" == golden
+
+
+def test_dispatch_not_equivalent():
+    from exo.stdlib.dispatch import dispatch
+
+    @proc
+    def foo(n: size, x: f32[n]):
+        for i in seq(0, n):
+            x[i] = 0.0
+
+    @proc
+    def bar(x: f32[8]):
+        for i in seq(0, 8):
+            x[i] = 1.0
+
+    with pytest.raises(SchedulingError, match="variant 0 of foo is not equivalent"):
+        dispatch(foo, [(["n == 8"], lambda p: bar)])
+
+
+# --- Range-proven division ---
+
+
+def test_tiled_sgemm_no_floor_div(golden, compiler):
+    @proc
+    def sgemm_packed(
+        M: size, N: size, K: size, A: f32[M, K], Bp: f32[N / 8, K, 8], C: f32[M, N]
+    ):
+        assert N % 8 == 0
+        for i in seq(0, M):
+            for j in seq(0, N):
+                for k in seq(0, K):
+                    C[i, j] += A[i, k] * Bp[j / 8, k, j % 8]
+
+    sgemm_packed = divide_loop(sgemm_packed, "i", 4, ["io", "ii"], tail="cut")
+    sgemm_packed = divide_loop(sgemm_packed, "k", 6, ["ko", "ki"], tail="cut")
+
+    c_file, h_file = compile_procs_to_strings([sgemm_packed], "test.h")
+    assert f"{h_file}{c_file}" == golden
+    assert "exo_floor_div" not in c_file
+
+    M, N, K = 10, 16, 15
+    A = np.random.rand(M, K).astype(np.float32)
+    B = np.random.rand(K, N).astype(np.float32)
+    Bp = np.ascontiguousarray(B.reshape(K, N // 8, 8).transpose(1, 0, 2))
+    C = np.zeros((M, N), dtype=np.float32)
+
+    fn = compiler.compile(sgemm_packed)
+    fn(None, M, N, K, A, Bp, C)
+
+    np.testing.assert_allclose(C, A @ B, rtol=1e-5)
+
+
+def test_floor_div_unproven_sign():
+    @proc
+    def foo(N: size, k: index, x: f32[N]):
+        assert k >= 0
+        assert k < N
+        for i in seq(0, N):
+            if i >= k:
+                x[(i - k) / 2] = 0.0
+
+    # the `if` does not inform range analysis, so `i - k` may be negative
+    c_file, _ = compile_procs_to_strings([foo], "test.h")
+    assert "exo_floor_div((i - k), 2)" in c_file
+
+
 # --- conv1d test ---
 def test_conv1d(compiler):
     @proc
@@ -422,6 +646,55 @@ def test_select1(compiler):
     np.testing.assert_almost_equal(actual, expected)
 
 
+def test_builtin_precision(golden):
+    @proc
+    def act32(n: size, x: f32[n], y: f32[n]):
+        for i in seq(0, n):
+            y[i] = relu(sin(x[i]) + 1.0)
+            x[i] = select(y[i], 0.5, sigmoid(y[i]), x[i])
+
+    @proc
+    def act64(n: size, x: f64[n], y: f64[n]):
+        for i in seq(0, n):
+            y[i] = relu(sin(x[i]))
+
+    @proc
+    def act8(x: i8):
+        x = relu(x)
+
+    # an i32 operand does not fit in a float, so select compares in double
+    @proc
+    def select32(x: i32, v: f32, y: f32, z: f32):
+        y = select(x, v, y, z)
+
+    c_file, _ = compile_procs_to_strings([act32, act64, act8, select32], "test.h")
+    assert c_file == golden
+
+
+def test_ml_builtins(compiler):
+    @proc
+    def activations(n: size, x: f32[n], e: f32[n], t: f32[n], s: f32[n]):
+        for i in seq(0, n):
+            e[i] = exp(x[i])
+            t[i] = tanh(x[i])
+            s[i] = sigmoid(x[i])
+
+    x = np.linspace(-20.0, 10.0, 64, dtype=np.float32)
+    expected = [np.exp(x), np.tanh(x), 1.0 / (1.0 + np.exp(-x.astype(np.float64)))]
+
+    fn = compiler.compile(activations)
+    outs = [np.zeros_like(x) for _ in range(3)]
+    fn(None, len(x), x, *outs)
+    for out, ex in zip(outs, expected):
+        np.testing.assert_allclose(out, ex, rtol=1e-5)
+
+    # the interpreter computes in the precision of the buffers too
+    outs = [np.zeros_like(x) for _ in range(3)]
+    activations.interpret(n=len(x), x=x, e=outs[0], t=outs[1], s=outs[2])
+    for out, ex in zip(outs, expected):
+        np.testing.assert_allclose(out, ex, rtol=1e-5)
+
+
 ##
 # Tests for const-correctness
 
@@ -373,6 +373,82 @@ def test_ld(golden):
     assert f"{config_ld_i8}\n{ld_i8}" == golden
 
 
+def new_config_ab():
+    @config
+    class ConfigAB:
+        a: index
+        s: stride
+
+    @instr("config_s({st});")
+    def config_s(st: stride):
+        ConfigAB.s = st
+
+    return ConfigAB, config_s
+
+
+def test_eliminate_config_writes(golden):
+    ConfigAB, config_s = new_config_ab()
+
+    @proc
+    def foo(n: size, m: size, x: i8[n, m]):
+        assert m > 0
+        for i in seq(0, n):
+            for j in seq(0, m):
+                config_s(stride(x, 0))
+                ConfigAB.a = 3
+                x[i, j] = 1.0
+            ConfigAB.a = 3
+            ConfigAB.a = i
+            ConfigAB.a = i
+            config_s(stride(x, 0))
+        ConfigAB.a = n
+
+    assert str(eliminate_config_writes(foo)) == golden
+    eliminated, n_hoisted, n_deleted = eliminate_config_writes_counted(foo)
+    assert str(eliminated) == golden
+    assert (n_hoisted, n_deleted) == (3, 3)
+
+    counts = ConfigWriteCounts()
+    assert str(eliminate_config_writes(foo, counts)) == golden
+    assert counts == ConfigWriteCounts(n_hoisted=3, n_deleted=3)
+    with pytest.raises(TypeError, match="expected a ConfigWriteCounts object"):
+        eliminate_config_writes(foo, (0, 0))
+
+
+def test_eliminate_config_writes_guard(golden):
+    ConfigAB, config_s = new_config_ab()
+
+    @proc
+    def foo(n: size, m: size, x: i8[n, 16]):
+        assert m <= n
+        for i in seq(0, n - m):
+            config_s(stride(x, 0))
+            for j in seq(0, 16):
+                x[i, j] = 1.0
+
+    # the loop may not run, so the hoisted write is guarded
+    assert str(eliminate_config_writes(foo)) == golden
+
+
+def test_eliminate_config_writes_variant():
+    ConfigAB, _ = new_config_ab()
+
+    @proc
+    def foo(n: size, x: i8[n]):
+        for i in seq(0, n):
+            ConfigAB.a = i
+            x[i] = 1.0
+        for i in seq(0, n):
+            ConfigAB.a = 2
+            ConfigAB.a = n
+            x[i] = 2.0
+
+    # the first write changes in every iteration, and the others write the
+    # same field in the loop
+    assert str(eliminate_config_writes(foo)) == str(foo)
+    assert eliminate_config_writes_counted(foo)[1:] == (0, 0)
+
+
 """
 
     @proc
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import pytest
+
+from exo import proc, DRAM
+from exo.cost_model import loop_accesses
+from exo.libs.memories import AVX2
+from exo.platforms.x86 import *
+from exo.stdlib.scheduling import *
+
+
+def new_gemm():
+    @proc
+    def gemm(M: size, N: size, K: size, C: f32[M, N], A: f32[M, K], B: f32[K, N]):
+        for i in seq(0, M):
+            for j in seq(0, N):
+                for k in seq(0, K):
+                    C[i, j] += A[i, k] * B[k, j]
+
+    return gemm
+
+
+def test_gemm_costs():
+    est = new_gemm().estimate_cost()
+    assert str(est.flops) == "2*K*M*N"
+    assert str(est.bytes[DRAM]) == "16*K*M*N"
+    assert est.exact
+    assert [(lp.iter, lp.depth, str(lp.trips)) for lp in est.loops] == [
+        ("i", 0, "M"),
+        ("j", 1, "N"),
+        ("k", 2, "K"),
+    ]
+
+    costs = est.evaluate({"M": 4, "N": 8, "K": 3})
+    assert costs.flops == 2 * 4 * 8 * 3
+    assert costs.total_bytes == 16 * 4 * 8 * 3
+    # a row of A and a column of B, and one element of C
+    assert costs.working_sets[2] == ("k", 2, {DRAM: 4 * (3 + 3 + 1)})
+    # a row of A, all of B and a row of C
+    assert costs.working_sets[1] == ("j", 1, {DRAM: 4 * (3 + 3 * 8 + 8)})
+
+    with pytest.raises(ValueError, match="no value given for the size 'K'"):
+        est.evaluate({"M": 4, "N": 8})
+
+
+def test_loop_accesses():
+    gemm = new_gemm().INTERNAL_proc()
+    j_loop = gemm.body[0].body[0]
+    acc = loop_accesses(gemm, j_loop)
+    env = acc.sizes_env({"M": 4, "N": 8, "K": 3})
+    assert [str(v) for v in acc.ranges] == ["j", "k"]
+    assert acc.trips(j_loop.iter).evaluate(env) == 8
+    assert sorted(acc.indices()) == ["A", "B", "C"]
+    # all of B, and a row of A and of C
+    assert [str(fp) for fp in acc.footprints(acc.ranges)] == [
+        "A[1, K] (DRAM)",
+        "B[K, N] (DRAM)",
+        "C[1, N] (DRAM)",
+    ]
+
+    with pytest.raises(ValueError, match="no loop over j in gemm"):
+        loop_accesses(new_gemm().INTERNAL_proc(), j_loop)
+
+
+def test_tails_are_exact():
+    gemm = divide_loop(new_gemm(), "j", 8, ["jo", "ji"], tail="cut")
+    gemm = divide_loop(gemm, "k", 4, ["ko", "ki"], tail="cut_and_guard")
+    est = gemm.estimate_cost()
+    # the guard of the tail is counted as taken
+    assert not est.exact
+    for M, N, K in [(1, 8, 4), (3, 20, 7), (5, 3, 2)]:
+        costs = est.evaluate({"M": M, "N": N, "K": K})
+        assert costs.flops == 2 * M * N * K
+        assert costs.bytes == {DRAM: 16 * M * N * K}
+
+
+def test_quotients_print_source_names():
+    @proc
+    def copy(n: size, dst: f32[n], src: f32[n]):
+        for i in seq(0, n):
+            dst[i] = src[i]
+
+    est = divide_loop(copy, "i", 4, ["io", "ii"], tail="cut").estimate_cost()
+    assert str(est.bytes[DRAM]) == "8*(n % 4) + 32*(n / 4)"
+    assert repr(est.loops[0]).startswith(
+        "LoopEstimate(iter='io', depth=0, trips=(n / 4), "
+        "footprints=[BufferFootprint(name='src', "
+    )
+    assert "extents=[4*(n / 4)], shape=[n]" in repr(est.loops[0])
+
+
+def test_instructions_and_memories():
+    @proc
+    def copy(n: size, dst: f32[n], src: f32[n]):
+        assert n % 8 == 0
+        for i in seq(0, n):
+            dst[i] = src[i]
+
+    vec = divide_loop(copy, "i", 8, ["io", "ii"], perfect=True)
+    vec = stage_mem(vec, "for ii in _:_", "src[8*io:8*io+8]", "reg")
+    vec = simplify(set_memory(vec, "reg", AVX2))
+    vec = replace(vec, "for i0 in _:_", mm256_loadu_ps)
+    vec = replace(vec, "for ii in _:_", mm256_storeu_ps)
+
+    costs = vec.estimate_cost().evaluate({"n": 64})
+    assert costs.flops == 0
+    assert costs.instr_calls == {"mm256_loadu_ps": 8, "mm256_storeu_ps": 8}
+    assert costs.bytes == {DRAM: 2 * 4 * 64, AVX2: 2 * 4 * 64}
+    # all of src and dst, and the register
+    assert costs.working_sets == [("io", 0, {DRAM: 2 * 4 * 64, AVX2: 32})]
+
+
+def test_triangular_loops():
+    @proc
+    def prefix(n: size, x: f32[n], y: f32[n]):
+        for i in seq(0, n):
+            for j in seq(0, i):
+                x[i] += y[j] * y[j]
+
+    est = prefix.estimate_cost()
+    assert str(est.flops) == "n**2 - n"
+    assert est.evaluate({"n": 10}).flops == 90
+    # the inner loop reads up to n - 1 elements of y
+    assert str(est.loops[0].footprints[0]) == "y[n - 1] (DRAM)"
+
+
+def test_divided_index():
+    @proc
+    def halve(n: size, x: f32[n], y: f32[n]):
+        for i in seq(0, n):
+            y[i] = x[i / 2]
+
+    # `x[i / 2]` is not affine in `i`, so the whole of `x` is counted
+    est = halve.estimate_cost()
+    assert str(est.bytes[DRAM]) == "8*n"
+    assert [str(fp) for fp in est.loops[0].footprints] == ["x[n] (DRAM)", "y[n] (DRAM)"]
@@ -571,6 +571,74 @@ def test_infereffects2(golden):
     assert foo.show_effects() == golden
 
 
+def test_effects_cached_per_stmt(monkeypatch):
+    import exo.effectcheck as effectcheck
+    from exo.stdlib.scheduling import divide_loop
+
+    @proc
+    def foo(n: size, A: f32[n, 16], B: f32[n, 16]):
+        for i in seq(0, n):
+            for j in seq(0, 16):
+                A[i, j] = 0.0
+        for i in seq(0, n):
+            for j in seq(0, 16):
+                B[i, j] = A[i, j]
+
+    queries = []
+    sync_solver = effectcheck.CheckEffects.sync_solver
+
+    def count_queries(self):
+        queries.append(self.context)
+        sync_solver(self)
+
+    monkeypatch.setattr(effectcheck.CheckEffects, "sync_solver", count_queries)
+
+    # re-checking an unchanged proc reuses all of the results
+    foo.check_effects()
+    assert queries == []
+
+    bar = divide_loop(foo, "j #1", 4, ["jo", "ji"], perfect=True)
+    bar.check_effects()
+    assert queries
+
+    # the statements which were not rewritten keep their effects
+    foo_ir, bar_ir = foo.INTERNAL_proc(), bar.INTERNAL_proc()
+    assert bar_ir.body[0] is foo_ir.body[0]
+
+
+def test_effects_cache_rechecks_bounds():
+    from exo.stdlib.scheduling import bound_alloc
+
+    @proc
+    def foo(A: f32[16]):
+        x: f32[16]
+        for i in seq(0, 16):
+            x[i] = A[i]
+
+    foo.check_effects()
+    assert "x: f32[20]" in str(bound_alloc(foo, "x", ["20"]))
+    with pytest.raises(TypeError, match="x is written out-of-bounds"):
+        bound_alloc(foo, "x", ["8"])
+
+
+def test_effects_div_syms_bounded(monkeypatch):
+    import exo.effectcheck as effectcheck
+
+    monkeypatch.setattr(effectcheck, "_div_syms", dict())
+    monkeypatch.setattr(effectcheck, "_MAX_DIV_SYMS", 2)
+
+    @proc
+    def foo(n: size, A: f32[n]):
+        for i in seq(0, n):
+            A[i / 2] = 0.0
+            A[i / 3] = 0.0
+            A[i / 4] = 0.0
+            A[i % 5] = 0.0
+
+    foo.check_effects()
+    assert 0 < len(effectcheck._div_syms) <= 2
+
+
 # are we testing a case of an else branch?
 
 # what if effset.pred is None?
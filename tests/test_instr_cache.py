@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from exo import proc, instr, config, DRAM
+from exo.libs.memories import AVX2
+from exo.stdlib.scheduling import *
+import exo.API as API
+from exo import instr_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv("EXO_DISABLE_CACHE", raising=False)
+    monkeypatch.setenv("EXO_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def make_load_instr():
+    # every call defines the same instruction, from the same source
+    @instr("{dst_data} = _mm256_loadu_ps(&{src_data});")
+    def load(dst: [f32][8] @ AVX2, src: [f32][8] @ DRAM):
+        assert stride(src, 0) == 1
+        assert stride(dst, 0) == 1
+
+        for i in seq(0, 8):
+            dst[i] = src[i]
+
+    return load
+
+
+def test_instr_is_checked_lazily(monkeypatch):
+    def fail(_):
+        assert False, "instruction checked before use"
+
+    check_uast = API._check_uast
+    monkeypatch.setenv("EXO_DISABLE_CACHE", "1")
+    monkeypatch.setattr(API, "_check_uast", fail)
+    load = make_load_instr()
+    assert load.is_instr()
+    assert load.get_instr() == "{dst_data} = _mm256_loadu_ps(&{src_data});"
+
+    monkeypatch.setattr(API, "_check_uast", check_uast)
+    assert load.name() == "load"
+
+
+def test_instr_cache_roundtrip(cache_dir, monkeypatch):
+    load1 = make_load_instr()
+    ir1 = load1.INTERNAL_proc()
+    assert len(list(cache_dir.glob("*.pkl"))) == 1
+
+    def fail(_):
+        assert False, "cached instruction checked again"
+
+    check_uast = API._check_uast
+    monkeypatch.setattr(API, "_check_uast", fail)
+    load2 = make_load_instr()
+    ir2 = load2.INTERNAL_proc()
+
+    assert str(ir1) == str(ir2)
+    assert str(ir1.eff) == str(ir2.eff)
+    # loaded symbols must not alias the ones of the original proc
+    assert ir1.args[0].name != ir2.args[0].name
+
+    monkeypatch.setattr(API, "_check_uast", check_uast)
+
+    @proc
+    def foo(x: f32[8] @ DRAM):
+        y: f32[8] @ AVX2
+        for i in seq(0, 8):
+            y[i] = x[i]
+
+    foo = replace(foo, "for i in _:_", load2)
+    assert "load(y[0:8], x[0:8])" in str(foo)
+
+
+def test_instr_cache_disabled(cache_dir, monkeypatch):
+    monkeypatch.setenv("EXO_DISABLE_CACHE", "1")
+    make_load_instr().INTERNAL_proc()
+    assert not list(cache_dir.glob("*.pkl"))
+
+
+def test_instr_cache_corrupt_entry(cache_dir):
+    make_load_instr().INTERNAL_proc()
+    (entry,) = cache_dir.glob("*.pkl")
+    entry.write_bytes(b"garbage")
+
+    assert make_load_instr().name() == "load"
+
+
+def test_instr_with_config_not_cached(cache_dir):
+    @config
+    class CFG:
+        scale: f32
+
+    @instr("set_scale({src}[0]);")
+    def set_scale(src: [f32][1] @ DRAM):
+        CFG.scale = src[0]
+
+    set_scale.INTERNAL_proc()
+    assert not list(cache_dir.glob("*.pkl"))
+
+
+def test_instr_key_captured_values():
+    # captured values are keyed by their contents, not just their type
+    assert instr_cache._env_value([1, 2]) != instr_cache._env_value([1, 3])
+    assert instr_cache._env_value(np.float32(1)) != instr_cache._env_value(
+        np.float32(2)
+    )
+    assert instr_cache._env_value(instr) == instr_cache._env_value(instr)
+    with pytest.raises(instr_cache._Uncacheable):
+        instr_cache._env_value(lambda: 0)
+
+
+
+# the memory of the instruction below, rebound by the test
+COPY_MEM = DRAM
+
+
+def test_instr_names_resolve_at_definition(monkeypatch):
+    monkeypatch.setenv("EXO_DISABLE_CACHE", "1")
+
+    @instr("{dst_data} = {src_data};")
+    def copy(dst: [f32][8] @ COPY_MEM, src: [f32][8] @ DRAM):
+        for i in seq(0, 8):
+            dst[i] = src[i]
+
+    # rebinding the name before the instruction is first used changes nothing
+    monkeypatch.setitem(globals(), "COPY_MEM", AVX2)
+    assert copy.INTERNAL_proc().args[0].mem is DRAM
@@ -87,3 +87,159 @@ def test_gemm():
     C = np.random.uniform(size=(4, 3))
     gemm.interpret(n=4, m=3, p=2, A=A, B=B, C=C)
     np.testing.assert_almost_equal(C, C_answer)
+
+
+def test_gemm_memmap(tmp_path):
+    A = np.array([[-1.0, 4.0], [-2.0, 5.0], [6.0, -3.0], [7.0, 8.0]])
+    B = np.array([[9.0, 0.0, 2.0], [3.0, 1.0, 10.0]])
+
+    C = np.memmap(tmp_path / "C.bin", dtype=np.float32, mode="w+", shape=(4, 3))
+    gemm = gen_gemm()
+    gemm.interpret(n=4, m=3, p=2, A=A, B=B, C=C)
+    del C
+
+    C = np.memmap(tmp_path / "C.bin", dtype=np.float32, mode="r", shape=(4, 3))
+    np.testing.assert_almost_equal(C, A @ B)
+
+
+def test_gemm_buffer_protocol():
+    from array import array
+
+    A = np.array([[-1.0, 4.0], [-2.0, 5.0], [6.0, -3.0], [7.0, 8.0]])
+    B = np.array([[9.0, 0.0, 2.0], [3.0, 1.0, 10.0]])
+
+    # a flat buffer is used as the 4x3 matrix, without copying
+    C = array("d", [0.0] * 12)
+    gemm = gen_gemm()
+    gemm.interpret(n=4, m=3, p=2, A=A, B=B, C=C)
+    np.testing.assert_almost_equal(np.reshape(C, (4, 3)), A @ B)
+
+
+def test_alloc_pool(monkeypatch):
+    @proc
+    def blur(n: size, x: R[n + 2], y: R[n]):
+        for i in seq(0, n):
+            tmp: R[3]
+            for k in seq(0, 3):
+                tmp[k] = x[i + k]
+            y[i] = tmp[0] + tmp[1] + tmp[2]
+
+    # `tmp` is only allocated once and reused by every iteration
+    allocs = []
+    np_empty = np.empty
+    monkeypatch.setattr(
+        np, "empty", lambda *a, **kw: allocs.append(a) or np_empty(*a, **kw)
+    )
+
+    x = np.arange(10.0)
+    y = np.zeros(8)
+    blur.interpret(n=8, x=x, y=y)
+    np.testing.assert_almost_equal(y, x[:-2] + x[1:-1] + x[2:])
+    assert allocs == [((3,),)]
+
+
+def test_interpret_chunks(tmp_path):
+    add_vec = gen_add_vec()
+    x = np.arange(10.0)
+    y = np.ones(10)
+    res = np.memmap(tmp_path / "res.bin", dtype=np.float64, mode="w+", shape=(10,))
+
+    chunks = add_vec.interpret_chunks(4, n=10, x=x, y=y, res=res)
+    done = np.memmap(tmp_path / "res.bin", dtype=np.float64, mode="r", shape=(10,))
+    for it, lo, hi in chunks:
+        assert it == "i"
+        # finished chunks are flushed to the file
+        np.testing.assert_almost_equal(done[:hi], x[:hi] + 1)
+        assert (lo, hi) in [(0, 4), (4, 8), (8, 10)]
+    np.testing.assert_almost_equal(done, x + 1)
+
+
+def test_window_views():
+    from exo import instr
+
+    @instr("{dst_data} = {src_data};")
+    def copy4(dst: [f32][4], src: [f32][4]):
+        for i in seq(0, 4):
+            dst[i] = src[i]
+
+    views = []
+
+    @copy4.numpy_impl
+    def _(dst, src):
+        views.append(dst)
+        dst[:] = src
+
+    @proc
+    def transpose_rows(x: f32[4, 4], y: f32[4, 4]):
+        for i in seq(0, 4):
+            col = y[:, i]
+            copy4(col, x[i, :])
+
+    x = np.arange(16.0).reshape(4, 4)
+    y = np.zeros((4, 4))
+    transpose_rows.interpret(x=x, y=y)
+    np.testing.assert_almost_equal(y, x.T)
+    # the instruction was called on views into `y`, not on copies
+    assert len(views) == 4 and all(np.shares_memory(v, y) for v in views)
+
+
+def test_x86_numpy_impls():
+    from exo.libs.memories import AVX2
+    from exo.platforms.x86 import mm256_loadu_ps, mm256_storeu_ps, mm256_fmadd_ps
+    from exo.stdlib.scheduling import (
+        divide_loop,
+        reorder_loops,
+        stage_mem,
+        set_memory,
+        simplify,
+        replace_all,
+    )
+
+    @proc
+    def axpy(n: size, a: f32[8], x: f32[n, 8], y: f32[8]):
+        for i in seq(0, n):
+            for j in seq(0, 8):
+                y[j] += a[j] * x[i, j]
+
+    p = stage_mem(axpy, "for i in _:_", "y[0:8]", "acc")
+    p = stage_mem(p, "for j in _:_", "a[0:8]", "av")
+    p = stage_mem(p, "for j in _:_", "x[i, 0:8]", "xv")
+    for buf in ["acc", "av", "xv"]:
+        p = set_memory(p, buf, AVX2)
+    p = simplify(p)
+    p = replace_all(p, [mm256_loadu_ps, mm256_storeu_ps, mm256_fmadd_ps])
+    assert "mm256_fmadd_ps" in str(p)
+
+    x = np.random.uniform(size=(5, 8)).astype(np.float32)
+    a = np.random.uniform(size=8).astype(np.float32)
+    y = np.zeros(8, dtype=np.float32)
+    p.interpret(n=5, a=a, x=x, y=y)
+    np.testing.assert_allclose(y, a * x.sum(axis=0), rtol=1e-5)
+
+
+def test_x86_builtin_impls():
+    from exo.libs.memories import AVX2
+    from exo.platforms.x86 import mm256_loadu_ps, mm256_storeu_ps, mm256_relu_ps
+    from exo.stdlib.scheduling import stage_mem, set_memory, simplify, replace_all
+
+    @proc
+    def relu_vec(n: size, x: f32[n, 8], y: f32[n, 8]):
+        for i in seq(0, n):
+            for j in seq(0, 8):
+                y[i, j] = relu(x[i, j])
+
+    p = stage_mem(relu_vec, "for j in _:_", "x[i, 0:8]", "xv")
+    p = stage_mem(p, "for j in _:_", "y[i, 0:8]", "yv")
+    p = set_memory(set_memory(p, "xv", AVX2), "yv", AVX2)
+    p = simplify(p)
+    p = replace_all(p, [mm256_loadu_ps, mm256_storeu_ps, mm256_relu_ps])
+    assert "mm256_relu_ps(yv[0:8], xv[0:8])" in str(p)
+
+    x = np.random.uniform(-1, 1, size=(3, 8)).astype(np.float32)
+    # like fmaxf and _mm256_max_ps in C, relu(NaN) is 0
+    x[0, 0] = np.nan
+    for q in [relu_vec, p]:
+        y = np.zeros_like(x)
+        q.interpret(n=3, x=x, y=y)
+        np.testing.assert_array_equal(y, np.fmax(x, 0))
+        assert y[0, 0] == 0
@@ -336,3 +336,54 @@ def test_alias_check():
         @proc
         def bar(N: size, x: [f32][N]):
             foo(N, x, x)
+
+
+def test_dep_analysis_skips_smt(monkeypatch):
+    @proc
+    def foo(
+        M: size, N: size, K: size, C: f32[M, N], A: f32[M, K], B: f32[K, N], D: f32[M]
+    ):
+        assert N % 8 == 0
+        for i in seq(0, M):
+            for j in seq(0, N):
+                for k in seq(0, K):
+                    C[i, j] += A[i, k] * B[k, j]
+            for j in seq(0, N):
+                C[i, j] = C[i, j] * 2.0
+        for i in seq(0, M):
+            D[i] = 0.0
+
+    def no_smt(*args, **kwargs):
+        raise AssertionError("the SMT solver should not be needed")
+
+    import exo.new_eff
+
+    monkeypatch.setattr(exo.new_eff, "SMTSolver", no_smt)
+
+    foo = divide_loop(foo, "j", 8, ["jo", "ji"], perfect=True)
+    foo = reorder_loops(foo, "ji k")
+    foo = reorder_loops(foo, "jo k")
+    foo = fission(foo, foo.find_loop("i").body()[0].after())
+    foo = reorder_stmts(foo, foo.body()[-1].expand(1, 0))
+
+
+def test_dep_analysis_is_conservative():
+    from exo.dep_analysis import commutes, loops_reorder, loop_fissions
+
+    @proc
+    def foo(N: size, x: R[N + 1, N + 1], y: R[N + 1]):
+        for i in seq(0, N):
+            for j in seq(0, N):
+                x[i, j] = x[j, i] * 2.0
+        for i in seq(0, N):
+            y[i] = 1.0
+            x[i, 0] = y[i + 1]
+        y[N] = 0.0
+
+    ir = foo.INTERNAL_proc()
+    loop1, loop2, stmt = ir.body
+    assert not loops_reorder(ir, loop1)
+    assert not loop_fissions(ir, loop2, loop2.body[:1], loop2.body[1:])
+    assert commutes(ir, loop2.body[0], loop2.body[1])
+    assert not commutes(ir, loop2, stmt)
+    assert commutes(ir, loop1, stmt)
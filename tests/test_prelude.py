@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import pytest
+
+from exo.prelude import Sym
+
+
+def test_sym_identity():
+    x, y = Sym("x"), Sym("x")
+    assert x == x and hash(x) == hash(x)
+    # symbols with the same name are different variables
+    assert x != y
+    assert len({x, y}) == 2
+    assert {x: 1, y: 2}[x] == 1
+
+    z = x.copy()
+    assert z != x and z.name() == x.name()
+    assert x != "x"
+
+
+def test_sym_order():
+    b1, b2, a = Sym("b"), Sym("b"), Sym("a")
+    # by name, then in the order they were created
+    assert sorted([b2, a, b1]) == [a, b1, b2]
+    assert b1.copy() > b2
+    assert not a < a
+
+
+def test_sym_names_interned():
+    x, y = Sym("".join(["my", "_var"])), Sym("my_var")
+    assert x.name() is y.name()
+    assert x.copy().name() is x.name()
+
+    with pytest.raises(TypeError, match="alphanumeric name"):
+        Sym("not a name")
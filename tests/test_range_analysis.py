@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import math
+
 import pytest
 
 from exo.stdlib.scheduling import *
 from exo import proc, DRAM, Procedure
-from exo.range_analysis import IndexRangeAnalysis
+from exo.range_analysis import IndexRangeAnalysis, arg_range_env
 
 
 def test_affine_index_range():
@@ -170,6 +172,20 @@ def test_affine_index_range10():
     assert e_range == (0, 31)
 
 
+def test_affine_index_range_unbounded():
+    @proc
+    def bar(N: size):
+        for i in seq(0, 6):
+            for j in seq(0, (N + 3) / 4 * 2 + i % 4):
+                pass
+
+    e = bar.find("for j in _:_").hi()._impl._node
+    i_sym = bar.find("for i in _:_")._impl._node.iter
+    N_sym = bar._loopir_proc.args[0].name
+    e_range = IndexRangeAnalysis(e, {i_sym: (0, 5), N_sym: (1, math.inf)}).result()
+    assert e_range == (2, math.inf)
+
+
 def test_affine_index_range_fail():
     @proc
     def bar():
@@ -207,3 +223,21 @@ def test_affine_index_range_fail2():
     i_sym = bar.find("for i in _:_")._impl._node.iter
     e_range = IndexRangeAnalysis(e, {i_sym: (0, 2)}).result()
     assert e_range == None
+
+
+def test_arg_range_env():
+    @proc
+    def bar(N: size, M: size, K: size, k: index, j: index):
+        assert N / 16 < 4
+        assert 2 <= M
+        assert M <= 6
+        assert k >= 0
+        pass
+
+    N_sym, M_sym, K_sym, k_sym, j_sym = [a.name for a in bar._loopir_proc.args]
+    assert arg_range_env(bar._loopir_proc) == {
+        N_sym: (1, 63),
+        M_sym: (2, 6),
+        K_sym: (1, math.inf),
+        k_sym: (0, math.inf),
+    }
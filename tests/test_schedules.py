@@ -2456,6 +2456,154 @@ def test_replace_all_arch(golden):
     assert str(bar) == golden
 
 
+def test_select_instrs_report(golden):
+    @proc
+    def bar(src: f32[8] @ DRAM, dst: f32[8] @ DRAM):
+        x: f32[8] @ AVX2
+        for i in seq(0, 8):
+            x[i] = src[i]
+        for i in seq(0, 8):
+            x[i] = x[i] * x[i]
+        for i in seq(0, 8):
+            dst[i] = x[i]
+        for i in seq(0, 8):
+            dst[i] = src[i]
+
+    sel = select_instrs(bar, [mm256_loadu_ps, mm256_storeu_ps, mm256_mul_ps])
+    assert str(sel.proc) == golden
+    assert sel.proc.forward(bar.body()[4]) == sel.proc.body()[4]
+
+    loops = [c.as_block() for c in bar.body()[1:]]
+    assert sel.replaced == [
+        (loops[0], mm256_loadu_ps),
+        (loops[2], mm256_storeu_ps),
+    ]
+    failed = [(loops.index(site), instr, reason) for site, instr, reason in sel.failed]
+    assert failed == [
+        (
+            2,
+            mm256_loadu_ps,
+            "memory type mismatch: 'dst' is in DRAM, but argument 'dst' of "
+            "mm256_loadu_ps expects AVX2",
+        ),
+        (
+            3,
+            mm256_loadu_ps,
+            "memory type mismatch: 'dst' is in DRAM, but argument 'dst' of "
+            "mm256_loadu_ps expects AVX2",
+        ),
+        (
+            3,
+            mm256_storeu_ps,
+            "memory type mismatch: 'src' is in DRAM, but argument 'src' of "
+            "mm256_storeu_ps expects AVX2",
+        ),
+        (
+            1,
+            mm256_mul_ps,
+            "the same buffer 'x' would be passed via multiple arguments",
+        ),
+    ]
+
+    # without `mem_aware`, every copy loop is a load
+    sel = select_instrs(bar, [mm256_loadu_ps], mem_aware=False)
+    assert [loops.index(site) for site, _ in sel.replaced] == [0, 2, 3]
+
+
+def test_select_instrs_priority():
+    @proc
+    def row(dst: [f32][8] @ DRAM, src: [f32][8] @ DRAM):
+        for j in seq(0, 8):
+            dst[j] = src[j]
+
+    @proc
+    def tile(dst: [f32][4, 8] @ DRAM, src: [f32][4, 8] @ DRAM):
+        for i in seq(0, 4):
+            for j in seq(0, 8):
+                dst[i, j] = src[i, j]
+
+    @proc
+    def bar(src: f32[4, 8] @ DRAM, dst: f32[4, 8] @ DRAM):
+        for i in seq(0, 4):
+            for j in seq(0, 8):
+                dst[i, j] = src[i, j]
+
+    sel = select_instrs(bar, [tile, row])
+    assert [instr for _, instr in sel.replaced] == [tile]
+    assert "tile(dst[0:4, 0:8], src[0:4, 0:8])" in str(sel.proc)
+
+    sel = select_instrs(bar, [row, tile])
+    assert [instr for _, instr in sel.replaced] == [row]
+    assert "row(dst[i + 0, 0:8], src[i + 0, 0:8])" in str(sel.proc)
+
+
+def test_select_instrs_module():
+    import exo.platforms.x86 as x86
+
+    @proc
+    def bar(src: f32[16] @ DRAM, dst: f32[16] @ DRAM):
+        x: f32[16] @ AVX2
+        for i in seq(0, 16):
+            x[i] = src[i]
+        for i in seq(0, 16):
+            dst[i] = x[i]
+
+    bar = divide_loop(bar, "i", 8, ["io", "ii"], perfect=True)
+    bar = divide_loop(bar, "i", 8, ["io", "ii"], perfect=True)
+    bar = simplify(divide_dim(bar, "x", 0, 8))
+    sel = select_instrs(bar, x86)
+    assert [instr.name() for _, instr in sel.replaced] == [
+        "mm256_loadu_ps",
+        "mm256_storeu_ps",
+    ]
+    assert "for ii in" not in str(sel.proc)
+
+
+def test_replace_solves_without_smt(monkeypatch):
+    import exo.LoopIR_unification as unification
+
+    def fail(*args):
+        assert False, "affine unification problem sent to the SMT solver"
+
+    monkeypatch.setattr(unification, "_solve_smt", fail)
+    unification._solve_canonical.cache_clear()
+
+    @proc
+    def bar(src: f32[2, 8] @ DRAM, dst: f32[2, 8] @ DRAM):
+        x: f32[2, 8] @ AVX2
+        for j in seq(0, 8):
+            x[1, j] = src[1, j]
+        for j in seq(0, 8):
+            dst[0, j] = x[0, j]
+
+    # window arguments give rise to `Cases` over the windowed dimension
+    bar = replace(bar, "for j in _:_", mm256_loadu_ps)
+    bar = replace(bar, "for j in _:_", mm256_storeu_ps)
+    assert "mm256_loadu_ps(x[1, 0:8], src[1, 0:8])" in str(bar)
+    assert "mm256_storeu_ps(dst[0, 0:8], x[0, 0:8])" in str(bar)
+
+
+def test_replace_solution_memoized():
+    import exo.LoopIR_unification as unification
+
+    @proc
+    def bar(src: f32[8] @ DRAM, dst: f32[8] @ DRAM):
+        x: f32[8] @ AVX2
+        y: f32[8] @ AVX2
+        for i in seq(0, 8):
+            x[i] = src[i]
+        for i in seq(0, 8):
+            y[i] = dst[i]
+
+    # the two sites only differ in the names of the buffers
+    unification._solve_canonical.cache_clear()
+    bar = replace(bar, "for i in _:_ #0", mm256_loadu_ps)
+    bar = replace(bar, "for i in _:_ #0", mm256_loadu_ps)
+    info = unification._solve_canonical.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    assert "mm256_loadu_ps(y[0:8], dst[0:8])" in str(bar)
+
+
 def test_assert_if(golden):
     @proc
     def foo():
@@ -2833,3 +2981,92 @@ def test_unroll_buffer5():
         match="Cannot unroll a buffer at a dimension used as a window",
     ):
         bar = unroll_buffer(bar, "tmp_a : _", 0)
+
+
+def test_can_apply(capsys):
+    @proc
+    def foo(n: size, x: f32[n]):
+        for i in seq(0, n):
+            x[i] = 1.0
+
+    res = divide_loop.can_apply(foo, "i", 4, ["io", "ii"], perfect=True)
+    assert not res and res.proc is None and res.arg is None
+    assert isinstance(res.error, SchedulingError)
+    assert "cannot perfectly split" in res.reason
+
+    res = divide_loop.can_apply(foo, "i", 0, ["io", "ii"])
+    assert not res and res.arg == "div_const"
+    assert isinstance(res.error, TypeError)
+
+    res = divide_loop.can_apply(foo, "i", 4, ["io", "ii"], tail="cut")
+    assert res and res.error is None
+    assert str(res.proc) == str(divide_loop(foo, "i", 4, ["io", "ii"], tail="cut"))
+
+    # neither arguments nor procedures are modified, and nothing is printed
+    loops = [foo.find_loop("i")]
+    assert not replace.can_apply(foo, loops, mm256_storeu_ps)
+    assert loops == [foo.find_loop("i")]
+    assert capsys.readouterr().out == ""
+
+
+def test_can_apply_raises_bugs(capsys):
+    from exo.API_scheduling import sched_op
+
+    @sched_op([])
+    def buggy(proc):
+        print("rewriting")
+        raise TypeError("bug in the rewrite")
+
+    @proc
+    def foo(x: f32):
+        x = 1.0
+
+    # a TypeError of the rewrite is not a failed precondition
+    with pytest.raises(TypeError, match="bug in the rewrite"):
+        buggy.can_apply(foo)
+    assert capsys.readouterr().out == "rewriting\n"
+
+
+def test_can_apply_checks_before_rewriting(monkeypatch):
+    import exo.LoopIR_scheduling
+
+    def no_rewrite(*args, **kwargs):
+        raise AssertionError("rewrite ran although the precondition failed")
+
+    monkeypatch.setattr(exo.LoopIR_scheduling, "DoSplit", no_rewrite)
+
+    @proc
+    def foo(n: size, x: f32[n]):
+        for i in seq(0, n):
+            x[i] = 1.0
+
+    res = divide_loop.can_apply(foo, "i", 4, ["io", "ii"], perfect=True)
+    assert not res and "cannot perfectly split" in res.reason
+
+
+def test_can_apply_precondition_type_error():
+    @proc
+    def foo(n: size, x: f32[n]):
+        for i in seq(0, n):
+            x[i + 1 - 1] = 1.0
+
+    # binding an index expression is a failed precondition, not a bug
+    res = bind_expr.can_apply(foo, "i + 1", "b")
+    assert not res and isinstance(res.error, TypeError)
+    assert "only numeric" in res.reason
+
+    with pytest.raises(TypeError, match="only numeric"):
+        bind_expr(foo, "i + 1", "b")
+    assert str(repeat(bind_expr)(foo, "i + 1", "b")) == str(foo)
+
+
+def test_repeat_until_inapplicable(capsys):
+    @proc
+    def foo(x: f32[4, 4]):
+        for i in seq(0, 4):
+            for j in seq(0, 4):
+                x[i, j] = 1.0
+
+    unrolled = repeat(unroll_loop, verbose=True)(foo, "_")
+    assert "for" not in str(unrolled)
+    assert "repeat ended with error" in capsys.readouterr().out
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import math
+
+import pytest
+
+from exo import proc, config
+from exo.libs.memories import AVX2
+from exo.search import OpSpace, search, static_cost
+from exo.stdlib.scheduling import *
+
+
+def new_gemm():
+    @proc
+    def gemm(M: size, N: size, K: size, C: f32[M, N], A: f32[M, K], B: f32[K, N]):
+        assert M % 4 == 0
+        assert N % 8 == 0
+        for i in seq(0, M):
+            for j in seq(0, N):
+                for k in seq(0, K):
+                    C[i, j] += A[i, k] * B[k, j]
+
+    return gemm
+
+
+def split_names(p, args):
+    return [[args["loop_cursor"] + "o", args["loop_cursor"] + "i"]]
+
+
+SPACE = [
+    OpSpace(
+        divide_loop,
+        loop_cursor=["i", "j"],
+        div_const=[4, 8],
+        new_iters=split_names,
+        perfect=True,
+    ),
+    OpSpace(reorder_loops, nested_loops=["j k", "ji k", "ii jo"]),
+]
+
+SIZES = {"M": 16, "N": 16, "K": 16}
+
+
+def loop_count(p, sizes):
+    return str(p).count("for")
+
+
+def k_outermost(p, sizes):
+    return str(p).index("for k")
+
+
+def test_static_cost():
+    gemm = new_gemm()
+    staged = divide_loop(gemm, "j", 8, ["jo", "ji"], perfect=True)
+    staged = stage_mem(staged, "for ji in _:_", "C[i, 8*jo:8*jo+8]", "C_reg")
+    staged = simplify(set_memory(staged, "C_reg", AVX2))
+
+    # C[i, j] += A[i, k] * B[k, j]: 2 operations, 16 bytes of DRAM moved
+    assert static_cost(gemm, SIZES) == 16 * 16 * 16 * (2 + 16)
+    # the reductions now hit the vector registers, not DRAM
+    assert static_cost(staged, SIZES) < static_cost(gemm, SIZES)
+
+    with pytest.raises(ValueError, match="no value given for the size 'K'"):
+        static_cost(gemm, {"M": 16, "N": 16})
+
+
+def test_search_beam():
+    gemm = new_gemm()
+    res = search(gemm, SPACE, SIZES, depth=2, beam_width=3)
+
+    assert res.best.cost == min(c.cost for c in res.candidates)
+    assert len(res.candidates) == 3
+    assert res.explored > 1 and res.rejected > 0
+    # splitting i then j and j then i lead to the same proc
+    assert res.duplicates > 0
+
+    # the steps reproduce the best proc
+    p = gemm
+    for step in res.best.steps:
+        p = globals()[step.op](p, **step.args)
+    assert str(p) == str(res.best.proc)
+
+
+def test_search_expands_once():
+    expanded = []
+
+    def record(p, args):
+        expanded.append((str(p), args["loop_cursor"], args["div_const"]))
+        return split_names(p, args)
+
+    space = [OpSpace(divide_loop, **{**SPACE[0].params, "new_iters": record})]
+    # the original proc stays the best, but is only expanded once
+    res = search(new_gemm(), space, SIZES, cost=loop_count, depth=3)
+    assert res.best.steps == ()
+    assert len(expanded) == len(set(expanded))
+
+
+def test_search_cost_and_pool():
+    gemm = new_gemm()
+    res = search(gemm, SPACE, SIZES, cost=loop_count, depth=2, workers=2)
+    assert res.best.proc == gemm
+    assert res.best.steps == ()
+
+    res = search(gemm, SPACE[1:], SIZES, cost=k_outermost, depth=1, workers=2)
+    assert [str(s) for s in res.best.steps] == ["reorder_loops(nested_loops='j k')"]
+
+
+def test_search_timing():
+    gemm = new_gemm()
+    res = search(gemm, SPACE, SIZES, depth=1, timing=2, repeats=2)
+    assert all(c.time is not None and c.time > 0 for c in res.candidates[:2])
+    assert res.best.time == min(c.time for c in res.candidates[:2])
+
+
+def test_search_timing_violated_assertions():
+    gemm = new_gemm()
+    # M % 4 != 0: the procs cannot be run, but the search goes on
+    res = search(gemm, SPACE, {"M": 6, "N": 16, "K": 16}, depth=1, timing=2)
+    assert [c.time for c in res.candidates[:2]] == [math.inf, math.inf]
+    assert res.best.cost == min(c.cost for c in res.candidates)
+
+
+def test_search_timing_configs():
+    @config
+    class Scale:
+        factor: f32
+
+    @proc
+    def scale(n: size, x: f32[n]):
+        Scale.factor = 2.0
+        for i in seq(0, n):
+            x[i] = x[i] * Scale.factor
+
+    space = [
+        OpSpace(divide_loop, loop_cursor=["i"], div_const=[4], new_iters=split_names)
+    ]
+    # the procs are called with a context holding the configuration
+    res = search(scale, space, {"n": 16}, depth=1, timing=2)
+    assert all(0 < c.time < math.inf for c in res.candidates)
+
+
+def test_search_errors():
+    gemm = new_gemm()
+    with pytest.raises(TypeError, match="expected a list of OpSpaces"):
+        search(gemm, [divide_loop], SIZES)
+    with pytest.raises(TypeError, match="atomic scheduling operation"):
+        OpSpace(print)
+    with pytest.raises(ValueError, match="no value given"):
+        search(gemm, SPACE, {"M": 16})
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import pickle
+import sys
+
+import pytest
+
+import exo
+import exo.main
+from exo import proc, config, DRAM, save_procs, load_procs
+from exo.libs.memories import AVX2
+from exo.platforms.x86 import *
+from exo.serialization import SerializationError, MAGIC
+from exo.stdlib.scheduling import *
+
+
+@config
+class ConfigScale:
+    scale: f32
+    n: index
+
+
+def make_library():
+    @proc
+    def scale_vec(
+        n: size, dst: [f32][n] @ DRAM, src: [f32][n] @ DRAM, s: [f32][1] @ DRAM
+    ):
+        assert n % 8 == 0
+        assert stride(dst, 0) == 1
+        assert stride(src, 0) == 1
+        ConfigScale.scale = s[0]
+        ConfigScale.n = n
+        for i in seq(0, n):
+            tmp: f32 @ DRAM
+            tmp = src[i]
+            tmp = relu(tmp)
+            dst[i] = tmp * ConfigScale.scale
+
+    @proc
+    def copy_vec(n: size, dst: f32[n] @ DRAM, src: f32[n] @ DRAM):
+        assert n % 8 == 0
+        for i in seq(0, n):
+            dst[i] = src[i]
+
+    copy_vec = divide_loop(copy_vec, "i", 8, ["io", "ii"], perfect=True)
+    copy_vec = stage_mem(copy_vec, "for ii in _:_", "src[8*io:8*io+8]", "reg")
+    copy_vec = simplify(set_memory(copy_vec, "reg", AVX2))
+    copy_vec = replace(copy_vec, "for i0 in _:_", mm256_loadu_ps)
+    copy_vec = replace(copy_vec, "for ii in _:_", mm256_storeu_ps)
+
+    @proc
+    def top(n: size, x: f32[n] @ DRAM, y: f32[n] @ DRAM, s: f32[1] @ DRAM):
+        assert n % 8 == 0
+        copy_vec(n, y, x)
+        scale_vec(n, x[0:n], y[0:n], s[0:1])
+
+    return [top, copy_vec]
+
+
+def test_roundtrip(tmp_path):
+    lib = make_library()
+    save_procs(lib, tmp_path / "lib.exoproc")
+    loaded = load_procs(tmp_path / "lib.exoproc")
+
+    assert [str(p) for p in loaded] == [str(p) for p in lib]
+    assert exo.compile_procs_to_strings(
+        loaded, "lib.h"
+    ) == exo.compile_procs_to_strings(lib, "lib.h")
+
+    # calls to the same proc load as the same proc
+    top, copy_vec = (p.INTERNAL_proc() for p in loaded)
+    assert top.body[0].f is copy_vec
+
+
+def test_roundtrip_symbols(tmp_path):
+    (lib,) = make_library()[1:]
+    save_procs([lib], tmp_path / "lib.exoproc")
+    (loaded,) = load_procs(tmp_path / "lib.exoproc")
+
+    # the loaded symbols are fresh, but all uses of one symbol still agree
+    arg, loaded_arg = lib.INTERNAL_proc().args[0], loaded.INTERNAL_proc().args[0]
+    assert arg.name != loaded_arg.name
+    assert str(arg.name) == str(loaded_arg.name)
+
+    split = lambda p: divide_loop(p, "io", 2, ["ioo", "ioi"], tail="cut")
+    assert str(split(loaded)) == str(split(lib))
+
+
+def test_roundtrip_shares_live_configs():
+    (top,) = make_library()[:1]
+    data = pickle.dumps(top)
+    loaded = pickle.loads(data)
+
+    scale_vec = loaded.INTERNAL_proc().body[1].f
+    assert scale_vec.body[0].config is ConfigScale
+
+
+def test_pickle_procedure():
+    (_, copy_vec) = make_library()
+    assert str(pickle.loads(pickle.dumps(copy_vec))) == str(copy_vec)
+
+
+def test_load_errors(tmp_path, monkeypatch):
+    lib = make_library()
+    save_procs(lib, tmp_path / "lib.exoproc")
+    data = (tmp_path / "lib.exoproc").read_bytes()
+
+    (tmp_path / "bad.exoproc").write_bytes(b"def foo(): pass")
+    with pytest.raises(SerializationError, match="not a serialized Exo library"):
+        load_procs(tmp_path / "bad.exoproc")
+
+    newer = MAGIC + (2).to_bytes(2, "little") + data[len(MAGIC) + 2 :]
+    (tmp_path / "bad.exoproc").write_bytes(newer)
+    with pytest.raises(SerializationError, match="format version 2"):
+        load_procs(tmp_path / "bad.exoproc")
+
+    (tmp_path / "bad.exoproc").write_bytes(data[: len(data) // 2])
+    with pytest.raises(SerializationError, match="corrupt"):
+        load_procs(tmp_path / "bad.exoproc")
+
+    monkeypatch.setattr(exo, "__version__", "0.0.0")
+    with pytest.raises(SerializationError, match="but this is version 0.0.0"):
+        load_procs(tmp_path / "lib.exoproc")
+
+
+def test_exocc_serialized_source(tmp_path, monkeypatch):
+    lib = make_library()
+    save_procs(lib, tmp_path / "lib.exoproc")
+
+    argv = ["exocc", "-o", str(tmp_path / "out"), "--stem", "lib"]
+    monkeypatch.setattr(sys, "argv", argv + [str(tmp_path / "lib.exoproc")])
+    exo.main.main()
+
+    c_file, h_file = exo.compile_procs_to_strings(lib, "lib.h")
+    assert (tmp_path / "out" / "lib.c").read_text() == c_file
+    assert (tmp_path / "out" / "lib.h").read_text() == h_file
+    assert str(tmp_path / "lib.exoproc") in (tmp_path / "out" / "lib.d").read_text()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import pytest
+
+from exo import (
+    proc,
+    SMTLimitError,
+    get_smt_limits,
+    smt_limits,
+    smt_limit_report,
+)
+from exo import solver_limits
+from exo.stdlib.scheduling import *
+
+
+def new_scale():
+    @proc
+    def scale(n: size, x: f32[n, 16], y: f32[n, 16]):
+        for i in seq(0, n):
+            for j in seq(0, 16):
+                x[i, j] = y[i, j] * 2.0
+
+    return scale
+
+
+def stage(p):
+    return stage_mem(p, "for j in _:_", "x[i, 0:16]", "xr")
+
+
+def test_query_rlimit():
+    smt_limit_report(clear=True)
+    with smt_limits(rlimit=1) as limits:
+        assert limits.rlimit == 1
+        with pytest.raises(SMTLimitError, match="Check_BufferRW in stage_mem"):
+            stage(new_scale())
+
+        # the operation does not apply, rather than failing
+        res = stage_mem.can_apply(new_scale(), "for j in _:_", "x[i, 0:16]", "xr")
+        assert not res and isinstance(res.error, SMTLimitError)
+    assert get_smt_limits().rlimit is None
+
+    hits = smt_limit_report(clear=True)
+    assert [(h.check, h.op, h.limit) for h in hits] == [
+        ("Check_BufferRW", "stage_mem", "rlimit"),
+        ("Check_BufferRW", "stage_mem", "rlimit"),
+    ]
+    assert "∀" in hits[0].formula
+    assert smt_limit_report() == []
+
+
+def test_schedule_rlimit():
+    smt_limit_report(clear=True)
+    default = get_smt_limits()
+    assert default == solver_limits.SMTLimits()
+    with smt_limits(rlimit=10**8, timeout=60 * 1000):
+        # generous limits do not change the results
+        assert "xr: f32[16 - 0]" in str(stage(new_scale()))
+        with smt_limits(schedule_rlimit=1):
+            with pytest.raises(SMTLimitError, match="schedule_rlimit"):
+                stage(new_scale())
+    assert get_smt_limits() == default
+
+    assert [h.limit for h in smt_limit_report(clear=True)] == ["schedule_rlimit"]
+
+
+def test_budget_reserved_by_queries():
+    with smt_limits(schedule_rlimit=100), solver_limits.schedule_budget("op"):
+        rlimit, _, from_budget = solver_limits.query_limits()
+        assert (rlimit, from_budget) == (100, True)
+        settle = solver_limits.reserve(rlimit)
+        # a query started before the first one finished gets what is left
+        assert solver_limits.query_limits()[0] == 1
+        settle(30)
+        assert solver_limits.query_limits()[0] == 70
+
+
+def test_limits_from_environment(monkeypatch):
+    monkeypatch.setenv("EXO_SMT_RLIMIT", "500000")
+    assert solver_limits._env_limit("EXO_SMT_RLIMIT") == 500000
+    monkeypatch.setenv("EXO_SMT_TIMEOUT", "")
+    assert solver_limits._env_limit("EXO_SMT_TIMEOUT") is None
+    monkeypatch.setenv("EXO_SMT_TIMEOUT", "1s")
+    with pytest.raises(ValueError, match="EXO_SMT_TIMEOUT should be an integer"):
+        solver_limits._env_limit("EXO_SMT_TIMEOUT")
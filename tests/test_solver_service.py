@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import pickle
+
+import pytest
+
+from exo import (
+    proc,
+    compile_procs_to_strings,
+    schedule_procs,
+    use_solver_service,
+    smt_limits,
+    smt_limit_report,
+    SchedulingError,
+    SMTLimitError,
+)
+from exo.solver_service import get_solver_service
+from exo.stdlib.scheduling import *
+
+
+def new_scale():
+    @proc
+    def scale(n: size, x: f32[n, 16], y: f32[n, 16]):
+        for i in seq(0, n):
+            for j in seq(0, 16):
+                x[i, j] = y[i, j] * 2.0
+
+    return scale
+
+
+def stage(p):
+    return stage_mem(p, "for j in _:_", "x[i, 0:16]", "xr")
+
+
+def new_dependent():
+    @proc
+    def dependent(x: f32[1]):
+        x[0] = 1.0
+        x[0] += 2.0
+
+    return dependent
+
+
+def test_queries_on_service():
+    expected = str(stage(new_scale()))
+    with use_solver_service(2) as service:
+        assert get_solver_service() is service
+        assert str(stage(new_scale())) == expected
+        with pytest.raises(SchedulingError):
+            reorder_stmts(new_dependent(), "x[_] = _ ;\nx[_] += _")
+
+        smt_limit_report(clear=True)
+        with smt_limits(rlimit=1):
+            with pytest.raises(SMTLimitError, match="Check_BufferRW in stage_mem"):
+                stage(new_scale())
+    assert get_solver_service() is None
+    assert [h.check for h in smt_limit_report(clear=True)] == ["Check_BufferRW"]
+
+
+def test_schedule_procs():
+    procs = [rename(new_scale().partial_eval(n), f"scale_{n}") for n in [1, 2, 3, 4]]
+    expected = [str(simplify(stage(p))) for p in procs]
+    with use_solver_service(2):
+        scheduled = schedule_procs(lambda p: simplify(stage(p)), procs)
+    # the results are in the order of the procs
+    assert [str(p) for p in scheduled] == expected
+
+
+def test_scheduling_errors_from_workers():
+    with pytest.raises(SchedulingError) as exc:
+        reorder_stmts(new_dependent(), "x[_] = _ ;\nx[_] += _")
+    err = pickle.loads(pickle.dumps(exc.value))
+    assert type(err) is SchedulingError and str(err) == str(exc.value)
+
+    def schedule(p):
+        return reorder_stmts(p, "x[_] = _ ;\nx[_] += _")
+
+    with use_solver_service(2):
+        with pytest.raises(SchedulingError) as worker_exc:
+            schedule_procs(schedule, [new_dependent()])
+    assert str(worker_exc.value) == str(exc.value)
+
+
+def test_parallel_compile():
+    procs = [rename(new_scale().partial_eval(n), f"scale_{n}") for n in [4, 8, 16]]
+    procs = [simplify(stage(p)) for p in procs]
+    expected = compile_procs_to_strings(procs, "test.h")
+    with use_solver_service(2):
+        assert compile_procs_to_strings(procs, "test.h") == expected
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import pytest
+
+from exo import proc
+from exo.stdlib.scheduling import *
+from exo.tiling import Cache
+
+SIZES = {"M": 512, "N": 512, "K": 512}
+
+
+def new_gemm():
+    @proc
+    def gemm(M: size, N: size, K: size, C: f32[M, N], A: f32[M, K], B: f32[K, N]):
+        for i in seq(0, M):
+            for j in seq(0, N):
+                for k in seq(0, K):
+                    C[i, j] += A[i, k] * B[k, j]
+
+    return gemm
+
+
+def test_footprints_and_reuse():
+    advice = new_gemm().find_loop("i").advise_tiling(SIZES)
+    assert advice.loops == ["i", "j", "k"]
+    assert {nm: str(p) for nm, p in advice.footprints.items()} == {
+        "A": "4*T_i*T_k",
+        "B": "4*T_j*T_k",
+        "C": "4*T_i*T_j",
+    }
+    # C is reused across k, A across j and B across i
+    assert {nm: (lp, str(d)) for nm, (lp, d) in advice.reuse.items()} == {
+        "A": ("j", "8*T_k + 4"),
+        "B": ("i", "4*T_j*T_k + 4*T_j + 4*T_k"),
+        "C": ("k", "12"),
+    }
+
+    @proc
+    def scale(n: size, x: f32[n], y: f32[n]):
+        for i in seq(0, n):
+            y[i] = 2.0 * x[i]
+
+    advice = scale.find_loop("i").advise_tiling({"n": 1024})
+    assert advice.reuse == {"x": None, "y": None}
+
+
+def test_tiles_fit_the_caches():
+    caches = [Cache("L1", 32 * 1024), Cache("L2", 512 * 1024, line_size=128)]
+    advice = (
+        new_gemm()
+        .find_loop("i")
+        .advise_tiling(SIZES, caches, multiple_of={"j": 8}, usable=0.75)
+    )
+    assert list(advice.levels) == ["L1", "L2"]
+    for lvl in advice.levels.values():
+        assert lvl.footprint <= 0.75 * lvl.cache.size
+    l1, l2 = advice.tiles("L1"), advice.tiles("L2")
+    assert l1["j"] % 8 == 0
+    assert all(l1[nm] <= l2[nm] <= 512 for nm in "ijk")
+    assert advice.levels["L1"].bytes_per_iter > advice.levels["L2"].bytes_per_iter
+
+    # the tiles parameterize the schedule
+    gemm = divide_loop(new_gemm(), "k", l1["k"], ["ko", "ki"], tail="cut")
+    assert gemm.find_loop("ki").hi().value() == l1["k"]
+
+
+def test_tiling_errors():
+    loop = new_gemm().find_loop("i")
+    with pytest.raises(ValueError, match="no value given for the size 'K'"):
+        loop.advise_tiling({"M": 8, "N": 8})
+    with pytest.raises(ValueError, match="no loop x in the nest"):
+        loop.advise_tiling(SIZES, multiple_of={"x": 4})
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from exo import proc
+from exo.libs.memories import AVX2
+from exo.platforms.x86 import *
+from exo.stdlib.scheduling import *
+from exo.verify import verify, verify_variants
+
+
+def new_gemm():
+    @proc
+    def gemm(M: size, N: size, K: size, C: f32[M, N], A: f32[M, K], B: f32[K, N]):
+        assert N % 8 == 0
+        for i in seq(0, M):
+            for j in seq(0, N):
+                for k in seq(0, K):
+                    C[i, j] += A[i, k] * B[k, j]
+
+    return gemm
+
+
+def test_verify_schedules():
+    gemm = new_gemm()
+    tiled = divide_loop(gemm, "j", 8, ["jo", "ji"], perfect=True)
+    tiled = reorder_loops(tiled, "ji k")
+    reordered = reorder_loops(gemm, "j k")
+
+    results = verify_variants(gemm, [tiled, reordered], trials=8, workers=1)
+    assert [res.proc for res in results] == [tiled, reordered]
+    assert all(res.ok and res.trials == 8 for res in results)
+
+
+def test_verify_shrinks_mismatch():
+    gemm = new_gemm()
+
+    @proc
+    def bad(M: size, N: size, K: size, C: f32[M, N], A: f32[M, K], B: f32[K, N]):
+        assert N % 8 == 0
+        for i in seq(0, M):
+            for j in seq(0, N):
+                for k in seq(0, K):
+                    if k < 5:
+                        C[i, j] += A[i, k] * B[k, j]
+
+    gemm.unsafe_assert_eq(bad)
+    res = verify(gemm, bad, trials=8, workers=1)
+    assert not res.ok
+
+    # the smallest failing sizes, with small integer values
+    cex = res.counterexample
+    assert (cex.args["M"], cex.args["N"], cex.args["K"]) == (1, 8, 6)
+    assert cex.buffer == "C"
+    assert np.all(cex.args["A"] == np.round(cex.args["A"]))
+    assert not np.allclose(cex.expected, cex.actual)
+
+
+def test_verify_index_div_mod():
+    @proc
+    def halve(N: size, x: f32[N], y: f32[N]):
+        for i in seq(0, N):
+            y[i] = x[i / 2] + x[i % 2]
+
+    # odd sizes, where rounding the quotient up would read past the middle
+    for n in [1, 3, 5]:
+        x = np.arange(n, dtype=np.float32)
+        y = np.zeros(n, dtype=np.float32)
+        halve.interpret(N=n, x=x, y=y)
+        i = np.arange(n)
+        np.testing.assert_array_equal(y, x[i // 2] + x[i % 2])
+
+    assert verify(halve, simplify(halve), trials=8, workers=1).ok
+
+
+def test_verify_windows_and_ints():
+    @proc
+    def scale(n: size, x: [f32][n], y: [i32][n], s: f32):
+        assert stride(x, 0) == 1
+        for i in seq(0, n):
+            x[i] = x[i] * s
+            y[i] = y[i] + y[i]
+
+    split = divide_loop(scale, "i", 4, ["io", "ii"], tail="cut_and_guard")
+    assert verify(scale, split, trials=4, workers=1).ok
+
+
+@pytest.mark.isa("avx2")
+def test_verify_avx2_process_pool():
+    @proc
+    def copy(n: size, dst: f32[n], src: f32[n]):
+        assert n % 8 == 0
+        for i in seq(0, n):
+            dst[i] = src[i]
+
+    vec = divide_loop(copy, "i", 8, ["io", "ii"], perfect=True)
+    vec = stage_mem(vec, "for ii in _:_", "src[8*io:8*io+8]", "reg")
+    vec = simplify(set_memory(vec, "reg", AVX2))
+    vec = replace(vec, "for i0 in _:_", mm256_loadu_ps)
+    vec = replace(vec, "for ii in _:_", mm256_storeu_ps)
+
+    assert verify(copy, vec, trials=4, workers=2).ok
+
+
+def test_verify_errors():
+    gemm = new_gemm()
+    with pytest.raises(ValueError, match="was not scheduled from gemm"):
+        verify(gemm, new_gemm(), workers=1)
+
+    @proc
+    def empty(n: size, x: f32[n]):
+        assert n > 100
+        pass
+
+    with pytest.raises(ValueError, match="could not find arguments"):
+        verify(empty, empty, max_size=16, workers=1)
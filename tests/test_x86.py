@@ -1531,3 +1531,50 @@ def test_avx2_reg_copy_pd(compiler):
     getattr(fn, "avx2_reg_copy_pd_ref")(None, dst_copy, src_copy)
     np.testing.assert_almost_equal(dst, dst_copy)
     np.testing.assert_almost_equal(src, src_copy)
+
+
+# --------------------------------------------------------------------------- #
+# Register pressure
+# --------------------------------------------------------------------------- #
+
+
+def test_avx512_sgemm_register_pressure(spec_kernel):
+    from exo.stdlib.analysis import register_pressure, exceeds_register_budget
+
+    # 6 x 4 accumulators, plus one broadcast A and one B vector at a time
+    assert register_pressure(spec_kernel) == {AVX512: 26}
+    assert not exceeds_register_budget(spec_kernel)
+
+    # the load loops only see the accumulators
+    first_loop = spec_kernel.body()[0]
+    assert register_pressure(first_loop) == {AVX512: 24}
+    k_loop = spec_kernel.find_loop("k")
+    assert register_pressure(k_loop) == {AVX512: 26}
+    assert register_pressure(k_loop.body()[:2]) == {AVX512: 25}
+
+
+def test_register_pressure_exceeded():
+    from exo.reg_analysis import RegisterPressureWarning
+    from exo.stdlib.analysis import register_pressure, exceeds_register_budget
+
+    @proc
+    def accum_rows(
+        K: size, A: f32[K, 20, 8] @ DRAM, B: f32[K, 20] @ DRAM, C: f32[20, 8] @ DRAM
+    ):
+        C_reg: f32[20, 8] @ AVX2
+        for i in seq(0, 20):
+            mm256_loadu_ps(C_reg[i, :], C[i, :])
+        for k in seq(0, K):
+            for i in seq(0, 20):
+                a_vec: f32[8] @ AVX2
+                mm256_loadu_ps(a_vec, A[k, i, :])
+                mm256_fmadd_ps_broadcast(C_reg[i, :], a_vec, B[k, i : i + 1])
+        for i in seq(0, 20):
+            mm256_storeu_ps(C[i, :], C_reg[i, :])
+
+    assert register_pressure(accum_rows) == {AVX2: 21}
+    assert exceeds_register_budget(accum_rows)
+    assert register_pressure(accum_rows.find_loop("i")) == {AVX2: 20}
+
+    with pytest.warns(RegisterPressureWarning, match="21 AVX2 registers"):
+        accum_rows.c_code_str()